@@ -0,0 +1,51 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import logging
+
+from ideas_api.lib.aws_base.cloudwatch_emf_metrics import CloudWatchEmfMetrics
+from ideas_api.lib.external_io.es_abstract import ESAbstract
+from ideas_api.lib.external_io.es_factory import ESFactory
+from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract
+from ideas_api.lib.external_io.pub_sub_factory import PubSubFactory
+from ideas_api.lib.processes.ogc_job_outbox import OgcJobOutbox
+from ideas_api.lib.processes.ogc_stage_cache import OgcStageCache
+from ideas_api.lib.utils.config import Config
+
+LOGGER = logging.getLogger(__name__)
+
+
+def sweep_pending_jobs(event, context):
+    """
+    scheduled. publishes start messages of accepted jobs which are not published by the API.
+    expired stage cache entries are deleted in the same run so that the stage cache index does not keep growing.
+    ES_URL, ES_PORT, SNS_TOPIC, aws_region are needed
+    """
+    config = Config()
+    es_middleware: ESAbstract = ESFactory().get_pooled_instance('AWS',
+                                                                base_url=config.get_value(Config.ES_URL),
+                                                                port=int(config.get_value(Config.ES_PORT, '443')),
+                                                                index='NA')
+
+    pub_sub: PubSubAbstract = PubSubFactory().get_instance('SNS').set_channel(config.get_value(Config.SNS_TOPIC))
+    sweep_result = OgcJobOutbox(es_middleware, pub_sub).sweep()
+    try:
+        sweep_result['evicted'] = OgcStageCache(es_middleware).evict_expired()
+    except Exception as e:
+        LOGGER.exception(f'failed to evict expired stage cache: {str(e)}')  # retried in the next run
+        sweep_result['evicted'] = 0
+    CloudWatchEmfMetrics(dimensions={'FunctionName': 'JobOutboxSweeper'}) \
+        .put_metric('JobsPublished', sweep_result['published']) \
+        .put_metric('JobsFailed', sweep_result['failed']) \
+        .put_metric('StageCacheEvicted', sweep_result['evicted']) \
+        .flush()
+    return sweep_result
@@ -10,12 +10,13 @@
 #  access to foreign persons.
 #  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+from ideas_api.lib.aws_base.cloudwatch_emf_metrics import CloudWatchEmfMetrics
 from ideas_api.lib.aws_base.sns_msg_retriever import LambdaEventMsgRetriever
 from ideas_api.lib.external_io.es_abstract import ESAbstract
 from ideas_api.lib.external_io.es_factory import ESFactory
 from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract
 from ideas_api.lib.external_io.pub_sub_factory import PubSubFactory
-from ideas_api.lib.processes.ogc_job_updater import OgcJobUpdater
+from ideas_api.lib.processes.ogc_job_batch_updater import OgcJobBatchUpdater
 from ideas_api.lib.utils.config import Config
 
 
@@ -23,17 +24,26 @@ def trigger_job_updater(event, context):
     """ES_URL=https://search-ideas-api-dev-1-f62xltsguioft2hpjepkrhln3e.us-west-2.es.amazonaws.com
 ES_PORT=443
 SNS_TOPIC=arn:aws:sns:<REGION>:<ACCOUNT-ID>:ideas-project-ideas_api_main_topic
+CLAIM_CHECK_BUCKET=<prefix>-ideas-api-claim-check
 aws_region=us-west-2"""
     print(event)
     config = Config()
-    es_middleware: ESAbstract = ESFactory().get_instance('AWS',
-                                                         base_url=config.get_value(Config.ES_URL),
-                                                         port=int(config.get_value(Config.ES_PORT, '443')),
-                                                         index='NA')
+    es_middleware: ESAbstract = ESFactory().get_pooled_instance('AWS',
+                                                                base_url=config.get_value(Config.ES_URL),
+                                                                port=int(config.get_value(Config.ES_PORT, '443')),
+                                                                index='NA')
 
     pub_sub: PubSubAbstract = PubSubFactory().get_instance('SNS').set_channel(config.get_value(Config.SNS_TOPIC))
-    job_updater = OgcJobUpdater(es_middleware, pub_sub)
-    real_msgs = LambdaEventMsgRetriever().from_sqs(event)
-    for each_real_msg in real_msgs:
-        job_updater.process_update(each_real_msg)
-    return
+    msg_retriever = LambdaEventMsgRetriever()
+    real_msgs = msg_retriever.from_sqs_records(event)
+    outcomes = OgcJobBatchUpdater(es_middleware, pub_sub).process_batch(real_msgs)
+    CloudWatchEmfMetrics(dimensions={'FunctionName': 'JobUpdater'}) \
+        .put_metric('RecordsSucceeded', len(outcomes[OgcJobBatchUpdater.SUCCEEDED])) \
+        .put_metric('RecordsFailed', len(outcomes[OgcJobBatchUpdater.FAILED])) \
+        .put_metric('RecordsDeferred', len(outcomes[OgcJobBatchUpdater.DEFERRED])) \
+        .put_metric('RecordsInvalid', len(msg_retriever.invalid_message_ids)) \
+        .put_metric('RecordsUnresolved', len(msg_retriever.unresolved_message_ids)) \
+        .flush()
+    return {
+        'batchItemFailures': [{'itemIdentifier': k} for k in OgcJobBatchUpdater.get_retrying_ids(outcomes)]
+    }
@@ -0,0 +1,77 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from threading import Lock
+
+from requests import Request
+from requests_aws4auth import AWS4Auth, AWS4SigningKey
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AwsSigV4Auth(AWS4Auth):
+    """
+    SigV4 signer which reads the current keys from botocore credentials for each request.
+
+    botocore refreshes temporary credentials when they are about to expire. So the same signer, and the HTTP client
+    using it, can live as long as the process. Derived signing keys are cached per access key, date, region, and service.
+    """
+    MAX_SIGNING_KEYS = 8
+
+    def __init__(self, credentials, region: str, service: str):
+        """
+        :param credentials: botocore Credentials or RefreshableCredentials
+        :param region: str - AWS region
+        :param service: str - AWS service name. example: es
+        """
+        super().__init__(refreshable_credentials=credentials, region=region, service=service)
+        self.__signing_keys = OrderedDict()
+        self.__lock = Lock()
+
+    def __get_signing_key(self, access_key: str, secret_key: str, scope_date: str):
+        signing_key_id = (access_key, scope_date, self.region, self.service)
+        if signing_key_id not in self.__signing_keys:
+            LOGGER.debug(f'deriving a new signing key for access key ending with {access_key[-3:]} on {scope_date}')
+            self.__signing_keys[signing_key_id] = AWS4SigningKey(secret_key, self.region, self.service, scope_date)
+            while len(self.__signing_keys) > self.MAX_SIGNING_KEYS:
+                self.__signing_keys.popitem(last=False)
+        return self.__signing_keys[signing_key_id]
+
+    def refresh_credentials(self):
+        frozen_credentials = self.refreshable_credentials.get_frozen_credentials()
+        scope_date = datetime.now(timezone.utc).strftime('%Y%m%d')
+        self.access_id = frozen_credentials.access_key
+        self.session_token = frozen_credentials.token
+        self.signing_key = self.__get_signing_key(frozen_credentials.access_key, frozen_credentials.secret_key, scope_date)
+        self.date = scope_date
+        return
+
+    def __call__(self, req):
+        with self.__lock:  # keys are swapped on this object while signing. not letting other threads see half of it.
+            return super().__call__(req)
+
+    def get_signed_headers(self, method: str, url: str, body=None, headers: dict = None):
+        """
+        for HTTP clients other than `requests`. the request is only prepared to be signed. it is not sent.
+
+        :param method: str - HTTP method
+        :param url: str - full URL with the query string
+        :param body: str | bytes - request body exactly as it is sent
+        :param headers: dict - headers which are sent
+        :return: dict - headers with the SigV4 ones added
+        """
+        prepared_request = Request(method, url, data=body, headers={} if headers is None else headers).prepare()
+        return dict(self(prepared_request).headers)
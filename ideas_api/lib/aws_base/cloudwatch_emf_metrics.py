@@ -0,0 +1,61 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+import json
+import logging
+
+from ideas_api.lib.utils.TimeUtlis import TimeUtils
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CloudWatchEmfMetrics:
+    """
+    CloudWatch metrics in Embedded Metric Format.
+
+    Lambda forwards stdout to CloudWatch Logs, which extracts the metrics from the printed JSON.
+    There is no extra API call to publish them.
+    """
+    DEFAULT_NAMESPACE = 'IdeasApi'
+
+    def __init__(self, namespace: str = DEFAULT_NAMESPACE, dimensions: dict = None):
+        self.__namespace = namespace
+        self.__dimensions = {} if dimensions is None else dimensions
+        self.__metrics = {}
+
+    def put_metric(self, name: str, value, unit: str = 'Count'):
+        self.__metrics[name] = (value, unit)
+        return self
+
+    def to_dict(self):
+        emf_dict = {
+            '_aws': {
+                'Timestamp': TimeUtils().get_datetime_unix(True),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.__namespace,
+                    'Dimensions': [list(self.__dimensions.keys())],
+                    'Metrics': [{'Name': k, 'Unit': v[1]} for k, v in self.__metrics.items()],
+                }],
+            },
+            **self.__dimensions,
+        }
+        for k, v in self.__metrics.items():
+            emf_dict[k] = v[0]
+        return emf_dict
+
+    def flush(self):
+        if len(self.__metrics) < 1:
+            return self
+        print(json.dumps(self.to_dict()))
+        self.__metrics = {}
+        return self
@@ -13,7 +13,8 @@
 import json
 import logging
 
-from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator
+from ideas_api.lib.external_io.msg_claim_check import MsgClaimCheck
+from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator, CompiledSchemaRegistry
 LOGGER = logging.getLogger(__name__)
 
 
@@ -24,19 +25,21 @@ class LambdaEventMsgRetriever:
             'Records': {
                 'type': 'array',
                 'minItems': 1,
-                'maxItems': 1,  # TODO only accept 1 item?
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'body': {'type': 'string', 'minLength': 1}
-                    },
-                    'required': ['body']
-                }
+                'items': {'type': 'object'}
             }
         },
         'required': ['Records']
     }
 
+    SQS_RECORD_SCHEMA = {  # validated for each record so that one bad record does not fail the whole batch
+        'type': 'object',
+        'properties': {
+            'messageId': {'type': 'string'},
+            'body': {'type': 'string', 'minLength': 1}
+        },
+        'required': ['body']
+    }
+
     SNS_MSG_SCHEMA = {
         "type": "object",
         "properties": {
@@ -54,21 +57,79 @@ class LambdaEventMsgRetriever:
         "required": ["Message"]
     }
 
-    def __init__(self):
+    def __init__(self, claim_check: MsgClaimCheck = None):
+        """
+        :param claim_check: MsgClaimCheck - resolves pointers of large messages. configured from environment values if None
+        """
         self.a = 1
+        self.__claim_check = MsgClaimCheck() if claim_check is None else claim_check
+        self.__invalid_message_ids = []
+        self.__unresolved_message_ids = []
 
-    def from_sqs(self, sqs_msg):
+    @property
+    def invalid_message_ids(self):
+        """
+        :return: list - message ids of the records which were skipped in the last from_sqs_records call
+        """
+        return self.__invalid_message_ids
+
+    @property
+    def unresolved_message_ids(self):
+        """
+        :return: list - message ids of the records whose stored message could not be read in the last from_sqs_records call.
+        they are returned as pointers so that they can be retried in order.
+        """
+        return self.__unresolved_message_ids
+
+    def __resolve_msg(self, message_id: str, msg: dict):
+        if not MsgClaimCheck.is_pointer(msg):
+            return msg
+        try:
+            return self.__claim_check.check_out(msg)
+        except Exception:
+            LOGGER.exception(f'failed to resolve stored message of sqs record: {message_id}. msg: {msg}')
+            self.__unresolved_message_ids.append(message_id)
+        return msg
+
+    def __retrieve_sns_msg(self, sqs_record: dict):
+        result, errors = SingleJsonValidator().load_schema(self.SQS_RECORD_SCHEMA).validate(sqs_record)
+        if result is False:
+            raise ValueError(f'sqs record did not pass SQS_RECORD_SCHEMA: {errors}')
+        sns_msg = json.loads(sqs_record['body'])
+        result, errors = SingleJsonValidator().load_schema(self.SNS_MSG_SCHEMA).validate(sns_msg)
+        if result is False:
+            raise ValueError(f'sns_msg did not pass SNS_MSG_SCHEMA: {errors}. msg: {sns_msg}')
+        return json.loads(sns_msg['Message'])
+
+    def from_sqs_records(self, sqs_msg):
+        """
+        retrieve the actual messages from a batch of SQS records with their SQS message ids
+
+        :param sqs_msg: dict - lambda event from SQS
+        :return: list - [(messageId, message dict)] in the same order as records
+        """
         result, errors = SingleJsonValidator().load_schema(self.SQS_MSG_SCHEMA).validate(sqs_msg)
         if result is False:
             raise ValueError(f'sqs_msg did not pass SQS_MSG_SCHEMA: {errors}')
 
-        # TODO validate sqs
         sns_msgs = []
-        for each_msg in sqs_msg['Records']:
-            sns_msg = json.loads(each_msg['body'])
-            result, errors = SingleJsonValidator().load_schema(self.SNS_MSG_SCHEMA).validate(sns_msg)
-            if result is False:
-                LOGGER.error(f'sns_msg did not pass SNS_MSG_SCHEMA: {errors}. msg: {sns_msg}')
+        self.__invalid_message_ids = []
+        self.__unresolved_message_ids = []
+        for i, each_msg in enumerate(sqs_msg['Records']):
+            message_id = each_msg['messageId'] if 'messageId' in each_msg else f'{i}'
+            try:
+                sns_msg = self.__retrieve_sns_msg(each_msg)
+            except Exception:
+                # retrying will not fix a malformed record. logging and skipping it like before.
+                LOGGER.exception(f'skipping invalid sqs record: {message_id}. record: {each_msg}')
+                self.__invalid_message_ids.append(message_id)
                 continue
-            sns_msgs.append(json.loads(sns_msg['Message']))
+            sns_msgs.append((message_id, self.__resolve_msg(message_id, sns_msg)))
         return sns_msgs
+
+    def from_sqs(self, sqs_msg):
+        return [k[1] for k in self.from_sqs_records(sqs_msg)]
+
+
+CompiledSchemaRegistry().warm_up([LambdaEventMsgRetriever.SQS_MSG_SCHEMA, LambdaEventMsgRetriever.SQS_RECORD_SCHEMA,
+                                  LambdaEventMsgRetriever.SNS_MSG_SCHEMA])
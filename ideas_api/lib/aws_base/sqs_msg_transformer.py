@@ -75,7 +75,7 @@ import json
 import logging
 from urllib.parse import unquote_plus
 
-from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator
+from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator, CompiledSchemaRegistry
 
 # from lsmd_lambda_functions.s3_records.s3_event_validator_abstract import S3EventValidatorAbstract
 # from lsmd_lambda_functions.utils.general_utils import GeneralUtils
@@ -139,3 +139,6 @@ class SqsMsgTransformer:
         sns_msg = event['Records'][0]['body']
         # TODO confirm that body is already SNS msg.
         return sns_msg
+
+
+CompiledSchemaRegistry().warm_up([SqsMsgTransformer.OUTER_SCHEMA, SqsMsgTransformer.S3_RECORD_SCHEMA])
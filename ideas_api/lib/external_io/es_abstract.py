@@ -16,6 +16,13 @@ from typing import Any, Union, Callable
 DEFAULT_TYPE = '_doc'
 
 
+class VersionConflictError(ValueError):
+    """
+    conditional write is rejected since the document is changed after it is read
+    """
+    pass
+
+
 class ESAbstract(ABC):
     @abstractmethod
     def create_index(self, index_name, index_body):
@@ -33,12 +40,50 @@ class ESAbstract(ABC):
     def delete_index(self, index_name):
         return
 
+    @abstractmethod
+    def put_index_template(self, template_name: str, template_body: dict):
+        """
+        :param template_name: str - name of the composable index template
+        :param template_body: dict - `index_patterns` with the `template` of settings and mappings for new matching indices
+        :return: bool - acknowledged or not
+        """
+        return
+
+    @abstractmethod
+    def rollover(self, alias_name: str, conditions: dict = None):
+        """
+        point the write alias to a new index. the new index name is the old one with its numeric suffix incremented.
+
+        :param alias_name: str - alias with a write index
+        :param conditions: dict - `max_size`, `max_age`, `max_docs`. it only rolls over if any of them is met. always if None
+        :return: bool - rolled over or not
+        """
+        return
+
+    @abstractmethod
+    def put_lifecycle_policy(self, policy_id: str, policy: dict):
+        """
+        create or replace an index state management policy
+
+        :param policy_id: str - policy id
+        :param policy: dict - policy with its states and `ism_template`
+        :return: bool - acknowledged or not
+        """
+        return
+
     @abstractmethod
     def index_many(self, docs=None, doc_ids=None, doc_dict=None, index=None):
         return
 
     @abstractmethod
-    def index_one(self, doc, doc_id, index=None):
+    def index_one(self, doc, doc_id, index=None, routing=None):
+        """
+        :param doc: dict - full document
+        :param doc_id: str - document id
+        :param index: str - index or alias
+        :param routing: str - shard routing value. required if the index mapping requires `_routing`
+        :return: self
+        """
         return
 
     @abstractmethod
@@ -46,7 +91,63 @@ class ESAbstract(ABC):
         return
 
     @abstractmethod
-    def update_one(self, doc, doc_id, index=None):
+    def update_one(self, doc, doc_id, index=None, if_seq_no=None, if_primary_term=None, routing=None, upsert=True):
+        """
+        :param doc: dict - partial document. it is inserted if it does not exist and `upsert` is True
+        :param doc_id: str - document id
+        :param index: str - index or alias
+        :param if_seq_no: int - only update it if the document still has this `_seq_no`. VersionConflictError otherwise
+        :param if_primary_term: int - `_primary_term` which is read together with `_seq_no`
+        :param routing: str - same as index_one
+        :param upsert: bool - False to only update an existing document. it fails if the document is missing
+        :return: int - `_seq_no` after the update. None if it fails for other reasons
+        """
+        return
+
+    @abstractmethod
+    def put_script(self, script_id: str, source: str):
+        """
+        :param script_id: str - id of the stored painless script
+        :param source: str - painless script source
+        :return: bool - acknowledged or not
+        """
+        return
+
+    @abstractmethod
+    def update_by_script(self, doc_id, script_id: str, params: dict, index=None, if_seq_no=None, if_primary_term=None, routing=None):
+        """
+        update a document inside ES with a stored script. no need to read it first.
+
+        :param doc_id: str - document id. it must exist
+        :param script_id: str - id of the stored script
+        :param params: dict - script parameters
+        :param index: str - index or alias
+        :param if_seq_no: int - same as update_one
+        :param if_primary_term: int - same as update_one
+        :param routing: str - same as index_one
+        :return: int - `_seq_no` after the update
+        """
+        return
+
+    @abstractmethod
+    def bulk_write(self, operations: list):
+        """
+        :param operations: list - [{'action': 'index' | 'update', 'index': str, 'id': str, 'doc': dict}]
+                                  update actions may have `if_seq_no` and `if_primary_term` as in update_one
+                                  update actions may have `script`: {'id': str, 'params': dict} instead of `doc`
+                                  update actions with `doc` may have `upsert`: False as in update_one
+                                  any action may have `routing` as in index_one
+        :return: list - bulk result items. errors are raised. VersionConflictError if any of them is a version conflict
+        """
+        return
+
+    @abstractmethod
+    def delete_by_query(self, dsl, index=None):
+        """
+        :param dsl: dict - query selecting the documents to delete
+        :param index: str - index or alias
+        :return: int - number of deleted documents
+        """
         return
 
     @staticmethod
@@ -59,13 +160,66 @@ class ESAbstract(ABC):
         return
 
     @abstractmethod
-    def query(self, dsl, querying_index=None):
+    def query(self, dsl, querying_index=None, routing=None):
+        """
+        :param dsl: dict - query
+        :param querying_index: str - index or alias
+        :param routing: str - only search the shard of this routing value. all shards if None
+        :return: dict - search result
+        """
         return
 
     @abstractmethod
     def query_pages(self, dsl, querying_index=None):
         return
 
+    @abstractmethod
+    def query_after(self, dsl, search_after: list = None, querying_index=None, routing=None):
+        """
+        :param dsl: dict - query with a unique `sort`
+        :param search_after: list - `sort` of the last hit in previous page. first page if None
+        :param querying_index: str - index or alias
+        :param routing: str - same as query
+        :return: dict - search result of a single page
+        """
+        return
+
+    @abstractmethod
+    def iter_pages(self, dsl, querying_index=None, routing=None):
+        """
+        :param dsl: dict - query with a unique `sort`. `size` is the page size
+        :param querying_index: str - index or alias
+        :param routing: str - same as query
+        :return: generator - hits of each page. only one page is in memory at a time
+        """
+        return
+
     @abstractmethod
     def query_by_id(self, doc_id, querying_index=None):
         return
+
+    @abstractmethod
+    def get_by_id(self, doc_id, index=None, includes: list = None, excludes: list = None, routing=None):
+        """
+        realtime document GET. no need to wait for a refresh after indexing it.
+
+        :param doc_id: str - document id
+        :param index: str - index or alias pointing to a single index
+        :param includes: list - `_source` fields to return. all fields if None
+        :param excludes: list - `_source` fields not to return
+        :param routing: str - same as index_one
+        :return: dict - document with `_id`, `_seq_no`, `_primary_term` and `_source`. None if it is not found
+        """
+        return
+
+    @abstractmethod
+    def mget(self, doc_ids: list, index=None, includes: list = None, excludes: list = None, routing=None):
+        """
+        :param doc_ids: list - document ids
+        :param index: str - index or alias pointing to a single index
+        :param includes: list - `_source` fields to return. all fields if None
+        :param excludes: list - `_source` fields not to return
+        :param routing: str - same as index_one. all documents must have the same routing value
+        :return: list - documents in the same order as doc_ids. None for the ones which are not found
+        """
+        return
@@ -10,19 +10,62 @@
 #  access to foreign persons.
 #  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+
+import logging
+from threading import Lock
+
 from ideas_api.lib.utils.factory_abstract import FactoryAbstract
 
+LOGGER = logging.getLogger(__name__)
+
 
 class ESFactory(FactoryAbstract):
     NO_AUTH = 'NO_AUTH'
     AWS = 'AWS'
+    ASYNC_NO_AUTH = 'ASYNC_NO_AUTH'
+    ASYNC_AWS = 'ASYNC_AWS'
+    __engine_pool = {}  # shared across all factories in this process. (class_type, base_url, port): engine
+    __engine_pool_lock = Lock()
 
-    def get_instance(self, class_type, **kwargs):
-        ct = class_type.upper()
+    def __get_es_class(self, ct):
         if ct == self.NO_AUTH:
             from ideas_api.lib.external_io.es_middleware import ESMiddleware
-            return ESMiddleware(kwargs['index'], kwargs['base_url'], port=kwargs['port'])
+            return ESMiddleware
         if ct == self.AWS:
             from ideas_api.lib.external_io.es_middleware_aws import EsMiddlewareAws
-            return EsMiddlewareAws(kwargs['index'], kwargs['base_url'], port=kwargs['port'])
+            return EsMiddlewareAws
+        if ct == self.ASYNC_NO_AUTH:
+            from ideas_api.lib.external_io.es_middleware_async import AsyncESMiddleware
+            return AsyncESMiddleware
+        if ct == self.ASYNC_AWS:
+            from ideas_api.lib.external_io.es_middleware_aws_async import AsyncEsMiddlewareAws
+            return AsyncEsMiddlewareAws
         raise ModuleNotFoundError(f'cannot find ES class for {ct}')
+
+    def get_instance(self, class_type, **kwargs):
+        es_class = self.__get_es_class(class_type.upper())
+        return es_class(kwargs['index'], kwargs['base_url'], port=kwargs['port'])
+
+    def get_pooled_instance(self, class_type, **kwargs):
+        """
+        same as get_instance. But the underlying ES client and its HTTP connections are reused
+        for the same (class_type, base_url, port) within this process.
+
+        :param class_type: str - NO_AUTH | AWS | ASYNC_NO_AUTH | ASYNC_AWS
+        :param kwargs: index, base_url, port
+        :return: ESAbstract
+        """
+        ct = class_type.upper()
+        es_class = self.__get_es_class(ct)
+        pool_key = (ct, kwargs['base_url'], kwargs['port'])
+        with self.__engine_pool_lock:
+            if pool_key not in self.__engine_pool:
+                LOGGER.debug(f'creating a new ES client for {pool_key}')
+                self.__engine_pool[pool_key] = es_class.create_engine(kwargs['base_url'], kwargs['port'])
+            engine = self.__engine_pool[pool_key]
+        return es_class(kwargs['index'], kwargs['base_url'], port=kwargs['port'], engine=engine)
+
+    def clear_pool(self):
+        with self.__engine_pool_lock:
+            self.__engine_pool.clear()
+        return self
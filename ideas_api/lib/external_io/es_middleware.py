@@ -14,29 +14,41 @@ import json
 import logging
 
 from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import ConflictError, NotFoundError
 
-from ideas_api.lib.external_io.es_abstract import ESAbstract, DEFAULT_TYPE
+from ideas_api.lib.external_io.es_abstract import ESAbstract, DEFAULT_TYPE, VersionConflictError
 
 LOGGER = logging.getLogger(__name__)
 
 
 class ESMiddleware(ESAbstract):
+    ISM_POLICY_PATH = '/_opendistro/_ism/policies'
 
-    def __init__(self, index, base_url, port=443) -> None:
+    def __init__(self, index, base_url, port=443, engine=None) -> None:
+        """
+        :param index: str - default index if it is not provided in each call
+        :param base_url: str - ES URL
+        :param port: int - ES port
+        :param engine: Elasticsearch - existing client to be reused. a new one is created if it is None
+        """
         if any([k is None for k in [index, base_url]]):
             raise ValueError(f'index or base_url is None')
         self.__index = index
+        self._engine = self.create_engine(base_url, port) if engine is None else engine
+
+    @staticmethod
+    def create_engine(base_url, port=443):
         base_url = base_url.replace('https://', '')  # hide https
-        self._engine = Elasticsearch(hosts=[{'host': base_url, 'port': port}])
+        return Elasticsearch(hosts=[{'host': base_url, 'port': port}])
 
-    def __validate_index(self, index):
+    def _validate_index(self, index):
         if index is not None:
             return index
         if self.__index is not None:
             return self.__index
         raise ValueError('index value is NULL')
 
-    def __get_doc_dict(self, docs=None, doc_ids=None, doc_dict=None):
+    def _get_doc_dict(self, docs=None, doc_ids=None, doc_dict=None):
         if doc_dict is None and (docs is None and doc_ids is None):
             raise ValueError('must provide either doc dictionary or doc list & id list')
         if doc_dict is None:  # it comes as a list
@@ -46,11 +58,10 @@ class ESMiddleware(ESAbstract):
             pass
         return doc_dict
 
-    def __check_errors_for_bulk(self, index_result):
+    def _check_errors_for_bulk(self, index_result):
         if 'errors' not in index_result or index_result['errors'] is False:
             return
-        err_list = [[{'id': v['_id'], 'error': v['error']} for _, v in each.items() if 'error' in v] for each in
-                    index_result['items']]
+        err_list = [{'id': v['_id'], 'status': v.get('status', None), 'error': v['error']} for each in index_result['items'] for _, v in each.items() if 'error' in v]
         if len(err_list) < 1:
             return
         LOGGER.exception('failed to add some items. details: {}'.format(err_list))
@@ -78,29 +89,113 @@ class ESMiddleware(ESAbstract):
             return result
         return result['acknowledged']
 
+    @staticmethod
+    def _get_routing_params(routing=None):
+        return {} if routing is None else {'routing': routing}
+
+    def put_index_template(self, template_name: str, template_body: dict):
+        result = self._engine.indices.put_index_template(name=template_name, body=template_body)
+        if 'acknowledged' not in result:
+            return result
+        return result['acknowledged']
+
+    def rollover(self, alias_name: str, conditions: dict = None):
+        result = self._engine.indices.rollover(alias=alias_name, body=None if conditions is None else {'conditions': conditions})
+        LOGGER.info(f'rollover of {alias_name}. result: {result}')
+        return result['rolled_over']
+
+    def put_lifecycle_policy(self, policy_id: str, policy: dict):
+        policy_path = f'{self.ISM_POLICY_PATH}/{policy_id}'
+        try:
+            existing_policy = self._engine.transport.perform_request('GET', policy_path)
+            concurrency_params = {'if_seq_no': existing_policy['_seq_no'], 'if_primary_term': existing_policy['_primary_term']}
+        except NotFoundError:
+            concurrency_params = {}  # a new policy
+        result = self._engine.transport.perform_request('PUT', policy_path, params=concurrency_params, body=policy)
+        LOGGER.debug(f'policy: {policy_id} is stored. result: {result}')
+        return '_id' in result
+
+    def _get_bulk_body(self, operations: list):
+        body = []
+        for each in operations:
+            action_meta = {'_index': self._validate_index(each['index'] if 'index' in each else None), '_id': each['id'],
+                           **self._get_routing_params(each.get('routing', None))}
+            if each['action'] == 'index':
+                body.append({'index': action_meta})
+                body.append(each['doc'])
+            elif each['action'] == 'update':
+                if each.get('if_seq_no', None) is not None:
+                    action_meta['if_seq_no'] = each['if_seq_no']
+                    action_meta['if_primary_term'] = each['if_primary_term']
+                else:
+                    action_meta['retry_on_conflict'] = 3
+                body.append({'update': action_meta})
+                body.append({'script': each['script']} if 'script' in each else {'doc': each['doc'], 'doc_as_upsert': each.get('upsert', True)})
+            else:
+                raise ValueError(f'unknown bulk action: {each["action"]}')
+        return body
+
+    def put_script(self, script_id: str, source: str):
+        result = self._engine.put_script(id=script_id, body={'script': {'lang': 'painless', 'source': source}})
+        if 'acknowledged' not in result:
+            return result
+        return result['acknowledged']
+
+    def update_by_script(self, doc_id, script_id: str, params: dict, index=None, if_seq_no=None, if_primary_term=None, routing=None):
+        index = self._validate_index(index)
+        concurrency_params = {'retry_on_conflict': 3} if if_seq_no is None else {'if_seq_no': if_seq_no, 'if_primary_term': if_primary_term}
+        try:
+            update_result = self._engine.update(index=index, id=doc_id, body={'script': {'id': script_id, 'params': params}},
+                                                doc_type=DEFAULT_TYPE, **concurrency_params, **self._get_routing_params(routing))
+        except ConflictError as ce:
+            raise VersionConflictError(f'id: {doc_id} for index: {index} is changed after seq_no: {if_seq_no}') from ce
+        LOGGER.debug('updated by script: {}. result: {}'.format(script_id, update_result))
+        return update_result['_seq_no']
+
+    def bulk_write(self, operations: list):
+        """
+        write documents across one or more indices in a single `_bulk` request
+
+        :param operations: list - [{'action': 'index' | 'update', 'index': str, 'id': str, 'doc': dict, 'routing': str}]
+        :return: list - bulk result items
+        """
+        if len(operations) < 1:
+            return []
+        bulk_result = self._engine.bulk(body=self._get_bulk_body(operations), doc_type=DEFAULT_TYPE)
+        return self._get_bulk_items(bulk_result)
+
+    def _get_bulk_items(self, bulk_result):
+        LOGGER.debug('bulk written. result: {}'.format(bulk_result))
+        err_list = self._check_errors_for_bulk(bulk_result)
+        if err_list:
+            if any([k['status'] == 409 for k in err_list]):
+                raise VersionConflictError(f'version conflict for some items in bulk: {err_list}')
+            raise ValueError(f'failed to write some items in bulk: {err_list}')
+        return bulk_result['items']
+
     def index_many(self, docs=None, doc_ids=None, doc_dict=None, index=None):
-        doc_dict = self.__get_doc_dict(docs, doc_ids, doc_dict)
+        doc_dict = self._get_doc_dict(docs, doc_ids, doc_dict)
+        index = self._validate_index(index)
         body = []
         for k, v in doc_dict.items():
-            body.append({'index': {'_index': index, '_id': k, 'retry_on_conflict': 3}})
+            body.append({'index': {'_index': index, '_id': k}})
             body.append(v)
             pass
-        index = self.__validate_index(index)
         try:
             index_result = self._engine.bulk(index=index,
                                               body=body, doc_type=DEFAULT_TYPE)
             LOGGER.info('indexed. result: {}'.format(index_result))
-            return self.__check_errors_for_bulk(index_result)
+            return self._check_errors_for_bulk(index_result)
         except:
             LOGGER.exception('cannot add indices with ids: {} for index: {}'.format(list(doc_dict.keys()), index))
             return doc_dict
         return
 
-    def index_one(self, doc, doc_id, index=None):
-        index = self.__validate_index(index)
+    def index_one(self, doc, doc_id, index=None, routing=None):
+        index = self._validate_index(index)
         try:
             index_result = self._engine.index(index=index,
-                                              body=doc, doc_type=DEFAULT_TYPE, id=doc_id)
+                                              body=doc, doc_type=DEFAULT_TYPE, id=doc_id, **self._get_routing_params(routing))
             LOGGER.info('indexed. result: {}'.format(index_result))
         except Exception as e:
             LOGGER.exception('cannot add a new index with id: {} for index: {}'.format(doc_id, index))
@@ -108,38 +203,37 @@ class ESMiddleware(ESAbstract):
         return self
 
     def update_many(self, docs=None, doc_ids=None, doc_dict=None, index=None):
-        doc_dict = self.__get_doc_dict(docs, doc_ids, doc_dict)
-        body = []
-        for k, v in doc_dict.items():
-            body.append({'update': {'_index': index, '_id': k, 'retry_on_conflict': 3}})
-            body.append({'doc': v, 'doc_as_upsert': True})
-            pass
-        index = self.__validate_index(index)
+        doc_dict = self._get_doc_dict(docs, doc_ids, doc_dict)
+        index = self._validate_index(index)
+        body = self._get_bulk_body([{'action': 'update', 'index': index, 'id': k, 'doc': v} for k, v in doc_dict.items()])
         try:
             index_result = self._engine.bulk(index=index,
                                              body=body, doc_type=DEFAULT_TYPE)
             LOGGER.info('indexed. result: {}'.format(index_result))
-            return self.__check_errors_for_bulk(index_result)
+            return self._check_errors_for_bulk(index_result)
         except:
             LOGGER.exception('cannot update indices with ids: {} for index: {}'.format(list(doc_dict.keys()),
                                                                                              index))
             return doc_dict
         return
 
-    def update_one(self, doc, doc_id, index=None):
+    def update_one(self, doc, doc_id, index=None, if_seq_no=None, if_primary_term=None, routing=None, upsert=True):
         update_body = {
             'doc': doc,
-            'doc_as_upsert': True
+            'doc_as_upsert': upsert
         }
-        index = self.__validate_index(index)
+        index = self._validate_index(index)
+        concurrency_params = {} if if_seq_no is None else {'if_seq_no': if_seq_no, 'if_primary_term': if_primary_term}
         try:
             update_result = self._engine.update(index=index,
-                                                id=doc_id, body=update_body, doc_type=DEFAULT_TYPE)
+                                                id=doc_id, body=update_body, doc_type=DEFAULT_TYPE, **concurrency_params, **self._get_routing_params(routing))
             LOGGER.info('updated. result: {}'.format(update_result))
+        except ConflictError as ce:
+            raise VersionConflictError(f'id: {doc_id} for index: {index} is changed after seq_no: {if_seq_no}') from ce
         except:
             LOGGER.exception('cannot update id: {} for index: {}'.format(doc_id, index))
             return None
-        return self
+        return update_result['_seq_no']
 
     @staticmethod
     def get_result_size(result):
@@ -150,7 +244,7 @@ class ESMiddleware(ESAbstract):
 
     def query_with_scroll(self, dsl, querying_index=None):
         scroll_timeout = '30s'
-        index = self.__validate_index(querying_index)
+        index = self._validate_index(querying_index)
         dsl['size'] = 10000  # replacing with the maximum size to minimize number of scrolls
         params = {
             'index': index,
@@ -173,11 +267,11 @@ class ESMiddleware(ESAbstract):
                 first_batch['hits']['hits'].extend(scrolled_result['hits']['hits'])
         return first_batch
 
-    def query(self, dsl, querying_index=None):
-        index = self.__validate_index(querying_index)
-        return self._engine.search(body=dsl, index=index)
+    def query(self, dsl, querying_index=None, routing=None):
+        index = self._validate_index(querying_index)
+        return self._engine.search(body=dsl, index=index, **self._get_routing_params(routing))
 
-    def __is_querying_next_page(self, targeted_size: int, current_size: int, total_size: int):
+    def _is_querying_next_page(self, targeted_size: int, current_size: int, total_size: int):
         if targeted_size < 0:
             return current_size > 0
         return current_size > 0 and total_size < targeted_size
@@ -185,7 +279,7 @@ class ESMiddleware(ESAbstract):
     def query_pages(self, dsl, querying_index=None):
         if 'sort' not in dsl:
             raise ValueError('missing `sort` in DSL. Make sure sorting is unique')
-        index = self.__validate_index(querying_index)
+        index = self._validate_index(querying_index)
         targeted_size = dsl['size'] if 'size' in dsl else -1
         dsl['size'] = 10000  # replacing with the maximum size to minimize number of scrolls
         params = {
@@ -200,7 +294,7 @@ class ESMiddleware(ESAbstract):
         result_list.extend(result_batch['hits']['hits'])
         current_size = len(result_batch['hits']['hits'])
         total_size += current_size
-        while self.__is_querying_next_page(targeted_size, current_size, total_size):
+        while self._is_querying_next_page(targeted_size, current_size, total_size):
             params['body']['search_after'] = result_batch['hits']['hits'][-1]['sort']
             result_batch = self._engine.search(**params)
             result_list.extend(result_batch['hits']['hits'])
@@ -213,14 +307,59 @@ class ESMiddleware(ESAbstract):
             }
         }
 
+    def query_after(self, dsl, search_after: list = None, querying_index=None, routing=None):
+        if 'sort' not in dsl:
+            raise ValueError('missing `sort` in DSL. Make sure sorting is unique')
+        index = self._validate_index(querying_index)
+        body = dsl if search_after is None else {**dsl, 'search_after': search_after}
+        return self._engine.search(index=index, body=body, **self._get_routing_params(routing))
+
+    def iter_pages(self, dsl, querying_index=None, routing=None):
+        page_size = dsl['size'] if 'size' in dsl else 1000
+        search_after = None
+        while True:
+            current_hits = self.query_after({**dsl, 'size': page_size}, search_after, querying_index, routing)['hits']['hits']
+            if len(current_hits) > 0:
+                yield current_hits
+            if len(current_hits) < page_size:
+                return
+            search_after = current_hits[-1]['sort']
+
+    def delete_by_query(self, dsl, index=None):
+        index = self._validate_index(index)
+        result = self._engine.delete_by_query(index=index, body=dsl)
+        if len(result['failures']) > 0:
+            raise ValueError(f'failed to delete some documents: {result["failures"]}')
+        return result['deleted']
+
     def query_by_id(self, doc_id, querying_index=None):
-        index = self.__validate_index(querying_index)
-        dsl = {
-            'query': {
-                'term': {'_id': doc_id}
-            }
-        }
-        result = self._engine.search(index=index, body=dsl)
-        if self.get_result_size(result) < 1:
+        return self.get_by_id(doc_id, querying_index)
+
+    @staticmethod
+    def _get_source_params(includes: list = None, excludes: list = None):
+        source_params = {}
+        if includes is not None:
+            source_params['_source_includes'] = includes
+        if excludes is not None:
+            source_params['_source_excludes'] = excludes
+        return source_params
+
+    def get_by_id(self, doc_id, index=None, includes: list = None, excludes: list = None, routing=None):
+        index = self._validate_index(index)
+        result = self._engine.get(index=index, id=doc_id, ignore=404, **self._get_source_params(includes, excludes), **self._get_routing_params(routing))
+        return self._get_found_doc(result, doc_id, index)
+
+    @staticmethod
+    def _get_found_doc(result, doc_id, index):
+        if 'error' in result:
+            raise ValueError(f'failed to get document: {doc_id} from {index}. details: {result["error"]}')
+        if result['found'] is False:
             return None
-        return result['hits']['hits'][0]
+        return result
+
+    def mget(self, doc_ids: list, index=None, includes: list = None, excludes: list = None, routing=None):
+        index = self._validate_index(index)
+        if len(doc_ids) < 1:
+            return []
+        result = self._engine.mget(body={'ids': doc_ids}, index=index, **self._get_source_params(includes, excludes), **self._get_routing_params(routing))
+        return [k if k.get('found', False) is True else None for k in result['docs']]
@@ -0,0 +1,220 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import logging
+
+from elasticsearch.exceptions import ConflictError, NotFoundError
+
+from ideas_api.lib.external_io.es_abstract import DEFAULT_TYPE, VersionConflictError
+from ideas_api.lib.external_io.es_middleware import ESMiddleware
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncESMiddleware(ESMiddleware):
+    """
+    same calls as ESMiddleware on the asyncio ES client. every call which goes to ES is a coroutine.
+    iter_pages is an async generator.
+
+    it needs `aiohttp` which comes with `elasticsearch[async]`.
+    """
+
+    @staticmethod
+    def create_engine(base_url, port=443):
+        from elasticsearch import AsyncElasticsearch  # only exported if aiohttp is installed
+        base_url = base_url.replace('https://', '')  # hide https
+        return AsyncElasticsearch(hosts=[{'host': base_url, 'port': port}])
+
+    @staticmethod
+    def __get_acknowledged(result):
+        if 'acknowledged' not in result:
+            return result
+        return result['acknowledged']
+
+    async def close(self):
+        await self._engine.close()
+        return
+
+    async def create_index(self, index_name, index_body):
+        return self.__get_acknowledged(await self._engine.indices.create(index=index_name, body=index_body, include_type_name=False))
+
+    async def has_index(self, index_name):
+        return await self._engine.indices.exists(index=index_name)
+
+    async def create_alias(self, index_name, alias_name):
+        return self.__get_acknowledged(await self._engine.indices.put_alias(index_name, alias_name))
+
+    async def delete_index(self, index_name):
+        return self.__get_acknowledged(await self._engine.indices.delete(index_name))
+
+    async def put_index_template(self, template_name: str, template_body: dict):
+        return self.__get_acknowledged(await self._engine.indices.put_index_template(name=template_name, body=template_body))
+
+    async def rollover(self, alias_name: str, conditions: dict = None):
+        result = await self._engine.indices.rollover(alias=alias_name, body=None if conditions is None else {'conditions': conditions})
+        LOGGER.info(f'rollover of {alias_name}. result: {result}')
+        return result['rolled_over']
+
+    async def put_lifecycle_policy(self, policy_id: str, policy: dict):
+        policy_path = f'{self.ISM_POLICY_PATH}/{policy_id}'
+        try:
+            existing_policy = await self._engine.transport.perform_request('GET', policy_path)
+            concurrency_params = {'if_seq_no': existing_policy['_seq_no'], 'if_primary_term': existing_policy['_primary_term']}
+        except NotFoundError:
+            concurrency_params = {}  # a new policy
+        result = await self._engine.transport.perform_request('PUT', policy_path, params=concurrency_params, body=policy)
+        return '_id' in result
+
+    async def put_script(self, script_id: str, source: str):
+        return self.__get_acknowledged(await self._engine.put_script(id=script_id, body={'script': {'lang': 'painless', 'source': source}}))
+
+    async def update_by_script(self, doc_id, script_id: str, params: dict, index=None, if_seq_no=None, if_primary_term=None, routing=None):
+        index = self._validate_index(index)
+        concurrency_params = {'retry_on_conflict': 3} if if_seq_no is None else {'if_seq_no': if_seq_no, 'if_primary_term': if_primary_term}
+        try:
+            update_result = await self._engine.update(index=index, id=doc_id, body={'script': {'id': script_id, 'params': params}},
+                                                      doc_type=DEFAULT_TYPE, **concurrency_params, **self._get_routing_params(routing))
+        except ConflictError as ce:
+            raise VersionConflictError(f'id: {doc_id} for index: {index} is changed after seq_no: {if_seq_no}') from ce
+        return update_result['_seq_no']
+
+    async def bulk_write(self, operations: list):
+        if len(operations) < 1:
+            return []
+        return self._get_bulk_items(await self._engine.bulk(body=self._get_bulk_body(operations), doc_type=DEFAULT_TYPE))
+
+    async def index_many(self, docs=None, doc_ids=None, doc_dict=None, index=None):
+        doc_dict = self._get_doc_dict(docs, doc_ids, doc_dict)
+        index = self._validate_index(index)
+        body = self._get_bulk_body([{'action': 'index', 'index': index, 'id': k, 'doc': v} for k, v in doc_dict.items()])
+        try:
+            return self._check_errors_for_bulk(await self._engine.bulk(index=index, body=body, doc_type=DEFAULT_TYPE))
+        except:
+            LOGGER.exception('cannot add indices with ids: {} for index: {}'.format(list(doc_dict.keys()), index))
+            return doc_dict
+
+    async def index_one(self, doc, doc_id, index=None, routing=None):
+        index = self._validate_index(index)
+        try:
+            index_result = await self._engine.index(index=index, body=doc, doc_type=DEFAULT_TYPE, id=doc_id, **self._get_routing_params(routing))
+            LOGGER.info('indexed. result: {}'.format(index_result))
+        except Exception as e:
+            LOGGER.exception('cannot add a new index with id: {} for index: {}'.format(doc_id, index))
+            raise e
+        return self
+
+    async def update_many(self, docs=None, doc_ids=None, doc_dict=None, index=None):
+        doc_dict = self._get_doc_dict(docs, doc_ids, doc_dict)
+        index = self._validate_index(index)
+        body = self._get_bulk_body([{'action': 'update', 'index': index, 'id': k, 'doc': v} for k, v in doc_dict.items()])
+        try:
+            return self._check_errors_for_bulk(await self._engine.bulk(index=index, body=body, doc_type=DEFAULT_TYPE))
+        except:
+            LOGGER.exception('cannot update indices with ids: {} for index: {}'.format(list(doc_dict.keys()), index))
+            return doc_dict
+
+    async def update_one(self, doc, doc_id, index=None, if_seq_no=None, if_primary_term=None, routing=None, upsert=True):
+        index = self._validate_index(index)
+        concurrency_params = {} if if_seq_no is None else {'if_seq_no': if_seq_no, 'if_primary_term': if_primary_term}
+        try:
+            update_result = await self._engine.update(index=index, id=doc_id, body={'doc': doc, 'doc_as_upsert': upsert}, doc_type=DEFAULT_TYPE,
+                                                      **concurrency_params, **self._get_routing_params(routing))
+        except ConflictError as ce:
+            raise VersionConflictError(f'id: {doc_id} for index: {index} is changed after seq_no: {if_seq_no}') from ce
+        except:
+            LOGGER.exception('cannot update id: {} for index: {}'.format(doc_id, index))
+            return None
+        return update_result['_seq_no']
+
+    async def query_with_scroll(self, dsl, querying_index=None):
+        scroll_timeout = '30s'
+        index = self._validate_index(querying_index)
+        dsl['size'] = 10000  # replacing with the maximum size to minimize number of scrolls
+        first_batch = await self._engine.search(index=index, size=10000, scroll=scroll_timeout, body=dsl)
+        total_size = self.get_result_size(first_batch)
+        current_size = len(first_batch['hits']['hits'])
+        scroll_id = first_batch['_scroll_id']
+        while current_size < total_size:  # need to scroll
+            scrolled_result = await self._engine.scroll(scroll_id=scroll_id, scroll=scroll_timeout)
+            scroll_id = scrolled_result['_scroll_id']
+            if len(scrolled_result['hits']['hits']) == 0:
+                break
+            current_size += len(scrolled_result['hits']['hits'])
+            first_batch['hits']['hits'].extend(scrolled_result['hits']['hits'])
+        return first_batch
+
+    async def query(self, dsl, querying_index=None, routing=None):
+        index = self._validate_index(querying_index)
+        return await self._engine.search(body=dsl, index=index, **self._get_routing_params(routing))
+
+    async def query_pages(self, dsl, querying_index=None):
+        if 'sort' not in dsl:
+            raise ValueError('missing `sort` in DSL. Make sure sorting is unique')
+        index = self._validate_index(querying_index)
+        targeted_size = dsl['size'] if 'size' in dsl else -1
+        dsl['size'] = 10000  # replacing with the maximum size to minimize number of scrolls
+        result_batch = await self._engine.search(index=index, size=10000, body=dsl)
+        result_list = list(result_batch['hits']['hits'])
+        current_size = len(result_batch['hits']['hits'])
+        total_size = current_size
+        while self._is_querying_next_page(targeted_size, current_size, total_size):
+            dsl['search_after'] = result_batch['hits']['hits'][-1]['sort']
+            result_batch = await self._engine.search(index=index, size=10000, body=dsl)
+            result_list.extend(result_batch['hits']['hits'])
+            current_size = len(result_batch['hits']['hits'])
+            total_size += current_size
+        return {
+            'hits': {
+                'hits': result_list,
+                'total': total_size,
+            }
+        }
+
+    async def query_after(self, dsl, search_after: list = None, querying_index=None, routing=None):
+        if 'sort' not in dsl:
+            raise ValueError('missing `sort` in DSL. Make sure sorting is unique')
+        index = self._validate_index(querying_index)
+        body = dsl if search_after is None else {**dsl, 'search_after': search_after}
+        return await self._engine.search(index=index, body=body, **self._get_routing_params(routing))
+
+    async def iter_pages(self, dsl, querying_index=None, routing=None):
+        page_size = dsl['size'] if 'size' in dsl else 1000
+        search_after = None
+        while True:
+            current_hits = (await self.query_after({**dsl, 'size': page_size}, search_after, querying_index, routing))['hits']['hits']
+            if len(current_hits) > 0:
+                yield current_hits
+            if len(current_hits) < page_size:
+                return
+            search_after = current_hits[-1]['sort']
+
+    async def delete_by_query(self, dsl, index=None):
+        index = self._validate_index(index)
+        result = await self._engine.delete_by_query(index=index, body=dsl)
+        if len(result['failures']) > 0:
+            raise ValueError(f'failed to delete some documents: {result["failures"]}')
+        return result['deleted']
+
+    async def query_by_id(self, doc_id, querying_index=None):
+        return await self.get_by_id(doc_id, querying_index)
+
+    async def get_by_id(self, doc_id, index=None, includes: list = None, excludes: list = None, routing=None):
+        index = self._validate_index(index)
+        result = await self._engine.get(index=index, id=doc_id, ignore=404, **self._get_source_params(includes, excludes), **self._get_routing_params(routing))
+        return self._get_found_doc(result, doc_id, index)
+
+    async def mget(self, doc_ids: list, index=None, includes: list = None, excludes: list = None, routing=None):
+        index = self._validate_index(index)
+        if len(doc_ids) < 1:
+            return []
+        result = await self._engine.mget(body={'ids': doc_ids}, index=index, **self._get_source_params(includes, excludes), **self._get_routing_params(routing))
+        return [k if k.get('found', False) is True else None for k in result['docs']]
@@ -13,25 +13,25 @@
 import logging
 
 from elasticsearch import Elasticsearch, RequestsHttpConnection
+from ideas_api.lib.aws_base.aws_constants import AwsConstants
 from ideas_api.lib.aws_base.aws_cred import AwsCred
+from ideas_api.lib.aws_base.aws_sigv4_auth import AwsSigV4Auth
 from ideas_api.lib.external_io.es_middleware import ESMiddleware
-from requests_aws4auth import AWS4Auth
 
 LOGGER = logging.getLogger(__name__)
 
 
 class EsMiddlewareAws(ESMiddleware):
 
-    def __init__(self, index, base_url, port=443) -> None:
-        super().__init__(index, base_url, port)
+    @staticmethod
+    def create_engine(base_url, port=443):
         base_url = base_url.replace('https://', '')  # hide https
-        self._index = index
         aws_cred = AwsCred()
-        service = 'es'
         credentials = aws_cred.get_session().get_credentials()
-        aws_auth = AWS4Auth(credentials.access_key, credentials.secret_key, aws_cred.region, service,
-                            session_token=credentials.token)
-        self._engine = Elasticsearch(
+        if credentials is None:
+            raise ValueError('unable to find AWS credentials to sign ES requests')
+        aws_auth = AwsSigV4Auth(credentials, aws_cred.region, AwsConstants.opensearch)
+        return Elasticsearch(
             hosts=[{'host': base_url, 'port': port}],
             http_auth=aws_auth,
             use_ssl=True,
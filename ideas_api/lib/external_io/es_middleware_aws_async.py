@@ -0,0 +1,59 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import logging
+
+from elasticsearch import AsyncElasticsearch, AIOHttpConnection
+from elasticsearch.compat import urlencode
+
+from ideas_api.lib.aws_base.aws_constants import AwsConstants
+from ideas_api.lib.aws_base.aws_cred import AwsCred
+from ideas_api.lib.aws_base.aws_sigv4_auth import AwsSigV4Auth
+from ideas_api.lib.external_io.es_middleware_async import AsyncESMiddleware
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AwsSigV4AIOHttpConnection(AIOHttpConnection):
+    """
+    aiohttp has no auth hook like `requests`. So each request is signed here before it is sent.
+    """
+    def __init__(self, *args, aws_auth: AwsSigV4Auth = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if aws_auth is None:
+            raise ValueError('missing aws_auth to sign ES requests')
+        self.__aws_auth = aws_auth
+
+    async def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        query_string = f'?{urlencode(params)}' if params else ''
+        signing_method = 'GET' if method == 'HEAD' else method  # aiohttp connection sends HEAD as GET
+        signed_headers = self.__aws_auth.get_signed_headers(signing_method, f'{self.host}{self.url_prefix}{url}{query_string}', body,
+                                                            {**self.headers, **({} if headers is None else headers)})
+        return await super().perform_request(method, url, params, body, timeout, ignore, signed_headers)
+
+
+class AsyncEsMiddlewareAws(AsyncESMiddleware):
+
+    @staticmethod
+    def create_engine(base_url, port=443):
+        base_url = base_url.replace('https://', '')  # hide https
+        aws_cred = AwsCred()
+        credentials = aws_cred.get_session().get_credentials()
+        if credentials is None:
+            raise ValueError('unable to find AWS credentials to sign ES requests')
+        return AsyncElasticsearch(
+            hosts=[{'host': base_url, 'port': port}],
+            aws_auth=AwsSigV4Auth(credentials, aws_cred.region, AwsConstants.opensearch),
+            use_ssl=True,
+            verify_certs=True,
+            connection_class=AwsSigV4AIOHttpConnection
+        )
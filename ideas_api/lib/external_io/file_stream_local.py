@@ -138,8 +138,8 @@ class FileStreamLocal(FileStreamAbstract):
     def bytes_upload(self, base_path: str, relative_parent_path: str, content: bytes):
         abs_filepath = os.path.join(base_path, relative_parent_path)
         FileUtils.mk_dir_p(os.path.dirname(abs_filepath))
-        with open(abs_filepath, 'w') as ff:
-            ff.write(content.decode())
+        with open(abs_filepath, 'wb') as ff:
+            ff.write(content)
         return abs_filepath
 
     def list_recursively(self, base_path: str, relative_parent_path: str, additional_checks=lambda x: True, with_versions: bool=False):
@@ -315,4 +315,5 @@ class FileStreamS3(FileStreamAbstract):
                                         ServerSideEncryption='AES256')
         except BaseException:
             LOGGER.exception(f'failed to upload stream to {base_path}:{relative_parent_path}')
+            raise
         return True
@@ -0,0 +1,108 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+import json
+import logging
+from hashlib import sha256
+
+from ideas_api.lib.external_io.file_stream_abstract import FileStreamAbstract
+from ideas_api.lib.external_io.file_stream_factory import FileStreamFactory
+from ideas_api.lib.utils.config import Config
+
+LOGGER = logging.getLogger(__name__)
+
+
+class MsgClaimCheck:
+    """
+    messages larger than the threshold are stored in a file repository. only a pointer with the digest is published.
+    the pointer keeps the routing keys so that filter policies still work.
+    the file stream and the config are only loaded when a message is stored or resolved.
+    """
+    POINTER_FIELD = 'claimCheck'
+    ROUTING_KEYS = ['messageType', 'jobID', 'processID', 'stage']
+    DEFAULT_THRESHOLD = 60 * 1024  # bytes. SNS charges every 64 KB chunk as 1 request. a few KB are left for attributes.
+    KEY_PREFIX = 'claim_check'
+
+    def __init__(self, file_stream: FileStreamAbstract = None, base_path: str = None, threshold: int = None):
+        """
+        :param file_stream: FileStreamAbstract - S3 from `CLAIM_CHECK_FILE_REPO` if None
+        :param base_path: str - bucket or local directory. `CLAIM_CHECK_BUCKET` if None
+        :param threshold: int - max size of a message in bytes which is published as it is. `CLAIM_CHECK_THRESHOLD` if None
+        """
+        self.__file_stream = file_stream
+        self.__base_path = base_path
+        self.__threshold = threshold
+
+    @property
+    def threshold(self):
+        if self.__threshold is None:
+            self.__threshold = int(Config().get_value(Config.CLAIM_CHECK_THRESHOLD, str(self.DEFAULT_THRESHOLD)))
+        return self.__threshold
+
+    def __get_file_stream(self):
+        if self.__file_stream is None:
+            self.__file_stream = FileStreamFactory().get_instance(Config().get_value(Config.CLAIM_CHECK_FILE_REPO, 'S3'))
+        return self.__file_stream
+
+    def __get_base_path(self):
+        if self.__base_path is None:
+            self.__base_path = Config().get_value(Config.CLAIM_CHECK_BUCKET, '')
+        if self.__base_path == '':
+            raise ValueError(f'missing {Config.CLAIM_CHECK_BUCKET} to store large messages')
+        return self.__base_path
+
+    @staticmethod
+    def is_pointer(msg: dict):
+        return MsgClaimCheck.POINTER_FIELD in msg
+
+    def check_in(self, msg: dict):
+        """
+        :param msg: dict - message to be published
+        :return: dict - the same message if it is small enough. a pointer otherwise
+        """
+        msg_bytes = json.dumps(msg).encode()
+        if len(msg_bytes) <= self.threshold:
+            return msg
+        digest = sha256(msg_bytes).hexdigest()
+        relative_path = f'{self.KEY_PREFIX}/{msg.get("jobID", "NA")}/{digest}.json'  # same content is stored at the same key when retried
+        file_stream = self.__get_file_stream()
+        file_stream.bytes_upload(self.__get_base_path(), relative_path, msg_bytes)
+        LOGGER.debug(f'stored message of {len(msg_bytes)} bytes at {relative_path}')
+        return {
+            **{k: msg[k] for k in self.ROUTING_KEYS if k in msg},
+            self.POINTER_FIELD: {
+                'url': file_stream.to_url(self.__get_base_path(), relative_path),
+                'sha256': digest,
+                'size': len(msg_bytes),
+            },
+        }
+
+    def check_out(self, msg: dict):
+        """
+        :param msg: dict - received message
+        :return: dict - the stored message if it is a pointer. the same message otherwise
+        """
+        if not self.is_pointer(msg):
+            return msg
+        pointer = msg[self.POINTER_FIELD]
+        file_stream = self.__get_file_stream()
+        base_path, relative_path = file_stream.split_url(pointer['url'])
+        stream = file_stream.get_stream(base_path, relative_path)
+        try:
+            msg_bytes = stream.read()
+        finally:
+            stream.close()
+        digest = sha256(msg_bytes).hexdigest()
+        if digest != pointer['sha256']:
+            raise ValueError(f'mismatched digest of stored message: {pointer["url"]}. expected: {pointer["sha256"]}. actual: {digest}')
+        return json.loads(msg_bytes)
@@ -10,16 +10,99 @@
 #  access to foreign persons.
 #  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+import asyncio
+import logging
+import time
 from abc import ABC, abstractmethod
 
+LOGGER = logging.getLogger(__name__)
+
+
+class PublishManyError(ValueError):
+    """
+    some messages are not published after all attempts
+    """
+    def __init__(self, message: str, failed: dict):
+        """
+        :param message: str - error message
+        :param failed: dict - index of the message in `publish_many` => failure reason
+        """
+        super().__init__(message)
+        self.failed = failed
+
 
 class PubSubAbstract(ABC):
+    BATCH_SIZE = 10  # max entries in an SNS PublishBatch request
+    MAX_ATTEMPTS = 3
+    RETRY_BASE_DELAY = 0.1  # seconds. doubled after each attempt
+
     @abstractmethod
     def set_channel(self, channel_id):
         return self
 
+    @staticmethod
+    def get_attributes(msg: dict, keys: list):
+        """
+        :param msg: dict - message before it is serialized
+        :param keys: list - keys to be copied as attributes
+        :return: dict - str => str. missing or empty values are skipped
+        """
+        return {k: str(msg[k]) for k in keys if msg.get(k, None) not in [None, '']}
+
+    @abstractmethod
+    def publish_msg(self, msg: str, attributes: dict = None):
+        """
+        :param msg: str - message
+        :param attributes: dict - str => str. subscribers can filter on them without parsing the message. optional
+        """
+        return self
+
+    async def publish_msg_async(self, msg: str, attributes: dict = None):
+        """
+        same as publish_msg without blocking the event loop. the blocking call runs in the default executor.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.publish_msg, msg, attributes)
+
     @abstractmethod
-    def publish_msg(self, msg: str):
+    def publish_batch(self, msgs: list, attributes: list):
+        """
+        publish at most BATCH_SIZE messages in 1 request
+
+        :param msgs: list - messages as str
+        :param attributes: list - attributes of each message as dict. str => str
+        :return: list - failed entries as (index in `msgs`, reason: str, retryable: bool)
+        """
+        return []
+
+    def publish_many(self, msgs: list, attributes: list = None):
+        """
+        publish messages in batches of BATCH_SIZE. failed entries are retried if they are retryable.
+
+        :param msgs: list - messages as str
+        :param attributes: list - attributes of each message as dict. str => str. optional
+        :return: self. PublishManyError is raised with the failed indices if some are still not published
+        """
+        attributes = [{} for _ in msgs] if attributes is None else attributes
+        if len(attributes) != len(msgs):
+            raise ValueError(f'mismatched length of msgs and attributes: {len(msgs)} vs {len(attributes)}')
+        pending = list(range(len(msgs)))
+        failed = {}
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            retrying = {}
+            for i in range(0, len(pending), self.BATCH_SIZE):
+                batch = pending[i: i + self.BATCH_SIZE]
+                for batch_index, reason, retryable in self.publish_batch([msgs[k] for k in batch], [attributes[k] for k in batch]):
+                    (retrying if retryable else failed)[batch[batch_index]] = reason
+            pending = sorted(retrying.keys())
+            if len(pending) < 1:
+                break
+            if attempt >= self.MAX_ATTEMPTS:
+                failed.update(retrying)
+                break
+            LOGGER.info(f'retrying {len(pending)} failed messages. attempt: {attempt}')
+            time.sleep(self.RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+        if len(failed) > 0:
+            raise PublishManyError(f'failed to publish {len(failed)} of {len(msgs)} messages: {failed}', failed)
         return self
 
     @abstractmethod
@@ -12,6 +12,7 @@
 
 import logging
 
+from ideas_api.lib.external_io.pub_sub_memory import PubSubMemory
 from ideas_api.lib.external_io.pub_sub_sns import PubSubSns
 from ideas_api.lib.utils.factory_abstract import FactoryAbstract
 
@@ -23,4 +24,6 @@ class PubSubFactory(FactoryAbstract):
         fr = pub_sub_type.upper()
         if fr == 'SNS':
             return PubSubSns()
+        if fr == 'MEMORY':
+            return PubSubMemory()
         raise ModuleNotFoundError(f'cannot find FileStream class for {fr}')
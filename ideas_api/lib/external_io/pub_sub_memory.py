@@ -0,0 +1,58 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from collections import defaultdict
+
+from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract
+
+
+class PubSubMemory(PubSubAbstract):
+    """
+    in-memory stand-in for SNS. published messages are kept per channel.
+    failures can be injected per message to test retries.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__channel_id = ''
+        self.channels = defaultdict(list)  # channel id => list of (msg, attributes)
+        self.batches = []  # number of messages in each publish_batch call
+        self.failing_msgs = {}  # msg => (number of failing attempts, retryable)
+
+    def set_channel(self, channel_id):
+        self.__channel_id = channel_id
+        return self
+
+    @property
+    def msgs(self):
+        return [k for k, _ in self.channels[self.__channel_id]]
+
+    def publish_msg(self, msg: str, attributes: dict = None):
+        self.channels[self.__channel_id].append((msg, {} if attributes is None else attributes))
+        return self
+
+    def publish_batch(self, msgs: list, attributes: list):
+        if len(msgs) > self.BATCH_SIZE:
+            raise ValueError(f'too many messages in a batch: {len(msgs)}')
+        self.batches.append(len(msgs))
+        failed = []
+        for i, (msg, msg_attributes) in enumerate(zip(msgs, attributes)):
+            failing_count, retryable = self.failing_msgs.get(msg, (0, True))
+            if failing_count > 0:
+                self.failing_msgs[msg] = (failing_count - 1, retryable)
+                failed.append((i, 'injected failure', retryable))
+                continue
+            self.channels[self.__channel_id].append((msg, msg_attributes))
+        return failed
+
+    def subscribe(self):
+        return list(self.channels[self.__channel_id])
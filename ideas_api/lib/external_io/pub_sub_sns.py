@@ -10,25 +10,49 @@
 #  access to foreign persons.
 #  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+import json
+import logging
+from threading import Lock
+
 from ideas_api.lib.aws_base.aws_constants import AwsConstants
 from ideas_api.lib.aws_base.aws_cred import AwsCred
 from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract
 
+LOGGER = logging.getLogger(__name__)
+
 
 class PubSubSns(PubSubAbstract):
+    __sns_clients = {}  # boto3 clients are thread safe. 1 client per credentials is shared by all instances
+    __sns_clients_lock = Lock()
+
     def __init__(self):
         super().__init__()
-        client_params= {
-            'service_name': AwsConstants.sns,
-        }
-        self.__sns_client = AwsCred().get_client(**client_params)
+        self.__sns_client = self.__get_sns_client()
         self.__topic_arn = ''
 
+    @classmethod
+    def __get_sns_client(cls):
+        aws_cred = AwsCred()
+        client_key = json.dumps(aws_cred.boto3_session, sort_keys=True)
+        with cls.__sns_clients_lock:
+            if client_key not in cls.__sns_clients:
+                LOGGER.debug(f'creating sns client for region: {aws_cred.region}')
+                cls.__sns_clients[client_key] = aws_cred.get_client(service_name=AwsConstants.sns)
+            return cls.__sns_clients[client_key]
+
+    @staticmethod
+    def get_sns_attributes(attributes: dict):
+        """
+        :param attributes: dict - str => str
+        :return: dict - SNS `MessageAttributes`
+        """
+        return {k: {'DataType': 'String', 'StringValue': str(v)} for k, v in attributes.items()}
+
     def set_channel(self, channel_id):
         self.__topic_arn = channel_id
         return self
 
-    def publish_msg(self, msg: str):
+    def publish_msg(self, msg: str, attributes: dict = None):
         if self.__topic_arn == '':
             raise ValueError('missing topic arn to publish message')
         response = self.__sns_client.publish(
@@ -38,17 +62,26 @@ class PubSubSns(PubSubAbstract):
             Message=msg,
             # Subject='optional string',
             # MessageStructure='string',
-            # MessageAttributes={
-            #     'string': {
-            #         'DataType': 'string',
-            #         'StringValue': 'string',
-            #         'BinaryValue': b'bytes'
-            #     }
-            # },
+            MessageAttributes=self.get_sns_attributes({} if attributes is None else attributes),
             # MessageDeduplicationId='string',
             # MessageGroupId='string'
         )
         return response
 
+    def publish_batch(self, msgs: list, attributes: list):
+        """
+        SNS PublishBatch. entry ids are the indices in `msgs`.
+        entries failed by the sender (invalid parameters) are not retryable.
+        """
+        if self.__topic_arn == '':
+            raise ValueError('missing topic arn to publish message')
+        entries = [{'Id': str(i), 'Message': k, 'MessageAttributes': self.get_sns_attributes(v)} for i, (k, v) in enumerate(zip(msgs, attributes))]
+        try:
+            response = self.__sns_client.publish_batch(TopicArn=self.__topic_arn, PublishBatchRequestEntries=entries)
+        except Exception as e:
+            LOGGER.exception(f'failed to publish batch of {len(msgs)} messages')
+            return [(i, str(e), True) for i in range(len(msgs))]
+        return [(int(k['Id']), f'{k.get("Code", "")}: {k.get("Message", "")}', not k.get('SenderFault', False)) for k in response.get('Failed', [])]
+
     def subscribe(self):
         raise NotImplemented('will implement it if needed.')
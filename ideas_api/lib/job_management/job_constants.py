@@ -14,6 +14,18 @@ class JobConstants:
     OGC_PROCESS_INDEX_ALIAS = 'ogc_process'
     OGC_JOB_INDEX_ALIAS = 'ogc_job'
     OGC_JOB_LOGS_INDEX_ALIAS = 'ogc_job_logs'
+    OGC_JOB_LOGS_TEMPLATE = 'ogc_job_logs_template'
+    OGC_JOB_LOGS_POLICY = 'ogc_job_logs_policy'
+    OGC_JOB_LOGS_ROLLOVER_SIZE = '5gb'
+    OGC_JOB_LOGS_ROLLOVER_AGE = '7d'
+    OGC_JOB_LOGS_RETENTION_AGE = '90d'
+    OGC_STAGE_CACHE_INDEX_ALIAS = 'ogc_stage_cache'
+    DEFAULT_STAGE_CACHE_TTL = 30 * 24 * 60 * 60  # seconds
+    OUTBOX_SWEEP_MIN_AGE = 60  # seconds. newer jobs may still be published by the API
+    OUTBOX_SWEEP_SIZE = 500
+    MSG_ATTRIBUTE_KEYS = ['messageType', 'stage', 'processID', 'jobID']  # published as SNS message attributes for filter policies
+    OGC_JOB_UPDATE_SCRIPT = 'ogc_job_update'
+    OGC_JOB_PROGRESS_SCRIPT = 'ogc_job_increase_progress'
 
     PROCESSES = 'processes'
     JOBS = 'jobs'
@@ -22,6 +34,7 @@ class JobConstants:
     PRE_PROCESSED = 'PRE_PROCESSED'
     FINISHED = 'FINISHED'
     JOB_STATUS_NA = 'NA'
+    JOB_STATUS_ACCEPTED = 'ACCEPTED'
     JOB_STATUS_QUEUED = 'QUEUED'
     JOB_STATUS_IN_PROGRESS = 'IN_PROGRESS'
     JOB_STATUS_SUCCESS = 'SUCCESSFUL'
@@ -61,13 +74,18 @@ OGC_PROCESS_MAPPING = {
 OGC_JOB_MAPPING = {
     "settings": {
         "number_of_shards": 3,
-        "number_of_replicas": 2
+        "number_of_replicas": 2,
+        "index.sort.field": ["created", "jobID"],  # same as the job listing. it can stop early without counting all hits.
+        "index.sort.order": ["desc", "desc"]
     },
     "mappings": {
+        "_routing": {"required": True},  # routed by jobID
         "properties": {
             "processID": {"type": "keyword"},
             "processVersion": {"type": "keyword"},
             "jobID": {"type": "keyword"},
+            "inputsHash": {"type": "keyword"},
+            "publishPending": {"type": "boolean"},
             "status": {"type": "keyword"},
             "progress": {"type": "integer"},
             "created": {"type": "long"},
@@ -84,15 +102,132 @@ JOB_STAGE_LOGS_MAPPING = {
         "number_of_replicas": 2
     },
     "mappings": {
+        "_routing": {"required": True},  # routed by jobID. all logs of a job are in 1 shard
         "properties": {
             "jobID": {"type": "keyword"},
+            "logID": {"type": "keyword"},
+            "logSeq": {"type": "long"},
             "messageType": {"type": "keyword"},
             "stage": {"type": "keyword"},
             "message": {"type": "text"},
+            "updated": {"type": "long"},
         }
     }
 }
 
+OGC_JOB_LOGS_TEMPLATE = {
+    "index_patterns": [f"{JobConstants.OGC_JOB_LOGS_INDEX_ALIAS}-*"],  # ogc_job_logs-000001, ogc_job_logs-000002, ...
+    "priority": 100,
+    "template": {
+        "settings": {
+            **JOB_STAGE_LOGS_MAPPING["settings"],
+            "opendistro.index_state_management.rollover_alias": JobConstants.OGC_JOB_LOGS_INDEX_ALIAS,
+        },
+        "mappings": JOB_STAGE_LOGS_MAPPING["mappings"],
+    }
+}
+
+OGC_JOB_LOGS_ROLLOVER_CONDITIONS = {
+    "max_size": JobConstants.OGC_JOB_LOGS_ROLLOVER_SIZE,
+    "max_age": JobConstants.OGC_JOB_LOGS_ROLLOVER_AGE,
+}
+
+OGC_JOB_LOGS_POLICY = {  # index state management. hot: written and rolled over. warm: read-only and merged. then deleted.
+    "policy": {
+        "description": f"rollover, merge and delete {JobConstants.OGC_JOB_LOGS_INDEX_ALIAS} indices",
+        "default_state": "hot",
+        "states": [
+            {
+                "name": "hot",
+                "actions": [{"rollover": {
+                    "min_size": JobConstants.OGC_JOB_LOGS_ROLLOVER_SIZE,
+                    "min_index_age": JobConstants.OGC_JOB_LOGS_ROLLOVER_AGE,
+                }}],
+                "transitions": [{"state_name": "warm", "conditions": {"min_index_age": JobConstants.OGC_JOB_LOGS_ROLLOVER_AGE}}],
+            },
+            {
+                "name": "warm",
+                "actions": [{"read_only": {}}, {"force_merge": {"max_num_segments": 1}}],
+                "transitions": [{"state_name": "delete", "conditions": {"min_index_age": JobConstants.OGC_JOB_LOGS_RETENTION_AGE}}],
+            },
+            {
+                "name": "delete",
+                "actions": [{"delete": {}}],
+                "transitions": [],
+            },
+        ],
+        "ism_template": {  # attached to new indices automatically
+            "index_patterns": [f"{JobConstants.OGC_JOB_LOGS_INDEX_ALIAS}-*"],
+            "priority": 100,
+        },
+    }
+}
+
+OGC_STAGE_CACHE_MAPPING = {
+    "settings": {
+        "number_of_shards": 3,
+        "number_of_replicas": 2
+    },
+    "mappings": {
+        "properties": {
+            "processID": {"type": "keyword"},
+            "processVersion": {"type": "keyword"},
+            "stage": {"type": "keyword"},
+            "jobID": {"type": "keyword"},
+            "created": {"type": "long"},
+            "expires": {"type": "long"},
+        }
+    }
+}
+
+# params: fields: dict - values to be set. progress: number or null - only raised. outputs: list - appended if they are new.
+OGC_JOB_UPDATE_SCRIPT_SOURCE = """
+for (def entry : params.fields.entrySet()) {
+    ctx._source[entry.getKey()] = entry.getValue();
+}
+if (params.progress != null) {
+    double current = ctx._source.progress == null ? 0 : ((Number) ctx._source.progress).doubleValue();
+    if (((Number) params.progress).doubleValue() > current) {
+        ctx._source.progress = params.progress;
+    }
+}
+if (params.outputs.size() > 0) {
+    if (ctx._source.job == null) {
+        ctx._source.job = new HashMap();
+    }
+    if (ctx._source.job.outputs == null) {
+        ctx._source.job.outputs = new ArrayList();
+    }
+    for (def each : params.outputs) {
+        if (!ctx._source.job.outputs.contains(each)) {
+            ctx._source.job.outputs.add(each);
+        }
+    }
+}
+"""
+
+# params: message: str, updated: long, step_start: number, step_end: number
+# progress moves toward step_end with smaller steps each time. it never reaches step_end or goes down.
+OGC_JOB_PROGRESS_SCRIPT_SOURCE = """
+double current = ctx._source.progress == null ? 0 : ((Number) ctx._source.progress).doubleValue();
+if (current < params.step_end) {
+    double onePercent = (params.step_end - params.step_start) * 0.01;
+    double newProgress = current + onePercent;
+    while (newProgress >= params.step_end) {
+        onePercent *= 0.5;
+        newProgress = current + onePercent;
+    }
+    ctx._source.progress = newProgress;
+}
+ctx._source.message = params.message;
+ctx._source.updated = params.updated;
+"""
+
+OGC_JOB_SCRIPTS = {
+    JobConstants.OGC_JOB_UPDATE_SCRIPT: OGC_JOB_UPDATE_SCRIPT_SOURCE,
+    JobConstants.OGC_JOB_PROGRESS_SCRIPT: OGC_JOB_PROGRESS_SCRIPT_SOURCE,
+}
+
 JOB_INDEX_MAPPING = {
     "settings": {
         "number_of_shards": 3,
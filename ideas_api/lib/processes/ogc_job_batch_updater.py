@@ -0,0 +1,100 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ideas_api.lib.external_io.es_abstract import ESAbstract
+from ideas_api.lib.external_io.msg_claim_check import MsgClaimCheck
+from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract
+from ideas_api.lib.processes.ogc_job_updater import OgcJobUpdater
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OgcJobBatchUpdater:
+    """
+    apply a batch of job update messages.
+
+    Messages are grouped by jobID. Each job's messages are applied in the order they are received,
+    while different jobs are processed concurrently.
+    """
+    MAX_WORKERS = 10
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    DEFERRED = 'deferred'  # not attempted since an earlier message of the same job failed
+
+    def __init__(self, es_middleware: ESAbstract, pub_sub: PubSubAbstract, max_workers: int = MAX_WORKERS, claim_check: MsgClaimCheck = None):
+        self.__es_middleware = es_middleware
+        self.__pub_sub = pub_sub
+        self.__claim_check = MsgClaimCheck() if claim_check is None else claim_check
+        self.__max_workers = max_workers
+
+    @staticmethod
+    def group_by_job(records: list):
+        """
+        :param records: list - [(message_id, message dict)]
+        :return: OrderedDict - jobID: [(message_id, message dict)]. messages without jobID are in their own group
+        """
+        grouped_records = OrderedDict()
+        for message_id, msg in records:
+            job_id = msg['jobID'] if isinstance(msg, dict) and 'jobID' in msg else f'__no_job_id__{message_id}'
+            if job_id not in grouped_records:
+                grouped_records[job_id] = []
+            grouped_records[job_id].append((message_id, msg))
+        return grouped_records
+
+    def __process_job_records(self, job_records: list):
+        """
+        :param job_records: list - [(message_id, message dict)] for the same job
+        :return: dict - message ids for each outcome
+        """
+        outcomes = {self.SUCCEEDED: [], self.FAILED: [], self.DEFERRED: []}
+        job_updater = OgcJobUpdater(self.__es_middleware, self.__pub_sub, self.__claim_check)  # updater is stateful. one for each job.
+        for i, (message_id, msg) in enumerate(job_records):
+            try:
+                job_updater.process_update(msg)
+            except Exception:
+                LOGGER.exception(f'failed to process message: {message_id}. msg: {msg}')
+                outcomes[self.FAILED].append(message_id)
+                # later messages of the same job are also retried so that they are applied in order.
+                outcomes[self.DEFERRED].extend([k[0] for k in job_records[i + 1:]])
+                return outcomes
+            outcomes[self.SUCCEEDED].append(message_id)
+        return outcomes
+
+    def process_batch(self, records: list):
+        """
+        Errors are isolated to each record. They are not raised.
+
+        :param records: list - [(message_id, message dict)]
+        :return: dict - message ids for each outcome: succeeded, failed, deferred
+        """
+        grouped_records = self.group_by_job(records)
+        if len(grouped_records) == 1:
+            job_outcomes = [self.__process_job_records(list(grouped_records.values())[0])]
+        elif len(grouped_records) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(grouped_records), self.__max_workers)) as executor:
+                job_outcomes = list(executor.map(self.__process_job_records, grouped_records.values()))
+        else:
+            job_outcomes = []
+        outcomes = {self.SUCCEEDED: [], self.FAILED: [], self.DEFERRED: []}
+        for each_job_outcomes in job_outcomes:
+            for k, v in each_job_outcomes.items():
+                outcomes[k].extend(v)
+        return outcomes
+
+    @staticmethod
+    def get_retrying_ids(outcomes: dict):
+        return outcomes[OgcJobBatchUpdater.FAILED] + outcomes[OgcJobBatchUpdater.DEFERRED]
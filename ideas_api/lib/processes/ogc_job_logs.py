@@ -0,0 +1,148 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import asyncio
+import logging
+from time import monotonic, sleep
+from typing import Union
+
+from ideas_api.lib.external_io.es_abstract import ESAbstract
+from ideas_api.lib.job_management.job_constants import JobConstants
+from ideas_api.lib.utils.pagination_cursor import PaginationCursor
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OgcJobLogs:
+    """
+    logs of each stage transition of a job in the order they are written
+    """
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+    LOG_FIELDS = ['jobID', 'stage', 'message', 'updated']
+    LOG_SORT = [  # `updated` is in seconds. `logSeq` orders logs written in the same second. older logs without it come first
+        {'updated': {'order': 'asc'}},
+        {'logSeq': {'order': 'asc', 'missing': '_first'}},
+        {'logID': {'order': 'asc'}},
+    ]
+    FOLLOW_INTERVAL = 2  # seconds
+    FOLLOW_TIMEOUT = 20  # seconds. with the last interval and searches, it must end before the 29 seconds timeout of API Gateway
+
+    def __init__(self, es_middleware: ESAbstract):
+        self.__es_middleware = es_middleware
+
+    @staticmethod
+    def get_logs_dsl(job_id: str, size: int, since: Union[int, None] = None):
+        """
+        :param job_id: str - job id
+        :param size: int - number of logs
+        :param since: int - only logs updated at or after this unix timestamp in seconds. all if None
+        :return: dict - DSL sorted by (updated, logSeq, logID)
+        """
+        filters = [{'term': {'jobID': job_id}}]
+        if since is not None:
+            filters.append({'range': {'updated': {'gte': since}}})
+        return {
+            'size': size,
+            '_source': OgcJobLogs.LOG_FIELDS,
+            'track_total_hits': False,
+            'query': {
+                'bool': {'filter': filters}
+            },
+            'sort': OgcJobLogs.LOG_SORT,
+        }
+
+    def __decode_cursor(self, cursor: Union[str, None]):
+        return None if cursor is None else PaginationCursor.decode(cursor, len(self.LOG_SORT))
+
+    def get_logs_page(self, job_id: str, limit: int, cursor: Union[str, None] = None, since: Union[int, None] = None):
+        """
+        :param job_id: str - job id
+        :param limit: int - max number of logs in this page
+        :param cursor: str - cursor from the previous page. first page if None
+        :param since: int - same as `get_logs_dsl`
+        :return: tuple - (logs, cursor for the next page. None if it is the last page)
+        """
+        log_hits = self.__es_middleware.query_after(self.get_logs_dsl(job_id, limit + 1, since), self.__decode_cursor(cursor),
+                                                    querying_index=JobConstants.OGC_JOB_LOGS_INDEX_ALIAS, routing=job_id)['hits']['hits']
+        return self.__get_logs_page(log_hits, limit)
+
+    async def get_logs_page_async(self, job_id: str, limit: int, cursor: Union[str, None] = None, since: Union[int, None] = None):
+        """
+        same as get_logs_page with an AsyncESMiddleware
+        """
+        log_hits = (await self.__es_middleware.query_after(self.get_logs_dsl(job_id, limit + 1, since), self.__decode_cursor(cursor),
+                                                           querying_index=JobConstants.OGC_JOB_LOGS_INDEX_ALIAS, routing=job_id))['hits']['hits']
+        return self.__get_logs_page(log_hits, limit)
+
+    @staticmethod
+    def __get_logs_page(log_hits: list, limit: int):
+        next_cursor = PaginationCursor.encode(log_hits[limit - 1]['sort']) if len(log_hits) > limit else None
+        return [k['_source'] for k in log_hits[:limit]], next_cursor
+
+    @staticmethod
+    def __is_finished(job_result: Union[dict, None]):
+        if job_result is None:
+            return True
+        return job_result['_source']['status'] in [JobConstants.JOB_STATUS_SUCCESS, JobConstants.JOB_STATUS_FAILURE]
+
+    def __is_job_finished(self, job_id: str):
+        return self.__is_finished(self.__es_middleware.get_by_id(job_id, JobConstants.OGC_JOB_INDEX_ALIAS, includes=['status'], routing=job_id))
+
+    async def __is_job_finished_async(self, job_id: str):
+        return self.__is_finished(await self.__es_middleware.get_by_id(job_id, JobConstants.OGC_JOB_INDEX_ALIAS, includes=['status'], routing=job_id))
+
+    def iter_logs(self, job_id: str, cursor: Union[str, None] = None, since: Union[int, None] = None, follow: bool = False):
+        """
+        :param job_id: str - job id
+        :param cursor: str - cursor from a previous page. from the first log if None
+        :param since: int - same as `get_logs_dsl`
+        :param follow: bool - keep polling for new logs till the job is finished or FOLLOW_TIMEOUT
+        :return: generator - logs
+        """
+        search_after = self.__decode_cursor(cursor)
+        dsl = self.get_logs_dsl(job_id, self.MAX_LIMIT, since)
+        follow_deadline = monotonic() + self.FOLLOW_TIMEOUT
+        while True:
+            is_finished = self.__is_job_finished(job_id) if follow else True  # checked before searching so that the last logs are included.
+            log_hits = self.__es_middleware.query_after(dsl, search_after, querying_index=JobConstants.OGC_JOB_LOGS_INDEX_ALIAS, routing=job_id)['hits']['hits']
+            for each_log in log_hits:
+                yield each_log['_source']
+            if len(log_hits) > 0:
+                search_after = log_hits[-1]['sort']
+            if len(log_hits) >= self.MAX_LIMIT:
+                continue
+            if is_finished or monotonic() >= follow_deadline:
+                return
+            sleep(self.FOLLOW_INTERVAL)
+
+    async def iter_logs_async(self, job_id: str, cursor: Union[str, None] = None, since: Union[int, None] = None, follow: bool = False):
+        """
+        same as iter_logs with an AsyncESMiddleware. it does not hold a thread while waiting for new logs.
+
+        :return: async generator - logs
+        """
+        search_after = self.__decode_cursor(cursor)
+        dsl = self.get_logs_dsl(job_id, self.MAX_LIMIT, since)
+        follow_deadline = monotonic() + self.FOLLOW_TIMEOUT
+        while True:
+            is_finished = (await self.__is_job_finished_async(job_id)) if follow else True
+            log_hits = (await self.__es_middleware.query_after(dsl, search_after, querying_index=JobConstants.OGC_JOB_LOGS_INDEX_ALIAS, routing=job_id))['hits']['hits']
+            for each_log in log_hits:
+                yield each_log['_source']
+            if len(log_hits) > 0:
+                search_after = log_hits[-1]['sort']
+            if len(log_hits) >= self.MAX_LIMIT:
+                continue
+            if is_finished or monotonic() >= follow_deadline:
+                return
+            await asyncio.sleep(self.FOLLOW_INTERVAL)
@@ -0,0 +1,133 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import json
+import logging
+
+from ideas_api.lib.external_io.es_abstract import ESAbstract
+from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract, PublishManyError
+from ideas_api.lib.job_management.job_constants import JobConstants
+from ideas_api.lib.utils.TimeUtlis import TimeUtils
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OgcJobOutbox:
+    """
+    a new job is indexed with `publishPending`. its start message is published without another ES write.
+    the updater clears the marker when it starts the job. if publishing fails, or the message arrives before the job is stored,
+    the marker stays and `sweep` publishes it again. the updater ignores duplicated start messages.
+    """
+    PENDING_FIELD = 'publishPending'
+
+    def __init__(self, es_middleware: ESAbstract, pub_sub: PubSubAbstract):
+        self.__es_middleware = es_middleware
+        self.__pub_sub = pub_sub
+
+    @staticmethod
+    def get_start_msg(job_id: str, process_id: str):
+        """
+        :param job_id: str - job id
+        :param process_id: str - process id of the job
+        :return: dict - message which starts the job
+        """
+        return {
+            'messageType': 'RESULT',
+            'jobID': job_id,
+            'processID': process_id,
+            'status': 'SUCCESSFUL',
+            'stage': JobConstants.PRE_PROCESSED,
+            'message': 'Requesting to start this job',
+        }
+
+    def publish(self, job_id: str, process_id: str):
+        """
+        :param job_id: str - job id
+        :param process_id: str - process id of the job
+        :return: self. errors are raised. the marker stays for the sweeper if publishing fails
+        """
+        start_msg = self.get_start_msg(job_id, process_id)
+        self.__pub_sub.publish_msg(json.dumps(start_msg), PubSubAbstract.get_attributes(start_msg, JobConstants.MSG_ATTRIBUTE_KEYS))
+        return self
+
+    async def publish_async(self, job_id: str, process_id: str):
+        """
+        same as publish without blocking the event loop. it runs concurrently with indexing the job. So errors are logged, not raised.
+
+        :param job_id: str - job id
+        :param process_id: str - process id of the job
+        :return: bool - published or not
+        """
+        start_msg = self.get_start_msg(job_id, process_id)
+        try:
+            await self.__pub_sub.publish_msg_async(json.dumps(start_msg), PubSubAbstract.get_attributes(start_msg, JobConstants.MSG_ATTRIBUTE_KEYS))
+        except Exception:
+            LOGGER.exception(f'failed to publish start message of job: {job_id}. it is left to the sweeper')
+            return False
+        return True
+
+    @staticmethod
+    def get_pending_dsl(created_before: int, size: int):
+        """
+        :param created_before: int - only jobs created at or before this unix timestamp in seconds
+        :param size: int - max number of jobs
+        :return: dict - DSL of accepted jobs whose start message is not published yet. oldest first
+        """
+        return {
+            'size': size,
+            '_source': ['jobID', 'processID'],
+            'query': {
+                'bool': {
+                    'filter': [
+                        {'term': {OgcJobOutbox.PENDING_FIELD: True}},
+                        {'term': {'status': JobConstants.JOB_STATUS_ACCEPTED}},
+                        {'range': {'created': {'lte': created_before}}},
+                    ]
+                }
+            },
+            'sort': [{'created': {'order': 'asc'}}],
+        }
+
+    def sweep(self, min_age: int = JobConstants.OUTBOX_SWEEP_MIN_AGE, size: int = JobConstants.OUTBOX_SWEEP_SIZE):
+        """
+        publish again for jobs which are still pending after `min_age`
+
+        :param min_age: int - seconds since the job is created. younger jobs may still be published by the API
+        :param size: int - max number of jobs in a sweep
+        :return: dict - number of published and failed jobs
+        """
+        created_before = int(TimeUtils().get_datetime_unix(False)) - min_age
+        pending_jobs = self.__es_middleware.query(self.get_pending_dsl(created_before, size), querying_index=JobConstants.OGC_JOB_INDEX_ALIAS)
+        start_msgs = [self.get_start_msg(k['_source']['jobID'], k['_source']['processID']) for k in pending_jobs['hits']['hits']]
+        job_ids = [k['jobID'] for k in start_msgs]
+        failed = {}
+        try:
+            self.__pub_sub.publish_many([json.dumps(k) for k in start_msgs], [PubSubAbstract.get_attributes(k, JobConstants.MSG_ATTRIBUTE_KEYS) for k in start_msgs])
+        except PublishManyError as pe:
+            LOGGER.exception('failed to publish start messages of some jobs')
+            failed = pe.failed
+        published_ids = [k for i, k in enumerate(job_ids) if i not in failed]
+        if len(published_ids) > 0:
+            try:
+                self.__es_middleware.bulk_write([{
+                    'action': 'update',
+                    'index': JobConstants.OGC_JOB_INDEX_ALIAS,
+                    'id': k,
+                    'routing': k,
+                    'doc': {self.PENDING_FIELD: False},
+                    'upsert': False,  # a job deleted in between must not come back as a stub
+                } for k in published_ids])
+            except ValueError:
+                LOGGER.exception('failed to clear the marker of some published jobs. they are published again in the next sweep')
+        sweep_result = {'published': len(published_ids), 'failed': len(failed)}
+        LOGGER.info(f'swept pending jobs: {sweep_result}')
+        return sweep_result
@@ -12,16 +12,22 @@
 
 import json
 import logging
-from uuid import uuid4
+from time import time_ns
+from typing import Union
+from uuid import uuid5, NAMESPACE_URL
 
-from ideas_api.lib.external_io.es_abstract import ESAbstract
+from ideas_api.lib.external_io.es_abstract import ESAbstract, VersionConflictError
+from ideas_api.lib.external_io.msg_claim_check import MsgClaimCheck
 from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract
 from ideas_api.lib.job_management.job_constants import JobConstants
+from ideas_api.lib.processes.ogc_job_outbox import OgcJobOutbox
 from ideas_api.lib.processes.ogc_jobs import OgcJobs
+from ideas_api.lib.processes.ogc_process_cache import OgcProcessCache
 from ideas_api.lib.processes.ogc_process_stages import OgcProcessStages
 from ideas_api.lib.processes.ogc_processes import OgcProcess
+from ideas_api.lib.processes.ogc_stage_cache import OgcStageCache
 from ideas_api.lib.utils.TimeUtlis import TimeUtils
-from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator
+from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator, CompiledSchemaRegistry
 
 LOGGER = logging.getLogger(__name__)
 
@@ -74,29 +80,117 @@ RESULT_MSG_SCHEMA = {
         }
     }
 }
+CompiledSchemaRegistry().warm_up([BASIC_MSG_SCHEMA, UPDATE_MSG_SCHEMA, RESULT_MSG_SCHEMA])
 
 
 class OgcJobUpdater:
-    def __init__(self, es_middleware: ESAbstract, pub_sub: PubSubAbstract):
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, es_middleware: ESAbstract, pub_sub: PubSubAbstract, claim_check: MsgClaimCheck = None):
         self.__es_middleware = es_middleware
         self.__pub_sub = pub_sub
+        self.__claim_check = MsgClaimCheck() if claim_check is None else claim_check  # REQUEST messages grow with outputs of each stage
         self.__job_id = ''
         self.__job_details = None
+        self.__job_seq_no = None
+        self.__job_primary_term = None
         self.__sns_msg = None
         self.__process_def = None
         self.__process_stages = OgcProcessStages()
+        self.__pending_logs = []
+        self.__pending_job_update = {}
+        self.__pending_outputs = []
+        self.__pending_job_script = None
+        self.__pending_stage_cache = {}
 
-    def __increase_progress(self):
-        step_start, step_end = self.__process_stages.get_process_range(self.__sns_msg['stage'])
-        current_progress = self.__job_details['progress']
-        if current_progress >= step_end:
-            return step_end
-        one_percent = (step_end - step_start) * 0.01
-        new_progress = current_progress + one_percent
-        while new_progress >= step_end:
-            one_percent *= 0.5
-            new_progress = current_progress + one_percent
-        return new_progress
+    def __reset_pending(self):
+        self.__pending_logs = []
+        self.__pending_job_update = {}
+        self.__pending_outputs = []
+        self.__pending_job_script = None
+        self.__pending_stage_cache = {}
+        return self
+
+    def __add_job_update(self, job_details_updating_dict: dict):
+        """
+        later updates in the same transition overwrite the earlier ones like consecutive partial updates in ES
+        """
+        self.__pending_job_update.update(job_details_updating_dict)
+        return self
+
+    def __get_job_script(self):
+        """
+        new outputs are appended and progress is only raised by the stored script in ES.
+        """
+        if self.__pending_job_script is not None:
+            return self.__pending_job_script
+        if len(self.__pending_job_update) < 1 and len(self.__pending_outputs) < 1:
+            return None
+        return {
+            'id': JobConstants.OGC_JOB_UPDATE_SCRIPT,
+            'params': {
+                'fields': {k: v for k, v in self.__pending_job_update.items() if k != 'progress'},
+                'progress': self.__pending_job_update.get('progress', None),
+                'outputs': self.__pending_outputs,
+            }
+        }
+
+    def __flush(self):
+        """
+        write the job details update of current transition first. then all pending logs and stage cache entries in 1 bulk request.
+        for RESULT messages, job details are only updated if they are not changed since they are read. VersionConflictError otherwise.
+        a bulk request is not atomic. so nothing else of a rejected transition is written.
+        log ids are derived from the message so that a retried transition overwrites its own logs.
+        logSeq is the write time in nanoseconds so that logs written in the same second keep their order when paging with a cursor.
+        """
+        msg_key = f'{self.__job_id}/{json.dumps(self.__sns_msg, sort_keys=True)}'
+        log_ids = [f'{uuid5(NAMESPACE_URL, f"{msg_key}/{i}")}' for i in range(len(self.__pending_logs))]
+        log_seq = time_ns()
+        operations = [{
+            'action': 'index',
+            'index': JobConstants.OGC_JOB_LOGS_INDEX_ALIAS,
+            'id': log_id,
+            'routing': self.__job_id,
+            'doc': {**k, 'logSeq': log_seq + i, 'logID': log_id},  # logID is the last tie-breaker when sorting logs
+        } for i, (log_id, k) in enumerate(zip(log_ids, self.__pending_logs))]
+        operations.extend([{
+            'action': 'index',
+            'index': JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS,
+            'id': k,
+            'doc': v,
+        } for k, v in self.__pending_stage_cache.items()])
+        job_script = self.__get_job_script()
+        self.__reset_pending()
+        if job_script is not None:
+            self.__es_middleware.update_by_script(self.__job_id, job_script['id'], job_script['params'], JobConstants.OGC_JOB_INDEX_ALIAS,
+                                                  self.__job_seq_no, self.__job_primary_term, routing=self.__job_id)
+        self.__es_middleware.bulk_write(operations)
+        return self
+
+    def __get_stage_cache_key(self, stage: str):
+        input_keys = self.__process_stages.get_cache_input_keys(stage)
+        if len(input_keys) < 1:
+            return None
+        return OgcStageCache.get_cache_key(self.__job_details['processID'], self.__job_details['processVersion'], stage, self.__job_details['job']['inputs'], input_keys)
+
+    def __add_stage_cache(self, stage: str, outputs: list):
+        cache_key = self.__get_stage_cache_key(stage)
+        if cache_key is None:
+            return self
+        self.__pending_stage_cache[cache_key] = OgcStageCache.get_cache_doc(cache_key, self.__job_details, stage, outputs, self.__process_stages.get_cache_ttl())
+        return self
+
+    def __get_cached_stage_output(self, ogc_jobs: OgcJobs, cached_job: Union[dict, None], stage: str):
+        """
+        outputs of the latest job with the same inputs. if none, outputs of the same stage with the same dependent inputs.
+        """
+        cached_result = ogc_jobs.get_cached_stage_output(cached_job, stage)
+        if len(cached_result) > 0:
+            return cached_result
+        cache_key = self.__get_stage_cache_key(stage)
+        if cache_key is None:
+            return []
+        return OgcStageCache(self.__es_middleware).get_stage_output(cache_key)
 
     def __execute_update(self):
         validation_result, validation_details = SingleJsonValidator().load_schema(UPDATE_MSG_SCHEMA).validate(self.__sns_msg)
@@ -104,10 +198,15 @@ class OgcJobUpdater:
             raise ValueError(f'invalid update sns msg: {validation_details}')
 
 
-        job_details_updating_dict = {
-            'message': f"{self.__sns_msg['stage']}:: {self.__sns_msg['message']}",
-            'progress': self.__increase_progress(),
-            'updated': TimeUtils().get_datetime_unix(False),
+        step_start, step_end = self.__process_stages.get_process_range(self.__sns_msg['stage'])
+        self.__pending_job_script = {  # progress is increased from the latest one in ES. no need to read it first.
+            'id': JobConstants.OGC_JOB_PROGRESS_SCRIPT,
+            'params': {
+                'message': f"{self.__sns_msg['stage']}:: {self.__sns_msg['message']}",
+                'updated': TimeUtils().get_datetime_unix(False),
+                'step_start': step_start,
+                'step_end': step_end,
+            }
         }
         job_logs_dict = {
             'jobID': self.__job_id,
@@ -115,8 +214,8 @@ class OgcJobUpdater:
             'stage': self.__sns_msg['stage'],
             'updated': TimeUtils().get_datetime_unix(False),
         }
-        self.__es_middleware.update_one(job_details_updating_dict, self.__job_id, JobConstants.OGC_JOB_INDEX_ALIAS)
-        self.__es_middleware.index_one(job_logs_dict, f'{uuid4()}', JobConstants.OGC_JOB_LOGS_INDEX_ALIAS)
+        self.__pending_logs.append(job_logs_dict)
+        self.__flush()
         return self
 
     def __execute_result(self):
@@ -172,12 +271,18 @@ class OgcJobUpdater:
             self.__sns_msg)
         if not validation_result:
             raise ValueError(f'invalid result sns msg: {validation_details}')
+        if self.__sns_msg['stage'] == JobConstants.PRE_PROCESSED and self.__job_details.get('status', None) != JobConstants.JOB_STATUS_ACCEPTED:
+            # the start message may be published more than once by the outbox sweeper.
+            LOGGER.info(f'job: {self.__job_id} is already started. ignoring duplicated start message')
+            return self
         sns_msg = self.__sns_msg['message'] if 'message' in self.__sns_msg else ''
         job_result_array = self.__job_details['job']['outputs'] if 'outputs' in self.__job_details['job'] else []
         if 'outputs' in self.__sns_msg:
-            for each in self.__sns_msg['outputs']:
-                each['name'] = f'{self.__sns_msg["stage"]}__{each["name"]}'
-            job_result_array = job_result_array + self.__sns_msg['outputs']
+            stage_outputs = [{**k, 'name': f'{self.__sns_msg["stage"]}__{k["name"]}'} for k in self.__sns_msg['outputs']]  # message is not modified so that it can be retried.
+            job_result_array = job_result_array + stage_outputs
+            self.__pending_outputs.extend(stage_outputs)
+            if self.__sns_msg['status'] == 'SUCCESSFUL' and self.__sns_msg['stage'] != JobConstants.PRE_PROCESSED:
+                self.__add_stage_cache(self.__sns_msg['stage'], stage_outputs)
         # log it that current job is done with status.
         job_logs_dict = {
             'jobID': self.__job_id,
@@ -185,7 +290,7 @@ class OgcJobUpdater:
             'stage': self.__sns_msg['stage'],
             'updated': TimeUtils().get_datetime_unix(False),
         }
-        self.__es_middleware.index_one(job_logs_dict, f'{uuid4()}', JobConstants.OGC_JOB_LOGS_INDEX_ALIAS)
+        self.__pending_logs.append(job_logs_dict)
         # status is failed? update the job details. quit it.
         if self.__sns_msg['status'] == 'FAILED':
             step_start, step_end = self.__process_stages.get_process_range(self.__sns_msg['stage'])
@@ -194,11 +299,9 @@ class OgcJobUpdater:
                 'status': 'FAILED',
                 'progress': step_end,
                 'finished': TimeUtils().get_datetime_unix(False),
-                'job': {
-                    'outputs': job_result_array,
-                }
             }
-            self.__es_middleware.update_one(job_details_updating_dict, self.__job_id, JobConstants.OGC_JOB_INDEX_ALIAS)
+            self.__add_job_update(job_details_updating_dict)
+            self.__flush()
             return self
         # status is successful...
         if 'outputs' not in self.__sns_msg and self.__sns_msg['stage'] != JobConstants.PRE_PROCESSED:
@@ -208,11 +311,9 @@ class OgcJobUpdater:
                 'status': 'FAILED',
                 'progress': step_end,
                 'finished': TimeUtils().get_datetime_unix(False),
-                'job': {
-                    'outputs': job_result_array,
-                }
             }
-            self.__es_middleware.update_one(job_details_updating_dict, self.__job_id, JobConstants.OGC_JOB_INDEX_ALIAS)
+            self.__add_job_update(job_details_updating_dict)
+            self.__flush()
             raise ValueError(f'missing output in successful result message: {self.__sns_msg}')
         # find next step
         ogc_jobs = OgcJobs(self.__es_middleware)
@@ -225,15 +326,13 @@ class OgcJobUpdater:
                 'status': 'SUCCESSFUL',
                 'progress': 100,
                 'finished': TimeUtils().get_datetime_unix(False),
-                'job': {
-                    'outputs': job_result_array,
-                }
             }
-            self.__es_middleware.update_one(job_details_updating_dict, self.__job_id, JobConstants.OGC_JOB_INDEX_ALIAS)
+            self.__add_job_update(job_details_updating_dict)
+            self.__flush()
             return self
         step_start, step_end = self.__process_stages.get_process_range(next_step)
 
-        cached_result = ogc_jobs.get_cached_stage_output(cached_job, next_step)
+        cached_result = self.__get_cached_stage_output(ogc_jobs, cached_job, next_step)
         while len(cached_result) > 0:
             job_logs_dict = {
                 'jobID': self.__job_id,
@@ -241,18 +340,16 @@ class OgcJobUpdater:
                 'stage': next_step,
                 'updated': TimeUtils().get_datetime_unix(False),
             }
-            self.__es_middleware.index_one(job_logs_dict, f'{uuid4()}', JobConstants.OGC_JOB_LOGS_INDEX_ALIAS)
+            self.__pending_logs.append(job_logs_dict)
             job_result_array = job_result_array + cached_result
+            self.__pending_outputs.extend(cached_result)
             # TODO not sure this is need to be updated repeatedly
             job_details_updating_dict = {
                 'message': f"{next_step}:: cached",
                 'progress': step_end,
                 'updated': TimeUtils().get_datetime_unix(False),
-                'job': {
-                    'outputs': job_result_array,
-                }
             }
-            self.__es_middleware.update_one(job_details_updating_dict, self.__job_id, JobConstants.OGC_JOB_INDEX_ALIAS)
+            self.__add_job_update(job_details_updating_dict)
             next_step = self.__process_stages.get_next_process(next_step, self.__job_details['job']['inputs']['executingStageFlags'])
             if next_step == JobConstants.FINISHED:
                 job_details_updating_dict = {
@@ -260,15 +357,12 @@ class OgcJobUpdater:
                     'status': 'SUCCESSFUL',
                     'progress': 100,
                     'finished': TimeUtils().get_datetime_unix(False),
-                    'job': {
-                        'outputs': job_result_array,
-                    }
                 }
-                self.__es_middleware.update_one(job_details_updating_dict, self.__job_id,
-                                                JobConstants.OGC_JOB_INDEX_ALIAS)
+                self.__add_job_update(job_details_updating_dict)
+                self.__flush()
                 return self
             step_start, step_end = self.__process_stages.get_process_range(next_step)
-            cached_result = ogc_jobs.get_cached_stage_output(cached_job, next_step)
+            cached_result = self.__get_cached_stage_output(ogc_jobs, cached_job, next_step)
 
         # TODO check if the job already exists.. if so, check if each stage is already executed. Then, update and move on.
         # store result to job details
@@ -276,14 +370,12 @@ class OgcJobUpdater:
             'message': f"{next_step}:: starting",
             'progress': step_start,
             'updated': TimeUtils().get_datetime_unix(False),
-            'job': {
-                    'outputs': job_result_array,
-                }
         }
         if self.__sns_msg['stage'] == JobConstants.PRE_PROCESSED:
             job_details_updating_dict['status'] = 'RUNNING'
             job_details_updating_dict['started'] = job_details_updating_dict['updated']
-        self.__es_middleware.update_one(job_details_updating_dict, self.__job_id, JobConstants.OGC_JOB_INDEX_ALIAS)
+            job_details_updating_dict[OgcJobOutbox.PENDING_FIELD] = False
+        self.__add_job_update(job_details_updating_dict)
 
         # store update message.
         job_logs_dict = {
@@ -292,33 +384,63 @@ class OgcJobUpdater:
             'stage': next_step,
             'updated': TimeUtils().get_datetime_unix(False),
         }
-        self.__es_middleware.index_one(job_logs_dict, f'{uuid4()}', JobConstants.OGC_JOB_LOGS_INDEX_ALIAS)
+        self.__pending_logs.append(job_logs_dict)
+
+        self.__flush()  # job details and logs are stored before triggering the next step
 
         # trigger next step
         job_started_msg = {
             'messageType': 'REQUEST',
             'jobID': self.__job_id,
+            'processID': self.__job_details['processID'],
             'stage': next_step,
             'inputs': self.__job_details['job']['inputs'],
             'current_outputs': job_result_array,
         }
-        self.__pub_sub.publish_msg(json.dumps(job_started_msg))
+        self.__pub_sub.publish_msg(json.dumps(self.__claim_check.check_in(job_started_msg)),
+                                   PubSubAbstract.get_attributes(job_started_msg, JobConstants.MSG_ATTRIBUTE_KEYS))
         return self
 
+    def __execute_transition(self):
+        self.__reset_pending()
+        if self.__sns_msg['messageType'] == 'UPDATE':  # only process details are needed. job details are updated by a script.
+            self.__job_details = OgcJobs(self.__es_middleware).get_job_raw(self.__job_id, includes=['processID', 'processVersion'])
+            self.__job_seq_no, self.__job_primary_term = None, None
+        else:
+            try:
+                self.__job_details, self.__job_seq_no, self.__job_primary_term = OgcJobs(self.__es_middleware).get_job_versioned(self.__job_id)  # this will throw an error if not found
+            except ValueError:
+                if self.__sns_msg.get('stage', None) != JobConstants.PRE_PROCESSED:
+                    raise
+                # published concurrently with indexing the job. if it is not stored yet, or never, the outbox sweeper publishes it again.
+                LOGGER.warning(f'missing job: {self.__job_id} for its start message. leaving it to the outbox sweeper')
+                return self
+        self.__process_def, self.__process_stages = OgcProcessCache().get_process(  # this will throw an error if not found
+            self.__job_details['processID'],
+            self.__job_details['processVersion'],
+            OgcProcess(self.__es_middleware, self.__pub_sub).get_single_process,
+        )
+        if self.__sns_msg['messageType'] == 'UPDATE':
+            return self.__execute_update()
+        return self.__execute_result()
+
     def process_update(self, sns_msg: dict):
+        """
+        read-modify-write of the job details.
+        if another message of the same job updates it in between, the transition is re-computed from the latest job details.
+        """
+        if MsgClaimCheck.is_pointer(sns_msg):  # stored message could not be read when it is received. failing so that it is retried.
+            raise ValueError(f'unresolved stored message: {sns_msg}')
         validation_result, validation_details = SingleJsonValidator().load_schema(BASIC_MSG_SCHEMA).validate(sns_msg)
         if not validation_result:
             raise ValueError(f'invalid sns msg: {validation_details}')
         self.__job_id = sns_msg['jobID']
-        self.__job_details = OgcJobs(self.__es_middleware).get_job_raw(self.__job_id)  # this will throw an error if not found
         self.__sns_msg = sns_msg
-        self.__process_def = OgcProcess(self.__es_middleware, self.__pub_sub).get_single_process(  # this will throw an error if not found
-            self.__job_details['processID'],
-            self.__job_details['processVersion'],
-        )
-        self.__process_stages.setup(self.__process_def)
-        if sns_msg['messageType'] == 'UPDATE':
-            return self.__execute_update()
-        if sns_msg['messageType'] == 'RESULT':
-            return self.__execute_result()
-        raise ValueError(f'invalid messageType: {sns_msg["messageType"]}')
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            try:
+                return self.__execute_transition()
+            except VersionConflictError:
+                if attempt >= self.MAX_ATTEMPTS:
+                    raise
+                LOGGER.info(f'job: {self.__job_id} is updated concurrently. retrying attempt: {attempt}')
+        return self
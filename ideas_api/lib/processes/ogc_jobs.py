@@ -10,57 +10,150 @@
 #  access to foreign persons.
 #  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+import hashlib
+import json
 import logging
+from typing import Union
 
 from fastapi import HTTPException
 
 from ideas_api.lib.external_io.es_abstract import ESAbstract
 from ideas_api.lib.job_management.job_constants import JobConstants
 from ideas_api.lib.utils.TimeUtlis import TimeUtils
-from ideas_api.lib.utils.config import Config
+from ideas_api.lib.utils.pagination_cursor import PaginationCursor
 
 LOGGER = logging.getLogger(__name__)
 
 
 class OgcJobs:
+    STATUS_FIELDS = ['processID', 'type', 'jobID', 'status', 'message', 'created', 'started', 'finished', 'updated', 'progress']
+    STATUS_TIME_FIELDS = ['created', 'started', 'finished', 'updated']
+    RESULT_FIELDS = ['job.outputs']
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+    LIST_SORT = [{'created': {'order': 'desc'}}, {'jobID': {'order': 'desc'}}]
+
     def __init__(self, es_middleware: ESAbstract):
         self.__es_middleware = es_middleware
 
-    def get_job_raw(self, job_id: str):
-        dsl_query = {
-            'size': 1000,
-            'query': {
-                'bool': {'must': [
-                    {'term': {'jobID': job_id}}
-                ]}
-            },
-            'sort': [{'jobID': {'order': 'desc'}}],
-        }
-        job_results = self.__es_middleware.query(dsl_query, querying_index=JobConstants.OGC_JOB_INDEX_ALIAS)
-        if len(job_results['hits']['hits']) < 1:
+    def get_job_raw(self, job_id: str, includes: list = None, excludes: list = None):
+        """
+        :param job_id: str - job id which is the document id as well
+        :param includes: list - fields to return. all fields if None
+        :param excludes: list - fields not to return
+        :return: dict - job details
+        """
+        job_result = self.__es_middleware.get_by_id(job_id, JobConstants.OGC_JOB_INDEX_ALIAS, includes=includes, excludes=excludes, routing=job_id)
+        return self.__get_job_source(job_result, job_id)
+
+    async def get_job_raw_async(self, job_id: str, includes: list = None, excludes: list = None):
+        """
+        same as get_job_raw with an AsyncESMiddleware
+        """
+        job_result = await self.__es_middleware.get_by_id(job_id, JobConstants.OGC_JOB_INDEX_ALIAS, includes=includes, excludes=excludes, routing=job_id)
+        return self.__get_job_source(job_result, job_id)
+
+    @staticmethod
+    def __get_job_source(job_result: Union[dict, None], job_id: str):
+        if job_result is None:
             raise ValueError(f'no such job: {job_id}')
-        return job_results['hits']['hits'][0]['_source']
+        return job_result['_source']
+
+    def get_job_versioned(self, job_id: str):
+        """
+        :param job_id: str - job id which is the document id as well
+        :return: tuple - (job details, `_seq_no`, `_primary_term`) for a conditional update
+        """
+        job_result = self.__es_middleware.get_by_id(job_id, JobConstants.OGC_JOB_INDEX_ALIAS, routing=job_id)
+        if job_result is None:
+            raise ValueError(f'no such job: {job_id}')
+        return job_result['_source'], job_result['_seq_no'], job_result['_primary_term']
+
+    @staticmethod
+    def get_job_status_projection(job_detail: dict):
+        """
+        :param job_detail: dict - job details with at least STATUS_FIELDS
+        :return: dict - job status response where timestamps are converted to strings
+        """
+        job_status = {k: job_detail[k] for k in OgcJobs.STATUS_FIELDS}
+        for k in OgcJobs.STATUS_TIME_FIELDS:
+            job_status[k] = TimeUtils.get_time_str(job_detail[k], in_ms=False)
+        return job_status
 
     def get_job_status(self, job_id: str):
         try:
-            job_detail = self.get_job_raw(job_id)
-            response_json_model = {
-              "processID": job_detail['processID'],
-              "type": job_detail['type'],
-              "jobID": job_detail['jobID'],
-              "status": job_detail['status'],
-              "message": job_detail['message'],
-              "created": TimeUtils().parse_from_unix(job_detail['created'], False).get_datetime_str(in_ms=False),
-              "started": TimeUtils().parse_from_unix(job_detail['started'], False).get_datetime_str(in_ms=False),
-              "finished": TimeUtils().parse_from_unix(job_detail['finished'], False).get_datetime_str(in_ms=False),
-              "updated": TimeUtils().parse_from_unix(job_detail['updated'], False).get_datetime_str(in_ms=False),
-              "progress": job_detail['progress'],
-            }
+            response_json_model = self.get_job_status_projection(self.get_job_raw(job_id, includes=self.STATUS_FIELDS))
+        except Exception as e:
+            LOGGER.exception('failed to get a raw job')
+            raise HTTPException(status_code=500, detail=str(e))
+        return response_json_model
+
+    async def get_job_status_async(self, job_id: str):
+        try:
+            response_json_model = self.get_job_status_projection(await self.get_job_raw_async(job_id, includes=self.STATUS_FIELDS))
         except Exception as e:
             LOGGER.exception('failed to get a raw job')
             raise HTTPException(status_code=500, detail=str(e))
         return response_json_model
 
+    @staticmethod
+    def get_jobs_dsl(size: int, process_ids: Union[list, None] = None, statuses: Union[list, None] = None,
+                     created_range: tuple = (None, None), finished_range: tuple = (None, None)):
+        """
+        :param size: int - number of jobs
+        :param process_ids: list - any of these process ids. all processes if None or empty
+        :param statuses: list - any of these statuses. all statuses if None or empty
+        :param created_range: tuple - (gte, lte) of `created` in unix seconds. None for an open end
+        :param finished_range: tuple - (gte, lte) of `finished` in unix seconds. None for an open end
+        :return: dict - DSL sorted by (created, jobID) with status fields only
+        """
+        filters = []
+        if process_ids:
+            filters.append({'terms': {'processID': process_ids}})
+        if statuses:
+            filters.append({'terms': {'status': statuses}})
+        for field_name, (range_start, range_end) in [('created', created_range), ('finished', finished_range)]:
+            time_range = {k: v for k, v in [('gte', range_start), ('lte', range_end)] if v is not None}
+            if len(time_range) > 0:
+                filters.append({'range': {field_name: time_range}})
+        return {
+            'size': size,
+            '_source': OgcJobs.STATUS_FIELDS,
+            'track_total_hits': False,
+            'query': {
+                'bool': {'filter': filters}
+            },
+            'sort': OgcJobs.LIST_SORT,
+        }
+
+    def get_jobs_page(self, limit: int, cursor: Union[str, None] = None, process_ids: Union[list, None] = None, statuses: Union[list, None] = None,
+                      created_range: tuple = (None, None), finished_range: tuple = (None, None)):
+        """
+        latest jobs first. filters are the same as `get_jobs_dsl`.
+
+        :param limit: int - max number of jobs in this page
+        :param cursor: str - cursor from the previous page. first page if None
+        :return: tuple - (job status list, cursor for the next page. None if it is the last page)
+        """
+        search_after = None if cursor is None else PaginationCursor.decode(cursor, len(self.LIST_SORT))
+        dsl = self.get_jobs_dsl(limit + 1, process_ids, statuses, created_range, finished_range)
+        job_hits = self.__es_middleware.query_after(dsl, search_after, querying_index=JobConstants.OGC_JOB_INDEX_ALIAS)['hits']['hits']
+        return self.__get_jobs_page(job_hits, limit)
+
+    async def get_jobs_page_async(self, limit: int, cursor: Union[str, None] = None, process_ids: Union[list, None] = None, statuses: Union[list, None] = None,
+                                  created_range: tuple = (None, None), finished_range: tuple = (None, None)):
+        """
+        same as get_jobs_page with an AsyncESMiddleware
+        """
+        search_after = None if cursor is None else PaginationCursor.decode(cursor, len(self.LIST_SORT))
+        dsl = self.get_jobs_dsl(limit + 1, process_ids, statuses, created_range, finished_range)
+        job_hits = (await self.__es_middleware.query_after(dsl, search_after, querying_index=JobConstants.OGC_JOB_INDEX_ALIAS))['hits']['hits']
+        return self.__get_jobs_page(job_hits, limit)
+
+    def __get_jobs_page(self, job_hits: list, limit: int):
+        next_cursor = PaginationCursor.encode(job_hits[limit - 1]['sort']) if len(job_hits) > limit else None
+        return [self.get_job_status_projection(k['_source']) for k in job_hits[:limit]], next_cursor
+
     def get_cached_stage_output(self, cached_job, checking_stage):
         print(f'cached_job: {cached_job}')
         cached_results = []
@@ -73,37 +166,57 @@ class OgcJobs:
                 cached_results.append(each)
         return cached_results
 
+    @staticmethod
+    def get_inputs_hash(job_inputs: dict):
+        """
+        canonical fingerprint of the job inputs. key order does not matter. list order does.
+
+        :param job_inputs: dict - `job.inputs` of a job
+        :return: str - sha256 hex digest
+        """
+        canonical_inputs = json.dumps(job_inputs, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical_inputs.encode()).hexdigest()
+
     def get_cached_result(self, ingesting_dict: dict):
-        existing_jobs = self.get_existing_same_jobs(ingesting_dict['processID'], ingesting_dict['processVersion'], ingesting_dict['jobID'], int(Config().get_value(Config.CACHING_JOBS, Config.DEFAULT_CONFIG_JOBS)))
-        ingesting_dict = ingesting_dict['job']['inputs']
-        for each_existing_job in existing_jobs:
-            each_existing_job_inputs = each_existing_job['job']['inputs']
-            if each_existing_job_inputs == ingesting_dict:  # current assumption is everything must be the same. executing jobs. ancillary process results and other params.
-                return each_existing_job
-        return None
-
-    def get_existing_same_jobs(self, process_id: str, process_version: str, job_id: str, number_of_jobs:int = 100):
+        """
+        find the latest successful job of the same process version with exactly the same inputs
+
+        :param ingesting_dict: dict - current job details
+        :return: dict - partial job details with `jobID` and `job.outputs`. None if there is no such job
+        """
+        inputs_hash = ingesting_dict['inputsHash'] if 'inputsHash' in ingesting_dict else self.get_inputs_hash(ingesting_dict['job']['inputs'])
         dsl_query = {
-            'size': number_of_jobs,
+            'size': 1,
+            '_source': ['jobID', 'job.outputs'],
+            'track_total_hits': False,
             'query': {
-                'bool': {'must': [
-                    {'term': {'processID': process_id}},
-                    {'term': {'processVersion': process_version}},
-                    {'bool': {'must_not': [
-                        {'term': {'jobID': job_id}},
-                        {'term': {'finished': -999}},
-                    ]}}
-                ]}
+                'bool': {
+                    'filter': [  # exact matches. no scoring and cached by ES
+                        {'term': {'processID': ingesting_dict['processID']}},
+                        {'term': {'processVersion': ingesting_dict['processVersion']}},
+                        {'term': {'inputsHash': inputs_hash}},
+                        {'term': {'status': JobConstants.JOB_STATUS_SUCCESS}},
+                    ],
+                    'must_not': [
+                        {'term': {'jobID': ingesting_dict['jobID']}},
+                    ]
+                }
             },
-            'sort': [{'started': {'order': 'desc'}}],
+            'sort': [{'finished': {'order': 'desc'}}],
         }
         job_results = self.__es_middleware.query(dsl_query, querying_index=JobConstants.OGC_JOB_INDEX_ALIAS)
         if len(job_results['hits']['hits']) < 1:
-            return []
-        return [k['_source'] for k in job_results['hits']['hits']]
+            return None
+        return job_results['hits']['hits'][0]['_source']
 
     def get_job_result(self, job_id: str):
-        job_detail = self.get_job_raw(job_id)
+        return self.__get_job_result(self.get_job_raw(job_id, includes=self.RESULT_FIELDS), job_id)
+
+    async def get_job_result_async(self, job_id: str):
+        return self.__get_job_result(await self.get_job_raw_async(job_id, includes=self.RESULT_FIELDS), job_id)
+
+    @staticmethod
+    def __get_job_result(job_detail: dict, job_id: str):
         if 'job' in job_detail and 'outputs' in job_detail['job']:
             return {
                 'processResults': job_detail['job']['outputs']
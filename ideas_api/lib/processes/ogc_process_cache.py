@@ -0,0 +1,88 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import logging
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Callable
+
+from ideas_api.lib.processes.ogc_process_stages import OgcProcessStages
+from ideas_api.lib.utils.singleton_base import Singleton
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OgcProcessCache(metaclass=Singleton):
+    """
+    process definitions and their OgcProcessStages for each (processID, version)
+    which are shared across messages in the same container.
+
+    Entries are refreshed after DEFAULT_TTL seconds so that a re-registration in another container is picked up.
+    create_new_process invalidates the entry in its own container right away.
+    """
+    DEFAULT_MAX_SIZE = 128
+    DEFAULT_TTL = 300  # seconds
+
+    def __init__(self):
+        self.__processes = OrderedDict()
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    def get_process(self, process_id: str, process_version: str, process_loader: Callable[[str, str], dict]):
+        """
+        :param process_id: str - process id
+        :param process_version: str - process version
+        :param process_loader: Callable - retrieving the process definition from ES if it is not cached. f(process_id, process_version) -> dict
+        :return: tuple - (process definition, OgcProcessStages). both are shared. they must not be modified.
+        """
+        cache_key = (process_id, process_version)
+        with self.__lock:
+            if cache_key in self.__processes and self.__processes[cache_key][2] > monotonic():
+                self.__processes.move_to_end(cache_key)
+                self.__hits += 1
+                return self.__processes[cache_key][0], self.__processes[cache_key][1]
+            self.__misses += 1
+        LOGGER.debug(f'loading process definition for {cache_key}')
+        process_def = process_loader(process_id, process_version)
+        process_stages = OgcProcessStages().setup(process_def)
+        with self.__lock:
+            self.__processes[cache_key] = (process_def, process_stages, monotonic() + self.DEFAULT_TTL)
+            self.__processes.move_to_end(cache_key)
+            while len(self.__processes) > self.DEFAULT_MAX_SIZE:
+                self.__processes.popitem(last=False)
+        return process_def, process_stages
+
+    def invalidate(self, process_id: str, process_version: str):
+        """
+        the latest version of a process is cached with an empty version. it is invalidated as well.
+        """
+        with self.__lock:
+            self.__processes.pop((process_id, process_version), None)
+            self.__processes.pop((process_id, ''), None)
+        return self
+
+    def clear(self):
+        with self.__lock:
+            self.__processes.clear()
+            self.__hits = 0
+            self.__misses = 0
+        return self
@@ -0,0 +1,114 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+import logging
+from collections import OrderedDict
+from threading import Lock
+
+from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator, CompiledSchemaRegistry
+from ideas_api.lib.utils.singleton_base import Singleton
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OgcProcessInputValidator:
+    """
+    validators for the `inputs` of a single process definition.
+
+    The whole `inputs` object is validated with one compiled validator with the shared `definitions`.
+    Per-key validators are only built when it fails so that the errors can be reported for each key.
+    """
+    def __init__(self, process_details: dict):
+        self.__process_id = process_details['id']
+        self.__process_version = process_details['version']
+        self.__fingerprint = self.get_fingerprint(process_details)
+        self.__definitions = process_details['definitions'] if 'definitions' in process_details else {}
+        self.__process_inputs = process_details['inputs']
+        self.__inputs_validator = SingleJsonValidator().load_schema({
+            'type': 'object',
+            'properties': self.__process_inputs,
+            'additionalProperties': False,
+            'definitions': self.__definitions,
+        })
+
+    @staticmethod
+    def get_fingerprint(process_details: dict):
+        return CompiledSchemaRegistry.get_schema_hash({
+            'inputs': process_details['inputs'],
+            'definitions': process_details['definitions'] if 'definitions' in process_details else {},
+        })
+
+    @property
+    def fingerprint(self):
+        return self.__fingerprint
+
+    def __get_input_schema(self, input_key: str):
+        return {**self.__process_inputs[input_key], 'definitions': self.__definitions}
+
+    def validate(self, job_inputs: dict):
+        """
+        :param job_inputs: dict - `inputs` of the new job
+        :return: dict - validation errors for each key. empty if all keys are valid
+        """
+        validation_result, _ = self.__inputs_validator.validate(job_inputs)
+        if validation_result is True:
+            return {}
+        validation_errors = {}
+        for k, v in job_inputs.items():
+            if k not in self.__process_inputs:
+                validation_errors[k] = {'message': f'not defined in process details: {self.__process_id}___{self.__process_version}'}
+                continue
+            input_schema = self.__get_input_schema(k)
+            validation_result, validation_details = SingleJsonValidator().load_schema(input_schema).validate(v)
+            if validation_result is False:
+                validation_errors[k] = {
+                    'message': 'validation failed',
+                    'details': validation_details,
+                    'schema': input_schema,
+                }
+        return validation_errors
+
+
+class OgcProcessInputValidatorCache(metaclass=Singleton):
+    """
+    OgcProcessInputValidator for each (processID, version) which is shared across job submissions.
+
+    A cached validator is rebuilt if the fingerprint of the retrieved process definition is different,
+    which happens if the same process is re-registered from another container.
+    """
+    DEFAULT_MAX_SIZE = 128
+
+    def __init__(self):
+        self.__validators = OrderedDict()
+        self.__lock = Lock()
+
+    def get_validator(self, process_details: dict) -> OgcProcessInputValidator:
+        cache_key = (process_details['id'], process_details['version'])
+        fingerprint = OgcProcessInputValidator.get_fingerprint(process_details)
+        with self.__lock:
+            if cache_key in self.__validators and self.__validators[cache_key].fingerprint == fingerprint:
+                self.__validators.move_to_end(cache_key)
+                return self.__validators[cache_key]
+        LOGGER.debug(f'building input validator for {cache_key}')
+        input_validator = OgcProcessInputValidator(process_details)
+        with self.__lock:
+            self.__validators[cache_key] = input_validator
+            self.__validators.move_to_end(cache_key)
+            while len(self.__validators) > self.DEFAULT_MAX_SIZE:
+                self.__validators.popitem(last=False)
+        return input_validator
+
+    def invalidate(self, process_id: str, process_version: str):
+        with self.__lock:
+            self.__validators.pop((process_id, process_version), None)
+        return self
@@ -13,7 +13,7 @@
 import logging
 
 from ideas_api.lib.job_management.job_constants import JobConstants
-from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator
+from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator, CompiledSchemaRegistry
 
 LOGGER = logging.getLogger(__name__)
 PROCESS_STAGES_SCHEMA = {
@@ -46,9 +46,13 @@ PROCESS_STAGES_SCHEMA = {
     }
     }
 }
+CompiledSchemaRegistry().warm_up([PROCESS_STAGES_SCHEMA])
 
 
 class OgcProcessStages:
+    CACHE_INPUTS_SUFFIX = 'CacheInputs'
+    CACHE_TTL_KEY = 'stageCacheTtl'
+
     def __init__(self):
         self.__total_stages = -1
         self.__stages_dict = {}
@@ -59,6 +63,7 @@ class OgcProcessStages:
         if not validation_result:
             raise ValueError(f'invalid PROCESS_STAGES_SCHEMA: {validation_details}')
         self.__stages_dict = {k['name']: k['value'] for k in process_def['additionalParameters']['parameters']}
+        self.__sub_process_dict = {}
         if 'stagesCount' not in self.__stages_dict:
             raise ValueError(f'invalid process definition. missing key-value pair: stagesCount')
         self.__total_stages = int(self.__stages_dict['stagesCount'][0])
@@ -85,6 +90,26 @@ class OgcProcessStages:
             raise ValueError(f'one or more errors: {stage_errors}')
         return self
 
+    def get_cache_input_keys(self, current_sub_process: str):
+        """
+        input keys which the outputs of a sub process depend on. declared as `<sub_process>CacheInputs`.
+        keys of earlier stages should be declared as well if the sub process depends on their outputs.
+
+        :param current_sub_process: str - sub process name
+        :return: list - sorted input keys. empty list if the sub process is not cached
+        """
+        if current_sub_process not in self.__sub_process_dict:
+            raise ValueError(f'unknown sub process name: {current_sub_process}')
+        return sorted(set(self.__stages_dict.get(f'{current_sub_process}{self.CACHE_INPUTS_SUFFIX}', [])))
+
+    def get_cache_ttl(self):
+        """
+        :return: int - seconds for the cached stage outputs to stay valid. declared as `stageCacheTtl`
+        """
+        if self.CACHE_TTL_KEY not in self.__stages_dict:
+            return JobConstants.DEFAULT_STAGE_CACHE_TTL
+        return int(self.__stages_dict[self.CACHE_TTL_KEY][0])
+
     def get_process_range(self, current_sub_process: str):
         if current_sub_process not in self.__sub_process_dict:
             raise ValueError(f'unknown sub process name: {current_sub_process}')
@@ -10,48 +10,117 @@
 #  access to foreign persons.
 #  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-import json
+import asyncio
 import logging
 from typing import Union
 from uuid import uuid4
 
-from jsonschema.validators import validate
+from jsonschema.validators import validator_for
 from pydantic import BaseModel
 
 from ideas_api.lib.external_io.es_abstract import ESAbstract
 from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract
 from ideas_api.lib.job_management.job_constants import JobConstants
 from ideas_api.lib.ogc_processes.process_schema import process_schema
+from ideas_api.lib.processes.ogc_job_outbox import OgcJobOutbox
+from ideas_api.lib.processes.ogc_jobs import OgcJobs
+from ideas_api.lib.processes.ogc_process_cache import OgcProcessCache
+from ideas_api.lib.processes.ogc_process_input_validator import OgcProcessInputValidatorCache
 from ideas_api.lib.utils.TimeUtlis import TimeUtils
-from ideas_api.lib.utils.parallel_json_validator import SingleJsonValidator
+from ideas_api.lib.utils.pagination_cursor import PaginationCursor
 
 LOGGER = logging.getLogger(__name__)
+PROCESS_SCHEMA_VALIDATOR_CLASS = validator_for(process_schema)
+PROCESS_SCHEMA_VALIDATOR_CLASS.check_schema(process_schema)  # checking the metaschema only once.
+PROCESS_SCHEMA_VALIDATOR = PROCESS_SCHEMA_VALIDATOR_CLASS(process_schema)
 
 
+def get_process_schema_errors(new_process: dict):
+    """
+    validate a process definition against the precompiled OGC process schema
 
-
+    :param new_process: dict - incoming process definition
+    :return: list - every failing path with its error message. empty list if it is valid
+    """
+    schema_errors = sorted(PROCESS_SCHEMA_VALIDATOR.iter_errors(new_process), key=lambda k: list(map(str, k.absolute_path)))
+    return [{
+        'path': '/' + '/'.join([str(k) for k in each.absolute_path]),
+        'message': each.message,
+    } for each in schema_errors]
 
 
 class OgcProcess:
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+    SUMMARY_FIELDS = ['id', 'version', 'title', 'description']
+    SUMMARY_SORT = [{'id': {'order': 'asc'}}, {'version': {'order': 'asc'}}]
+
     def __init__(self, es_middleware: ESAbstract, pub_sub: PubSubAbstract):
         self.__es_middleware = es_middleware
         self.__pub_sub = pub_sub
 
-    def get_all_processes(self):
-        process_results = self.__es_middleware.query_pages({
-            '_source': ['id', 'version', 'title', 'description'],
+    @staticmethod
+    def __get_process_summary_dsl(size: int):
+        return {
+            'size': size,
+            '_source': OgcProcess.SUMMARY_FIELDS,
             'query': {
                 'bool': {
                     'must': [{'match_all': {}}]
                 }
             },
-            'sort': [{'id': {'order': 'asc'}}],
-        }, querying_index=JobConstants.OGC_PROCESS_INDEX_ALIAS)
-        return [k['_source'] for k in process_results['hits']['hits']]
+            'sort': OgcProcess.SUMMARY_SORT,
+        }
 
-    def get_single_process(self, process_id: str, version=''):
-        dsl_query = {
-            'size': 1000,
+    def get_processes_page(self, limit: int, cursor: Union[str, None] = None):
+        """
+        :param limit: int - max number of processes in this page
+        :param cursor: str - cursor from the previous page. first page if None
+        :return: tuple - (process summaries, cursor for the next page. None if it is the last page)
+        """
+        search_after = None if cursor is None else PaginationCursor.decode(cursor, len(self.SUMMARY_SORT))
+        process_results = self.__es_middleware.query_after(self.__get_process_summary_dsl(limit + 1), search_after, querying_index=JobConstants.OGC_PROCESS_INDEX_ALIAS)
+        return self.__get_processes_page(process_results['hits']['hits'], limit)
+
+    async def get_processes_page_async(self, limit: int, cursor: Union[str, None] = None):
+        """
+        same as get_processes_page with an AsyncESMiddleware
+        """
+        search_after = None if cursor is None else PaginationCursor.decode(cursor, len(self.SUMMARY_SORT))
+        process_results = await self.__es_middleware.query_after(self.__get_process_summary_dsl(limit + 1), search_after, querying_index=JobConstants.OGC_PROCESS_INDEX_ALIAS)
+        return self.__get_processes_page(process_results['hits']['hits'], limit)
+
+    @staticmethod
+    def __get_processes_page(process_hits: list, limit: int):
+        next_cursor = PaginationCursor.encode(process_hits[limit - 1]['sort']) if len(process_hits) > limit else None
+        return [k['_source'] for k in process_hits[:limit]], next_cursor
+
+    def iter_all_processes(self, page_size: int = 1000):
+        """
+        :param page_size: int - number of processes retrieved from ES at a time
+        :return: generator - process summaries
+        """
+        for each_page in self.__es_middleware.iter_pages(self.__get_process_summary_dsl(page_size), querying_index=JobConstants.OGC_PROCESS_INDEX_ALIAS):
+            for each_process in each_page:
+                yield each_process['_source']
+
+    async def iter_all_processes_async(self, page_size: int = 1000):
+        """
+        same as iter_all_processes with an AsyncESMiddleware
+
+        :return: async generator - process summaries
+        """
+        async for each_page in self.__es_middleware.iter_pages(self.__get_process_summary_dsl(page_size), querying_index=JobConstants.OGC_PROCESS_INDEX_ALIAS):
+            for each_process in each_page:
+                yield each_process['_source']
+
+    def get_all_processes(self):
+        return list(self.iter_all_processes())
+
+    @staticmethod
+    def __get_latest_process_dsl(process_id: str):
+        return {
+            'size': 1,
             'query': {
                 'bool': {'must': [
                     {'term': {'id': {'value': process_id}}}
@@ -59,30 +128,57 @@ class OgcProcess:
             },
             'sort': [{'version': {'order': 'desc'}}],
         }
-        if version != '':
-            dsl_query['query']['bool']['must'].append({'term': {'version': {'value': version}}})
-        process_results = self.__es_middleware.query(dsl_query, querying_index=JobConstants.OGC_PROCESS_INDEX_ALIAS)
-        if len(process_results['hits']['hits']) < 1:
+
+    @staticmethod
+    def __get_process_source(process_hit: Union[dict, None], process_id: str, version: str):
+        if process_hit is None:
             raise ValueError(f'no such process: {process_id}, optional version: {version}')
-        return process_results['hits']['hits'][0]['_source']
+        return process_hit['_source']
+
+    def get_single_process(self, process_id: str, version=''):
+        if version != '':
+            process_result = self.__es_middleware.get_by_id(f'{process_id}___{version}', JobConstants.OGC_PROCESS_INDEX_ALIAS)
+            return self.__get_process_source(process_result, process_id, version)
+        process_results = self.__es_middleware.query(self.__get_latest_process_dsl(process_id), querying_index=JobConstants.OGC_PROCESS_INDEX_ALIAS)
+        return self.__get_process_source(next(iter(process_results['hits']['hits']), None), process_id, version)
+
+    async def get_single_process_async(self, process_id: str, version=''):
+        """
+        same as get_single_process with an AsyncESMiddleware
+        """
+        if version != '':
+            process_result = await self.__es_middleware.get_by_id(f'{process_id}___{version}', JobConstants.OGC_PROCESS_INDEX_ALIAS)
+            return self.__get_process_source(process_result, process_id, version)
+        process_results = await self.__es_middleware.query(self.__get_latest_process_dsl(process_id), querying_index=JobConstants.OGC_PROCESS_INDEX_ALIAS)
+        return self.__get_process_source(next(iter(process_results['hits']['hits']), None), process_id, version)
 
     def create_new_instance(self, process_id: str, new_job: dict, version=''):
-        process_details = self.get_single_process(process_id, version)
-        process_inputs = process_details['inputs']
-        validation_errors = {}
-        for k, v in new_job['inputs'].items():
-            if k not in process_inputs:
-                validation_errors[k] = {'message': f'not defined in process details: {process_id}___{version}'}
-            else:
-                temp_schema = process_inputs[k]
-                temp_schema['definitions'] = process_details['definitions']
-                validation_result, validation_details = SingleJsonValidator().load_schema(temp_schema).validate(v)
-                if validation_result is False:
-                    validation_errors[k] = {
-                        'message': 'validation failed',
-                        'details': validation_details,
-                        'schema': temp_schema,
-                    }
+        ingesting_dict, response_dict = self.__get_new_instance(self.get_single_process(process_id, version), new_job)
+        self.__es_middleware.index_one(ingesting_dict, ingesting_dict['jobID'], JobConstants.OGC_JOB_INDEX_ALIAS, routing=ingesting_dict['jobID'])
+        OgcJobOutbox(self.__es_middleware, self.__pub_sub).publish(ingesting_dict['jobID'], ingesting_dict['processID'])
+        return response_dict
+
+    async def create_new_instance_async(self, process_id: str, new_job: dict, version=''):
+        """
+        same as create_new_instance with an AsyncESMiddleware.
+        the start message is published concurrently with indexing the job. So it costs about 1 round trip instead of 2.
+        a failed publish is left to the outbox sweeper. indexing errors are raised.
+        """
+        ingesting_dict, response_dict = self.__get_new_instance(await self.get_single_process_async(process_id, version), new_job)
+        await asyncio.gather(
+            self.__es_middleware.index_one(ingesting_dict, ingesting_dict['jobID'], JobConstants.OGC_JOB_INDEX_ALIAS, routing=ingesting_dict['jobID']),
+            OgcJobOutbox(self.__es_middleware, self.__pub_sub).publish_async(ingesting_dict['jobID'], ingesting_dict['processID']),
+        )
+        return response_dict
+
+    @staticmethod
+    def __get_new_instance(process_details: dict, new_job: dict):
+        """
+        :param process_details: dict - process definition
+        :param new_job: dict - incoming job
+        :return: tuple - (job document, response)
+        """
+        validation_errors = OgcProcessInputValidatorCache().get_validator(process_details).validate(new_job['inputs'])
         if len(validation_errors) > 0:
             raise ValueError(f'one or more keys are not valid. {validation_errors}')
         ingesting_dict = {
@@ -90,25 +186,18 @@ class OgcProcess:
             'processVersion': process_details['version'],
             'jobID': f'{uuid4()}-{TimeUtils.get_current_time()}',
             'job': new_job,
+            'inputsHash': OgcJobs.get_inputs_hash(new_job['inputs']),
             'created': int(TimeUtils().get_datetime_unix(False)),
             'started': -999,
             'finished': -999,
             'updated': -999,
             'progress': 0,
-            'status': 'ACCEPTED',
+            'status': JobConstants.JOB_STATUS_ACCEPTED,
             'type': 'process',  # hardcoded for now.
             'message': '',
             'outputs': [],
+            OgcJobOutbox.PENDING_FIELD: True,  # cleared once the start message is published
         }
-        job_started_msg = {
-            'messageType': 'RESULT',
-            'jobID': ingesting_dict['jobID'],
-            'status': 'SUCCESSFUL',
-            'stage': JobConstants.PRE_PROCESSED,
-            'message': 'Requesting to start this job',
-        }
-        self.__es_middleware.index_one(ingesting_dict, ingesting_dict['jobID'], JobConstants.OGC_JOB_INDEX_ALIAS)
-        self.__pub_sub.publish_msg(json.dumps(job_started_msg))
         response_dict = {
             'processID': process_details['id'],
             'type': 'process',
@@ -118,12 +207,13 @@ class OgcProcess:
             'created': ingesting_dict['created'],
             'progress': ingesting_dict['progress'],
         }
-        return response_dict
+        return ingesting_dict, response_dict
 
     def create_new_process(self, new_process: dict):
-        try:
-            validate(instance=new_process, schema=process_schema)
-        except Exception as errors:
-            raise ValueError(f'failed to validate incoming process against schema: {errors}')
+        schema_errors = get_process_schema_errors(new_process)
+        if len(schema_errors) > 0:
+            raise ValueError(f'failed to validate incoming process against schema: {schema_errors}')
         self.__es_middleware.index_one(new_process, f"{new_process['id']}___{new_process['version']}", JobConstants.OGC_PROCESS_INDEX_ALIAS)
+        OgcProcessInputValidatorCache().invalidate(new_process['id'], new_process['version'])
+        OgcProcessCache().invalidate(new_process['id'], new_process['version'])
         return self
@@ -0,0 +1,92 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import logging
+
+from ideas_api.lib.external_io.es_abstract import ESAbstract
+from ideas_api.lib.job_management.job_constants import JobConstants
+from ideas_api.lib.processes.ogc_jobs import OgcJobs
+from ideas_api.lib.utils.TimeUtlis import TimeUtils
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OgcStageCache:
+    """
+    outputs of a single sub process, keyed by the subset of the job inputs it depends on.
+    the document id is the cache key. so the latest result for the same key overwrites the older one.
+    """
+    def __init__(self, es_middleware: ESAbstract):
+        self.__es_middleware = es_middleware
+
+    @staticmethod
+    def get_cache_key(process_id: str, process_version: str, stage: str, job_inputs: dict, input_keys: list):
+        """
+        :param process_id: str - process id
+        :param process_version: str - process version
+        :param stage: str - sub process name
+        :param job_inputs: dict - `job.inputs` of a job
+        :param input_keys: list - input keys which the sub process depends on
+        :return: str - cache key. missing inputs are part of the key as null
+        """
+        return OgcJobs.get_inputs_hash({
+            'processID': process_id,
+            'processVersion': process_version,
+            'stage': stage,
+            'inputs': {k: job_inputs.get(k, None) for k in input_keys},
+        })
+
+    @staticmethod
+    def get_cache_doc(cache_key: str, job_details: dict, stage: str, outputs: list, ttl: int):
+        """
+        :param cache_key: str - result of `get_cache_key`
+        :param job_details: dict - job which produced the outputs
+        :param stage: str - sub process name
+        :param outputs: list - outputs of the sub process with prefixed names
+        :param ttl: int - seconds for the outputs to stay valid
+        :return: dict - ES document to be indexed with `cache_key` as the id
+        """
+        created = TimeUtils().get_datetime_unix(False)
+        return {
+            'processID': job_details['processID'],
+            'processVersion': job_details['processVersion'],
+            'stage': stage,
+            'cacheKey': cache_key,
+            'jobID': job_details['jobID'],
+            'outputs': outputs,
+            'created': created,
+            'expires': created + ttl,
+        }
+
+    def get_stage_output(self, cache_key: str):
+        """
+        :param cache_key: str - result of `get_cache_key`
+        :return: list - cached outputs. empty list if there is no valid entry
+        """
+        cache_doc = self.__es_middleware.get_by_id(cache_key, JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS, excludes=['cacheKey'])
+        if cache_doc is None:
+            return []
+        cache_doc = cache_doc['_source']
+        if cache_doc['expires'] < TimeUtils().get_datetime_unix(False):
+            LOGGER.debug(f'expired stage cache: {cache_key}')
+            return []
+        return cache_doc['outputs']
+
+    def evict_expired(self):
+        """
+        :return: int - number of deleted entries
+        """
+        return self.__es_middleware.delete_by_query({
+            'query': {
+                'range': {'expires': {'lt': TimeUtils().get_datetime_unix(False)}}
+            }
+        }, JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS)
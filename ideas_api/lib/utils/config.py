@@ -23,6 +23,9 @@ class Config(metaclass=Singleton):
     SNS_TOPIC = 'SNS_TOPIC'
     ADMIN_GROUPS = 'ADMIN_GROUPS'
     CACHING_JOBS = 'CACHING_JOBS'
+    CLAIM_CHECK_BUCKET = 'CLAIM_CHECK_BUCKET'
+    CLAIM_CHECK_FILE_REPO = 'CLAIM_CHECK_FILE_REPO'
+    CLAIM_CHECK_THRESHOLD = 'CLAIM_CHECK_THRESHOLD'
     DEFAULT_CONFIG_JOBS = '100'
     def __init__(self):
         load_dotenv()
@@ -4,11 +4,39 @@ import logging
 
 from fastapi import APIRouter, HTTPException, Request, Response
 
+from ideas_api.lib.external_io.es_abstract import ESAbstract
+from ideas_api.lib.external_io.es_factory import ESFactory
+from ideas_api.lib.utils.config import Config
+
 LOGGER = logging.getLogger(__name__)
 # LambdaLoggerGenerator.get_logger(__name__, LambdaLoggerGenerator.get_level_from_env())
 
 
 class FastApiUtils:
+    @staticmethod
+    def get_es_middleware() -> ESAbstract:
+        """
+        FastAPI dependency for ES middleware which reuses the pooled ES client across requests
+        :return: ESAbstract
+        """
+        config = Config()
+        return ESFactory().get_pooled_instance('AWS',
+                                               base_url=config.get_value(Config.ES_URL),
+                                               port=int(config.get_value(Config.ES_PORT, '443')),
+                                               index='NA')
+
+    @staticmethod
+    def get_async_es_middleware() -> ESAbstract:
+        """
+        same as get_es_middleware. But its calls are coroutines which do not block the event loop
+        :return: AsyncESMiddleware
+        """
+        config = Config()
+        return ESFactory().get_pooled_instance('ASYNC_AWS',
+                                               base_url=config.get_value(Config.ES_URL),
+                                               port=int(config.get_value(Config.ES_PORT, '443')),
+                                               index='NA')
+
     @staticmethod
     def get_authorization_info(request: Request):
         """
@@ -0,0 +1,42 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import base64
+import json
+
+
+class PaginationCursor:
+    """
+    opaque token for the next page. it is the `sort` values of the last hit for `search_after`.
+    """
+    @staticmethod
+    def encode(sort_values: list):
+        """
+        :param sort_values: list - `sort` of the last hit in current page
+        :return: str - url-safe token
+        """
+        return base64.urlsafe_b64encode(json.dumps(sort_values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode(cursor: str, sort_size: int):
+        """
+        :param cursor: str - token from `encode`
+        :param sort_size: int - number of sort fields in the query
+        :return: list - `search_after` values
+        """
+        try:
+            sort_values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+        except Exception as e:
+            raise ValueError(f'invalid cursor: {cursor}') from e
+        if not isinstance(sort_values, list) or len(sort_values) != sort_size:
+            raise ValueError(f'invalid cursor: {cursor}')
+        return sort_values
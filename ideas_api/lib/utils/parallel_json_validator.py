@@ -19,14 +19,92 @@
 # limitations under the License.
 
 import fastjsonschema
+import hashlib
+import json
 import logging
+import os
+from collections import OrderedDict
 from datetime import datetime
 from multiprocessing import Pool
+from threading import Lock
 from ideas_api.lib.utils.singleton_base import Singleton
 
 LOGGER = logging.getLogger(__name__)
 
 
+class CompiledSchemaRegistry(metaclass=Singleton):
+    """
+    process-wide cache of compiled fastjsonschema validators.
+
+    fastjsonschema.compile generates and execs python source. It is expensive, and the same handful of schemas
+    are compiled for every incoming message. Compiled validators are keyed by a canonical hash of the schema,
+    and the least recently used one is evicted when the registry is full.
+    """
+    MAX_SIZE_KEY = 'SCHEMA_REGISTRY_SIZE'
+    DEFAULT_MAX_SIZE = '256'
+
+    def __init__(self):
+        self.__max_size = int(os.environ.get(self.MAX_SIZE_KEY, self.DEFAULT_MAX_SIZE))
+        self.__validators = OrderedDict()
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    @staticmethod
+    def get_schema_hash(schema: dict):
+        canonical_schema = json.dumps(schema, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical_schema.encode()).hexdigest()
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    @property
+    def size(self):
+        return len(self.__validators)
+
+    def get_stats(self):
+        return {
+            'hits': self.__hits,
+            'misses': self.__misses,
+            'size': len(self.__validators),
+            'max_size': self.__max_size,
+        }
+
+    def get_validator(self, schema: dict):
+        schema_hash = self.get_schema_hash(schema)
+        with self.__lock:
+            if schema_hash in self.__validators:
+                self.__hits += 1
+                self.__validators.move_to_end(schema_hash)
+                return self.__validators[schema_hash]
+            self.__misses += 1
+        compiled_validator = fastjsonschema.compile(schema)  # compiling outside the lock. worst case, it is compiled twice.
+        with self.__lock:
+            self.__validators[schema_hash] = compiled_validator
+            self.__validators.move_to_end(schema_hash)
+            while len(self.__validators) > self.__max_size:
+                evicted_hash, _ = self.__validators.popitem(last=False)
+                LOGGER.debug(f'evicting compiled schema: {evicted_hash}')
+        return compiled_validator
+
+    def warm_up(self, schemas: list):
+        for each_schema in schemas:
+            self.get_validator(each_schema)
+        return self
+
+    def clear(self):
+        with self.__lock:
+            self.__validators.clear()
+            self.__hits = 0
+            self.__misses = 0
+        return self
+
+
 def __validate_small_data(small_data):
     validator = ParallelJsonValidator()
     try:
@@ -60,7 +138,7 @@ class ParallelJsonValidator(metaclass=Singleton):
         :param val:
         :return: None
         """
-        self.__schema = fastjsonschema.compile(val)
+        self.__schema = CompiledSchemaRegistry().get_validator(val)
         return
 
     def load_schema(self, input_schema):
@@ -101,7 +179,7 @@ class SingleJsonValidator(object):
         :param val:
         :return: None
         """
-        self.__schema = fastjsonschema.compile(val)
+        self.__schema = CompiledSchemaRegistry().get_validator(val)
         return
 
     def load_schema(self, input_schema):
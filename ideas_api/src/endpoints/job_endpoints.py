@@ -10,17 +10,22 @@
 #  access to foreign persons.
 #  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+import json
 import logging
+from typing import Union, List
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from fastapi.responses import StreamingResponse
 from ideas_api.lib.external_io.es_abstract import ESAbstract
-from ideas_api.lib.external_io.es_factory import ESFactory
 from ideas_api.lib.job_management.job_constants import JobConstants
+from ideas_api.lib.processes.ogc_job_logs import OgcJobLogs
 from ideas_api.lib.processes.ogc_jobs import OgcJobs
-from ideas_api.lib.utils.config import Config
-from ideas_api.src.in_out_models.in_out_models import JobStatusResponse, JobResultResponse
+from ideas_api.lib.utils.fast_api_utils import FastApiUtils
+from ideas_api.src.in_out_models.in_out_models import JobStatusResponse, JobResultResponse, JobListResponse, \
+    JobLogsResponse
 
 LOGGER = logging.getLogger(__name__)
+NDJSON = 'ndjson'
 
 router = APIRouter(
     prefix=f'/{JobConstants.JOBS}',
@@ -29,16 +34,44 @@ router = APIRouter(
 )
 
 
+@router.get("")
+async def get_jobs(request: Request, limit: int = Query(OgcJobs.DEFAULT_LIMIT, ge=1, le=OgcJobs.MAX_LIMIT), cursor: Union[str, None] = None,
+                   processID: Union[List[str], None] = Query(None), status: Union[List[str], None] = Query(None),
+                   created_after: Union[int, None] = None, created_before: Union[int, None] = None,
+                   finished_after: Union[int, None] = None, finished_before: Union[int, None] = None,
+                   es_middleware: ESAbstract = Depends(FastApiUtils.get_async_es_middleware)) -> JobListResponse:
+    """
+    latest jobs first.
+
+    `processID`, `status`: can be repeated to match any of them.
+
+    `created_after`, `created_before`, `finished_after`, `finished_before`: unix timestamps in seconds. inclusive.
+
+    `cursor`: from the `next` link of the previous page.
+
+    ---
+    """
+    try:
+        jobs, next_cursor = await OgcJobs(es_middleware).get_jobs_page_async(limit, cursor, processID, status,
+                                                                             (created_after, created_before), (finished_after, finished_before))
+    except ValueError as ve:
+        LOGGER.exception('failed during get_jobs')
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        LOGGER.exception('failed during get_jobs')
+        raise HTTPException(status_code=500, detail=str(e))
+    links = [{'href': str(request.url), 'rel': 'self', 'type': 'application/json'}]
+    if next_cursor is not None:
+        links.append({'href': str(request.url.include_query_params(cursor=next_cursor)), 'rel': 'next', 'type': 'application/json', 'title': 'next page'})
+    return {'jobs': jobs, 'links': links}
+
+
 @router.get("/{job_id}")
-async def get_job_status(request: Request, job_id: str) -> JobStatusResponse:
+async def get_job_status(request: Request, job_id: str,
+                         es_middleware: ESAbstract = Depends(FastApiUtils.get_async_es_middleware)) -> JobStatusResponse:
     LOGGER.debug(f"Authorization: {request.headers['Authorization']}")
-    config = Config()
-    es_middleware: ESAbstract = ESFactory().get_instance('AWS',
-                                                         base_url=config.get_value(Config.ES_URL),
-                                                         port=int(config.get_value(Config.ES_PORT, '443')),
-                                                         index='NA')
     try:
-        job_status = OgcJobs(es_middleware).get_job_status(job_id)
+        job_status = await OgcJobs(es_middleware).get_job_status_async(job_id)
     except Exception as e:
         LOGGER.exception('failed during get_job_status')
         raise HTTPException(status_code=500, detail=str(e))
@@ -46,15 +79,66 @@ async def get_job_status(request: Request, job_id: str) -> JobStatusResponse:
 
 
 @router.get("/{job_id}/results")
-async def get_job_result(request: Request, job_id: str) -> JobResultResponse:
-    config = Config()
-    es_middleware: ESAbstract = ESFactory().get_instance('AWS',
-                                                         base_url=config.get_value(Config.ES_URL),
-                                                         port=int(config.get_value(Config.ES_PORT, '443')),
-                                                         index='NA')
+async def get_job_result(request: Request, job_id: str,
+                         es_middleware: ESAbstract = Depends(FastApiUtils.get_async_es_middleware)) -> JobResultResponse:
     try:
-        job_result = OgcJobs(es_middleware).get_job_result(job_id)
+        job_result = await OgcJobs(es_middleware).get_job_result_async(job_id)
     except Exception as e:
         LOGGER.exception('failed during get_job_status')
         raise HTTPException(status_code=500, detail=str(e))
     return job_result
+
+
+async def _stream_logs(first_log: Union[dict, None], job_logs):
+    if first_log is None:
+        return
+    yield f'{json.dumps(first_log)}\n'
+    async for each in job_logs:
+        yield f'{json.dumps(each)}\n'
+
+
+@router.get("/{job_id}/logs")
+async def get_job_logs(request: Request, job_id: str, limit: int = Query(OgcJobLogs.DEFAULT_LIMIT, ge=1, le=OgcJobLogs.MAX_LIMIT),
+                       cursor: Union[str, None] = None, since: Union[int, None] = None,
+                       format: str = Query('json', regex=f'^(json|{NDJSON})$'), follow: bool = False,
+                       es_middleware: ESAbstract = Depends(FastApiUtils.get_async_es_middleware)) -> JobLogsResponse:
+    """
+    logs of a job in the order they are written.
+
+    `since`: unix timestamp in seconds. inclusive.
+
+    `cursor`: from the `next` link of the previous page.
+
+    `format`: `ndjson` to stream all logs one per line. `limit` is ignored.
+
+    `follow`: with `ndjson`, keep streaming new logs till the job is finished. up to 20 seconds to stay within the API Gateway timeout.
+    behind API Gateway and Lambda, the response is buffered and returned at once when following ends.
+    to watch a running job there, poll without `follow` using `since` instead.
+
+    ---
+    """
+    if format == NDJSON:
+        try:
+            job_logs = OgcJobLogs(es_middleware).iter_logs_async(job_id, cursor, since, follow)
+            first_log = await job_logs.__anext__()  # errors before streaming are reported as usual
+        except StopAsyncIteration:
+            first_log = None
+        except ValueError as ve:
+            LOGGER.exception('failed during get_job_logs')
+            raise HTTPException(status_code=400, detail=str(ve))
+        except Exception as e:
+            LOGGER.exception('failed during get_job_logs')
+            raise HTTPException(status_code=500, detail=str(e))
+        return StreamingResponse(_stream_logs(first_log, job_logs), media_type='application/x-ndjson')
+    try:
+        job_logs, next_cursor = await OgcJobLogs(es_middleware).get_logs_page_async(job_id, limit, cursor, since)
+    except ValueError as ve:
+        LOGGER.exception('failed during get_job_logs')
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        LOGGER.exception('failed during get_job_logs')
+        raise HTTPException(status_code=500, detail=str(e))
+    links = [{'href': str(request.url), 'rel': 'self', 'type': 'application/json'}]
+    if next_cursor is not None:
+        links.append({'href': str(request.url.include_query_params(cursor=next_cursor)), 'rel': 'next', 'type': 'application/json', 'title': 'next page'})
+    return {'logs': job_logs, 'links': links}
@@ -11,10 +11,11 @@
 #  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 import json
 import logging
+from typing import Union
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import StreamingResponse
 from ideas_api.lib.external_io.es_abstract import ESAbstract
-from ideas_api.lib.external_io.es_factory import ESFactory
 from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract
 from ideas_api.lib.external_io.pub_sub_factory import PubSubFactory
 from ideas_api.lib.job_management.job_constants import JobConstants
@@ -23,6 +24,8 @@ from ideas_api.lib.utils.config import Config
 from ideas_api.lib.utils.fast_api_utils import FastApiUtils
 from ideas_api.src.in_out_models.in_out_models import NewJobItem, JobStatusResponse, ProcessPayload, ProcessOverviewResponse
 
+ALL_PROCESSES = 'all'
+
 LOGGER = logging.getLogger(__name__)
 
 router = APIRouter(
@@ -42,7 +45,8 @@ TODO
 - processes to check for cached result (previous result)  # Delegated. applications will return it as they know better which cached results matches the time ranges from job id 
 """
 @router.put("")
-async def create_new_process(request: Request, new_job_item: ProcessPayload):
+def create_new_process(request: Request, new_job_item: ProcessPayload,
+                       es_middleware: ESAbstract = Depends(FastApiUtils.get_es_middleware)):
     """
 
     Example Test Case: https://github.jpl.nasa.gov/IDEAS/ideas-api/blob/ogc.proposal/tests/integration_tests/test_ogc_processes.py#L37
@@ -64,10 +68,6 @@ async def create_new_process(request: Request, new_job_item: ProcessPayload):
     if not is_admin:
         raise HTTPException(status_code=403, detail=f'user is not admin. {defined_admin_groups}')
 
-    es_middleware: ESAbstract = ESFactory().get_instance('AWS',
-                                                         base_url=config.get_value(Config.ES_URL),
-                                                         port=int(config.get_value(Config.ES_PORT, '443')),
-                                                         index='NA')
     try:
         OgcProcess(es_middleware, None).create_new_process(new_job_item.dict())
     except Exception as e:
@@ -76,42 +76,66 @@ async def create_new_process(request: Request, new_job_item: ProcessPayload):
     return {'message': 'registered'}
 
 
+async def _stream_processes(first_process: Union[dict, None], process_summaries, links: list):
+    yield '{"processes": ['
+    if first_process is not None:
+        yield json.dumps(first_process)
+        async for each in process_summaries:
+            yield f',{json.dumps(each)}'
+    yield f'], "links": {json.dumps(links)}}}'
+
+
 @router.get("")
-async def get_all_processes(request: Request) -> ProcessOverviewResponse:
+async def get_all_processes(request: Request, limit: str = str(OgcProcess.DEFAULT_LIMIT), cursor: Union[str, None] = None,
+                            es_middleware: ESAbstract = Depends(FastApiUtils.get_async_es_middleware)) -> ProcessOverviewResponse:
     """
 
     Example Test Case: https://github.jpl.nasa.gov/IDEAS/ideas-api/blob/ogc.proposal/tests/integration_tests/test_ogc_processes.py#L281
 
+    `limit`: number of processes in a page. up to 1000. `all` to stream every process in a single response.
+
+    `cursor`: from the `next` link of the previous page.
+
     ---
     """
-    config = Config()
-    es_middleware: ESAbstract = ESFactory().get_instance('AWS',
-                                                         base_url=config.get_value(Config.ES_URL),
-                                                         port=int(config.get_value(Config.ES_PORT, '443')),
-                                                         index='NA')
+    self_link = {'href': str(request.url), 'rel': 'self', 'type': 'application/json'}
+    if limit == ALL_PROCESSES:
+        try:
+            process_summaries = OgcProcess(es_middleware, None).iter_all_processes_async()
+            first_process = await process_summaries.__anext__()  # errors before streaming are reported as usual
+        except StopAsyncIteration:
+            first_process = None
+        except Exception as e:
+            LOGGER.exception('failed during get_all_processes')
+            raise HTTPException(status_code=500, detail=str(e))
+        return StreamingResponse(_stream_processes(first_process, process_summaries, [self_link]), media_type='application/json')
+    if not limit.isdigit() or not 0 < int(limit) <= OgcProcess.MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f'limit must be between 1 and {OgcProcess.MAX_LIMIT} or {ALL_PROCESSES}: {limit}')
     try:
-        all_process_summaries = OgcProcess(es_middleware, None).get_all_processes()
+        process_summaries, next_cursor = await OgcProcess(es_middleware, None).get_processes_page_async(int(limit), cursor)
+    except ValueError as ve:
+        LOGGER.exception('failed during get_all_processes')
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         LOGGER.exception('failed during get_all_processes')
         raise HTTPException(status_code=500, detail=str(e))
-    return {'processes': all_process_summaries}
+    links = [self_link]
+    if next_cursor is not None:
+        links.append({'href': str(request.url.include_query_params(cursor=next_cursor)), 'rel': 'next', 'type': 'application/json', 'title': 'next page'})
+    return {'processes': process_summaries, 'links': links}
 
 
 @router.get("/{process_id}")
-async def get_single_process(request: Request, process_id: str, version_id: str = '') -> ProcessPayload:
+async def get_single_process(request: Request, process_id: str, version_id: str = '',
+                             es_middleware: ESAbstract = Depends(FastApiUtils.get_async_es_middleware)) -> ProcessPayload:
     """
 
     Example Test Case: https://github.jpl.nasa.gov/IDEAS/ideas-api/blob/ogc.proposal/tests/integration_tests/test_ogc_processes.py#L293
 
     ---
     """
-    config = Config()
-    es_middleware: ESAbstract = ESFactory().get_instance('AWS',
-                                                         base_url=config.get_value(Config.ES_URL),
-                                                         port=int(config.get_value(Config.ES_PORT, '443')),
-                                                         index='NA')
     try:
-        process_details = OgcProcess(es_middleware, None).get_single_process(process_id, version=version_id)
+        process_details = await OgcProcess(es_middleware, None).get_single_process_async(process_id, version=version_id)
     except Exception as e:
         LOGGER.exception('failed during get_single_process')
         raise HTTPException(status_code=500, detail=str(e))
@@ -119,23 +143,23 @@ async def get_single_process(request: Request, process_id: str, version_id: str
 
 
 @router.post("/{process_id}/execution")
-async def execute_new_job(request: Request, new_job: NewJobItem, process_id: str, version_id: str = '') -> JobStatusResponse:
+async def execute_new_job(request: Request, new_job: NewJobItem, process_id: str, version_id: str = '',
+                          es_middleware: ESAbstract = Depends(FastApiUtils.get_async_es_middleware)) -> JobStatusResponse:
     """
 
     Example Test Case: https://github.jpl.nasa.gov/IDEAS/ideas-api/blob/ogc.proposal/tests/integration_tests/test_ogc_processes.py#L306
 
     Example New Job Item: https://github.jpl.nasa.gov/IDEAS/ideas-api/blob/ogc.proposal/ogc.proposal/ogc.job.storage.example.json
 
+    The job is stored and its start message is published concurrently. The response waits for both, about 1 round trip.
+    If publishing fails, the job is still accepted and the outbox sweeper starts it within a few minutes.
+
     ---
     """
     config = Config()
-    es_middleware: ESAbstract = ESFactory().get_instance('AWS',
-                                                         base_url=config.get_value(Config.ES_URL),
-                                                         port=int(config.get_value(Config.ES_PORT, '443')),
-                                                         index='NA')
     pub_sub: PubSubAbstract = PubSubFactory().get_instance('SNS').set_channel(config.get_value(Config.SNS_TOPIC))
     try:
-        new_job_response = OgcProcess(es_middleware, pub_sub).create_new_instance(process_id, new_job.dict(), version_id)
+        new_job_response = await OgcProcess(es_middleware, pub_sub).create_new_instance_async(process_id, new_job.dict(), version_id)
     except Exception as e:
         LOGGER.exception('failed during execute_new_job')
         raise HTTPException(status_code=500, detail=str(e))
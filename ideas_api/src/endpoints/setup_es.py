@@ -13,13 +13,14 @@
 import json
 import logging
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 
 from ideas_api.lib.external_io.es_abstract import ESAbstract
-from ideas_api.lib.external_io.es_factory import ESFactory
 from ideas_api.lib.job_management.job_constants import JobConstants, JOB_INDEX_MAPPING, OGC_PROCESS_MAPPING, \
-    OGC_JOB_MAPPING, JOB_STAGE_LOGS_MAPPING
-from ideas_api.lib.utils.config import Config
+    OGC_JOB_MAPPING, OGC_JOB_LOGS_TEMPLATE, OGC_JOB_LOGS_POLICY, OGC_JOB_LOGS_ROLLOVER_CONDITIONS, OGC_STAGE_CACHE_MAPPING, \
+    OGC_JOB_SCRIPTS
+from ideas_api.lib.processes.ogc_stage_cache import OgcStageCache
+from ideas_api.lib.utils.fast_api_utils import FastApiUtils
 
 router = APIRouter(
     prefix="/setup_es",
@@ -30,12 +31,7 @@ LOGGER = logging.getLogger(__name__)
 
 
 @router.put("")
-async def setup_es():
-    config = Config()
-    es_middleware: ESAbstract = ESFactory().get_instance('AWS',
-                                                         base_url=config.get_value(Config.ES_URL),
-                                                         port=int(config.get_value(Config.ES_PORT, '443')),
-                                                         index='NA')
+def setup_es(es_middleware: ESAbstract = Depends(FastApiUtils.get_es_middleware)):
     index_name = f'{JobConstants.JOB_INDEX_ALIAS}_1'
     errors = []
     try:
@@ -50,14 +46,56 @@ async def setup_es():
     except Exception as e:
         LOGGER.exception(f'failed to create index / alias - {JobConstants.OGC_PROCESS_INDEX_ALIAS}: {str(e)}')
         errors.append(f'failed to create index / alias - {JobConstants.OGC_PROCESS_INDEX_ALIAS}: {str(e)}')
+    try:  # template and policy go first so that they are applied to the 1st index as well
+        es_middleware.put_index_template(JobConstants.OGC_JOB_LOGS_TEMPLATE, OGC_JOB_LOGS_TEMPLATE)
+        es_middleware.put_lifecycle_policy(JobConstants.OGC_JOB_LOGS_POLICY, OGC_JOB_LOGS_POLICY)
+        if not es_middleware.has_index(JobConstants.OGC_JOB_LOGS_INDEX_ALIAS):
+            es_middleware.create_index(f'{JobConstants.OGC_JOB_LOGS_INDEX_ALIAS}-000001', {
+                'aliases': {JobConstants.OGC_JOB_LOGS_INDEX_ALIAS: {'is_write_index': True}}
+            })
+    except Exception as e:
+        LOGGER.exception(f'failed to create rollover index / alias - {JobConstants.OGC_JOB_LOGS_INDEX_ALIAS}: {str(e)}')
+        errors.append(f'failed to create rollover index / alias - {JobConstants.OGC_JOB_LOGS_INDEX_ALIAS}: {str(e)}')
     try:
-        es_middleware.create_index(f'{JobConstants.OGC_JOB_LOGS_INDEX_ALIAS}_1', JOB_STAGE_LOGS_MAPPING)
-        es_middleware.create_alias(f'{JobConstants.OGC_JOB_LOGS_INDEX_ALIAS}_1', JobConstants.OGC_JOB_LOGS_INDEX_ALIAS)
+        es_middleware.create_index(f'{JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS}_1', OGC_STAGE_CACHE_MAPPING)
+        es_middleware.create_alias(f'{JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS}_1', JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS)
     except Exception as e:
-        LOGGER.exception(f'failed to create index / alias - {JobConstants.OGC_PROCESS_INDEX_ALIAS}: {str(e)}')
-        errors.append(f'failed to create index / alias - {JobConstants.OGC_PROCESS_INDEX_ALIAS}: {str(e)}')
+        LOGGER.exception(f'failed to create index / alias - {JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS}: {str(e)}')
+        errors.append(f'failed to create index / alias - {JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS}: {str(e)}')
+    for script_id, script_source in OGC_JOB_SCRIPTS.items():
+        try:
+            es_middleware.put_script(script_id, script_source)
+        except Exception as e:
+            LOGGER.exception(f'failed to store script - {script_id}: {str(e)}')
+            errors.append(f'failed to store script - {script_id}: {str(e)}')
     # es_middleware.create_index(index_name, JOB_INDEX_MAPPING)
     # es_middleware.create_alias(index_name, JobConstants.JOB_INDEX_ALIAS)
     if len(errors) > 0:
         raise HTTPException(status_code=500, detail=json.dumps(errors))
     return {'status': 'finished'}
+
+
+@router.delete("/stage_cache")
+def evict_stage_cache(es_middleware: ESAbstract = Depends(FastApiUtils.get_es_middleware)):
+    """
+    the scheduled job outbox sweeper deletes expired entries every run. this is to do it right away.
+    """
+    try:
+        deleted_count = OgcStageCache(es_middleware).evict_expired()
+    except Exception as e:
+        LOGGER.exception(f'failed to evict expired stage cache: {str(e)}')
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'status': 'finished', 'deleted': deleted_count}
+
+
+@router.post("/job_logs/rollover")
+def rollover_job_logs(force: bool = False, es_middleware: ESAbstract = Depends(FastApiUtils.get_es_middleware)):
+    """
+    the policy rolls the logs over periodically. this is to do it right away.
+    """
+    try:
+        rolled_over = es_middleware.rollover(JobConstants.OGC_JOB_LOGS_INDEX_ALIAS, None if force else OGC_JOB_LOGS_ROLLOVER_CONDITIONS)
+    except Exception as e:
+        LOGGER.exception(f'failed to rollover {JobConstants.OGC_JOB_LOGS_INDEX_ALIAS}: {str(e)}')
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'status': 'finished', 'rolled_over': rolled_over}
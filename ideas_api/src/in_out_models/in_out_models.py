@@ -46,8 +46,16 @@ class ProcessOverviewSingle(BaseModel):
     description: str
 
 
+class OgcLink(BaseModel):
+    href: str
+    rel: str
+    type: str = 'application/json'
+    title: Union[str, None] = None
+
+
 class ProcessOverviewResponse(BaseModel):
     processes: list[ProcessOverviewSingle]
+    links: list[OgcLink] = []
 
 class JobResultResponse(BaseModel):
     processResults: list[StagedResult]
@@ -78,4 +86,21 @@ class ProcessPayload(BaseModel):
     additionalParameters: dict
     inputs: dict
     outputs: dict
-    definitions: dict = {}
\ No newline at end of file
+    definitions: dict = {}
+
+
+class JobListResponse(BaseModel):
+    jobs: list[JobStatusResponse]
+    links: list[OgcLink] = []
+
+
+class JobLog(BaseModel):
+    jobID: str
+    stage: str
+    message: str
+    updated: int
+
+
+class JobLogsResponse(BaseModel):
+    logs: list[JobLog]
+    links: list[OgcLink] = []
@@ -0,0 +1,77 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from botocore.credentials import RefreshableCredentials
+from requests import Request
+
+from ideas_api.lib.aws_base.aws_sigv4_auth import AwsSigV4Auth
+
+
+class FakeRotatingCredentialProvider:
+    def __init__(self):
+        self.counter = 0
+
+    def __call__(self):
+        self.counter += 1
+        return {
+            'access_key': f'AKIAFAKE{self.counter:04d}',
+            'secret_key': f'secret-{self.counter}',
+            'token': f'token-{self.counter}',
+            'expiry_time': (datetime.now(timezone.utc) + timedelta(minutes=1)).isoformat(),  # always within refresh window
+        }
+
+
+class TestAwsSigV4Auth(TestCase):
+    def __sign(self, aws_auth):
+        prepared_request = Request('GET', 'https://search-unit-test.us-west-2.es.amazonaws.com/ogc_job/_doc/1').prepare()
+        return aws_auth(prepared_request).headers
+
+    def test_01(self):
+        credential_provider = FakeRotatingCredentialProvider()
+        credentials = RefreshableCredentials.create_from_metadata(credential_provider(), credential_provider, 'fake')
+        aws_auth = AwsSigV4Auth(credentials, 'us-west-2', 'es')
+        first_headers = self.__sign(aws_auth)
+        second_headers = self.__sign(aws_auth)
+        self.assertTrue('Credential=AKIAFAKE0002/' in first_headers['Authorization'], f'wrong auth: {first_headers}')
+        self.assertEqual('token-2', first_headers['x-amz-security-token'])
+        self.assertTrue('Credential=AKIAFAKE0003/' in second_headers['Authorization'], f'keys are not rotated: {second_headers}')
+        self.assertEqual('token-3', second_headers['x-amz-security-token'])
+        return
+
+    def test_02(self):
+        credential_provider = FakeRotatingCredentialProvider()
+        metadata = credential_provider()
+        metadata['expiry_time'] = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+        credentials = RefreshableCredentials.create_from_metadata(metadata, credential_provider, 'fake')
+        aws_auth = AwsSigV4Auth(credentials, 'us-west-2', 'es')
+        self.__sign(aws_auth)
+        first_signing_key = aws_auth.signing_key
+        self.__sign(aws_auth)
+        self.assertTrue(first_signing_key is aws_auth.signing_key, 'signing key is not cached')
+        self.assertEqual(1, credential_provider.counter, 'credentials are refreshed before expiry')
+        return
+
+    def test_03(self):
+        credential_provider = FakeRotatingCredentialProvider()
+        credentials = RefreshableCredentials.create_from_metadata(credential_provider(), credential_provider, 'fake')
+        aws_auth = AwsSigV4Auth(credentials, 'us-west-2', 'es')
+        body = '{"query": {"match_all": {}}}'
+        signed_headers = aws_auth.get_signed_headers('POST', 'https://search-unit-test.us-west-2.es.amazonaws.com:443/ogc_job/_search?routing=job-1',
+                                                     body, {'content-type': 'application/json'})
+        self.assertTrue(signed_headers['content-type'].startswith('application/json'), 'signed content-type is the one to send')
+        self.assertTrue('SignedHeaders=content-type;host;x-amz-content-sha256;x-amz-date;x-amz-security-token' in signed_headers['Authorization'], signed_headers)
+        self.assertEqual(signed_headers['x-amz-content-sha256'], aws_auth.get_signed_headers('POST', 'https://search-unit-test.us-west-2.es.amazonaws.com/ogc_job/_search',
+                                                                                             body.encode(), {'content-type': 'application/json'})['x-amz-content-sha256'])
+        return
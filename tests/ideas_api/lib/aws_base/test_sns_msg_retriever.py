@@ -0,0 +1,57 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import json
+import tempfile
+from unittest import TestCase
+
+from ideas_api.lib.aws_base.sns_msg_retriever import LambdaEventMsgRetriever
+from ideas_api.lib.external_io.file_stream_local import FileStreamLocal
+from ideas_api.lib.external_io.msg_claim_check import MsgClaimCheck
+
+
+class TestLambdaEventMsgRetriever(TestCase):
+    def test_01(self):
+        sqs_event = {'Records': [
+            {'messageId': 'm1', 'body': json.dumps({'Message': json.dumps({'jobID': 'job-1'})})},
+            {'messageId': 'm2', 'body': 'not a json'},
+            {'messageId': 'm3', 'body': json.dumps({'Subject': 'missing message'})},
+            {'messageId': 'm4'},
+            {'messageId': 'm5', 'body': json.dumps({'Message': json.dumps({'jobID': 'job-2'})})},
+        ]}
+        msg_retriever = LambdaEventMsgRetriever()
+        real_msgs = msg_retriever.from_sqs_records(sqs_event)
+        self.assertEqual([('m1', {'jobID': 'job-1'}), ('m5', {'jobID': 'job-2'})], real_msgs)
+        self.assertEqual(['m2', 'm3', 'm4'], msg_retriever.invalid_message_ids)
+        with self.assertRaises(ValueError):
+            msg_retriever.from_sqs_records({'Records': []})
+        return
+
+    def test_02(self):
+        """
+        pointers of stored messages are resolved. unreadable ones are kept so that they can be retried
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            claim_check = MsgClaimCheck(FileStreamLocal(), tmp_dir, 100)
+            large_msg = {'messageType': 'REQUEST', 'jobID': 'job-1', 'stage': 'RRR', 'current_outputs': ['x' * 100]}
+            pointer = claim_check.check_in(large_msg)
+            missing_pointer = {**pointer, MsgClaimCheck.POINTER_FIELD: {**pointer[MsgClaimCheck.POINTER_FIELD], 'url': f'file://{tmp_dir}/missing.json'}}
+            sqs_event = {'Records': [
+                {'messageId': 'm1', 'body': json.dumps({'Message': json.dumps(pointer)})},
+                {'messageId': 'm2', 'body': json.dumps({'Message': json.dumps({'jobID': 'job-2'})})},
+                {'messageId': 'm3', 'body': json.dumps({'Message': json.dumps(missing_pointer)})},
+            ]}
+            msg_retriever = LambdaEventMsgRetriever(claim_check)
+            self.assertEqual([('m1', large_msg), ('m2', {'jobID': 'job-2'}), ('m3', missing_pointer)], msg_retriever.from_sqs_records(sqs_event))
+        self.assertEqual(['m3'], msg_retriever.unresolved_message_ids)
+        self.assertEqual([], msg_retriever.invalid_message_ids)
+        return
@@ -0,0 +1,49 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from ideas_api.lib.external_io.es_factory import ESFactory
+
+
+class TestESFactory(TestCase):
+    def test_01(self):
+        es_factory = ESFactory().clear_pool()
+        es_1 = es_factory.get_pooled_instance('NO_AUTH', base_url='http://localhost', port=9200, index='NA')
+        es_2 = ESFactory().get_pooled_instance('no_auth', base_url='http://localhost', port=9200, index='NA')
+        es_3 = ESFactory().get_pooled_instance('NO_AUTH', base_url='http://localhost', port=9201, index='NA')
+        self.assertTrue(es_1._engine is es_2._engine, 'ES client is not reused')
+        self.assertFalse(es_1._engine is es_3._engine, 'ES client is reused for a different port')
+        self.assertFalse(es_1._engine is ESFactory().get_instance('NO_AUTH', base_url='http://localhost', port=9200, index='NA')._engine)
+        return
+
+
+    def test_02(self):
+        """
+        the async AWS client is really built so that a missing `elasticsearch[async]` extra fails here
+        """
+        from elasticsearch import AsyncElasticsearch
+        from ideas_api.lib.external_io.es_middleware_aws_async import AwsSigV4AIOHttpConnection
+        aws_env = {'aws_access_key_id': 'AKIAUNITTEST', 'aws_secret_access_key': 'unit-test-secret', 'aws_region': 'us-west-2'}
+        with patch.dict(os.environ, aws_env):
+            es_middleware = ESFactory().clear_pool().get_pooled_instance('ASYNC_AWS', base_url='https://search-unit-test.us-west-2.es.amazonaws.com',
+                                                                           port=443, index='NA')
+        self.assertTrue(isinstance(es_middleware._engine, AsyncElasticsearch))
+        transport = es_middleware._engine.transport
+        self.assertTrue(transport.connection_class is AwsSigV4AIOHttpConnection)
+        transport.set_connections(transport.hosts)  # connections are created lazily on the 1st request otherwise
+        connection = transport.get_connection()
+        self.assertEqual('https://search-unit-test.us-west-2.es.amazonaws.com:443', connection.host)
+        ESFactory().clear_pool()
+        return
@@ -0,0 +1,141 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from elasticsearch.exceptions import ConflictError, NotFoundError
+
+from ideas_api.lib.external_io.es_abstract import VersionConflictError
+from ideas_api.lib.external_io.es_middleware import ESMiddleware
+
+
+class TestESMiddleware(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.engine = MagicMock()
+        self.es_middleware = ESMiddleware('default_index', 'localhost', engine=self.engine)
+
+    def test_01(self):
+        self.engine.get.return_value = {'_id': 'job-1', 'found': True, '_seq_no': 3, '_primary_term': 1, '_source': {'status': 'RUNNING'}}
+        result = self.es_middleware.get_by_id('job-1', 'ogc_job', includes=['status'])
+        self.assertEqual({'status': 'RUNNING'}, result['_source'])
+        self.engine.get.assert_called_once_with(index='ogc_job', id='job-1', ignore=404, _source_includes=['status'])
+        self.engine.get.return_value = {'_id': 'job-2', 'found': False}
+        self.assertEqual(None, self.es_middleware.get_by_id('job-2'))
+        self.assertEqual('default_index', self.engine.get.call_args.kwargs['index'])
+        self.engine.get.return_value = {'error': {'type': 'index_not_found_exception'}, 'status': 404}
+        with self.assertRaises(ValueError):
+            self.es_middleware.get_by_id('job-2', 'ogc_job')
+        return
+
+    def test_02(self):
+        self.engine.mget.return_value = {'docs': [
+            {'_id': 'job-1', 'found': True, '_source': {}},
+            {'_id': 'job-2', 'found': False},
+        ]}
+        result = self.es_middleware.mget(['job-1', 'job-2'], 'ogc_job', excludes=['job.outputs'])
+        self.assertEqual('job-1', result[0]['_id'])
+        self.assertEqual(None, result[1])
+        self.engine.mget.assert_called_once_with(body={'ids': ['job-1', 'job-2']}, index='ogc_job', _source_excludes=['job.outputs'])
+        self.assertEqual([], self.es_middleware.mget([], 'ogc_job'))
+        return
+
+    def test_03(self):
+        self.engine.bulk.return_value = {'errors': False, 'items': [{'index': {'_id': 'log-1'}}, {'update': {'_id': 'job-1'}}]}
+        self.es_middleware.bulk_write([
+            {'action': 'index', 'index': 'ogc_job_logs', 'id': 'log-1', 'doc': {'message': 'a'}},
+            {'action': 'update', 'index': 'ogc_job', 'id': 'job-1', 'doc': {'progress': 3}},
+        ])
+        self.assertEqual(1, self.engine.bulk.call_count)
+        self.assertEqual(4, len(self.engine.bulk.call_args.kwargs['body']))
+        self.engine.bulk.return_value = {'errors': True, 'items': [{'update': {'_id': 'job-1', 'error': {'type': 'version_conflict_engine_exception'}}}]}
+        with self.assertRaises(ValueError):
+            self.es_middleware.bulk_write([{'action': 'update', 'index': 'ogc_job', 'id': 'job-1', 'doc': {'progress': 3}}])
+        self.engine.bulk.return_value = {'errors': True, 'items': [{'update': {'_id': 'job-1', 'status': 409, 'error': {'type': 'version_conflict_engine_exception'}}}]}
+        with self.assertRaises(VersionConflictError):
+            self.es_middleware.bulk_write([{'action': 'update', 'index': 'ogc_job', 'id': 'job-1', 'doc': {'progress': 3}, 'if_seq_no': 2, 'if_primary_term': 1}])
+        self.assertEqual({'update': {'_index': 'ogc_job', '_id': 'job-1', 'if_seq_no': 2, 'if_primary_term': 1}}, self.engine.bulk.call_args.kwargs['body'][0])
+        with self.assertRaises(ValueError):
+            self.es_middleware.bulk_write([{'action': 'delete', 'index': 'ogc_job', 'id': 'job-1', 'doc': {}}])
+        return
+
+    def test_04(self):
+        self.engine.update.return_value = {'_id': 'job-1', '_seq_no': 8, '_primary_term': 1, 'result': 'updated'}
+        self.assertEqual(8, self.es_middleware.update_one({'progress': 3}, 'job-1', 'ogc_job', if_seq_no=7, if_primary_term=1))
+        self.assertEqual(7, self.engine.update.call_args.kwargs['if_seq_no'])
+        self.engine.update.side_effect = ConflictError(409, 'version_conflict_engine_exception', {})
+        with self.assertRaises(VersionConflictError):
+            self.es_middleware.update_one({'progress': 3}, 'job-1', 'ogc_job', if_seq_no=7, if_primary_term=1)
+        self.engine.update.side_effect = RuntimeError('connection lost')
+        self.assertEqual(None, self.es_middleware.update_one({'progress': 3}, 'job-1', 'ogc_job'))
+        return
+
+    def test_05(self):
+        self.engine.update.return_value = {'_id': 'job-1', '_seq_no': 9, '_primary_term': 1, 'result': 'updated'}
+        self.assertEqual(9, self.es_middleware.update_by_script('job-1', 'ogc_job_increase_progress', {'step_start': 1, 'step_end': 33}, 'ogc_job'))
+        self.assertEqual({'script': {'id': 'ogc_job_increase_progress', 'params': {'step_start': 1, 'step_end': 33}}}, self.engine.update.call_args.kwargs['body'])
+        self.assertEqual(3, self.engine.update.call_args.kwargs['retry_on_conflict'])
+        self.engine.bulk.return_value = {'errors': False, 'items': [{'update': {'_id': 'job-1'}}]}
+        self.es_middleware.bulk_write([{'action': 'update', 'index': 'ogc_job', 'id': 'job-1', 'script': {'id': 'ogc_job_update', 'params': {}}}])
+        self.assertEqual({'script': {'id': 'ogc_job_update', 'params': {}}}, self.engine.bulk.call_args.kwargs['body'][1])
+        self.engine.put_script.return_value = {'acknowledged': True}
+        self.assertEqual(True, self.es_middleware.put_script('ogc_job_update', 'ctx._source.a = 1'))
+        return
+
+    def test_06(self):
+        pages = [
+            {'hits': {'hits': [{'_id': '1', 'sort': ['a']}, {'_id': '2', 'sort': ['b']}]}},
+            {'hits': {'hits': [{'_id': '3', 'sort': ['c']}]}},
+        ]
+        self.engine.search.side_effect = pages
+        page_iterator = self.es_middleware.iter_pages({'size': 2, 'query': {'match_all': {}}, 'sort': [{'id': 'asc'}]}, 'ogc_process')
+        self.assertEqual(0, self.engine.search.call_count, 'lazy')
+        self.assertEqual([['1', '2'], ['3']], [[k['_id'] for k in each] for each in page_iterator])
+        self.assertEqual(2, self.engine.search.call_count)
+        self.assertTrue('search_after' not in self.engine.search.call_args_list[0].kwargs['body'])
+        self.assertEqual(['b'], self.engine.search.call_args_list[1].kwargs['body']['search_after'])
+        with self.assertRaises(ValueError):
+            self.es_middleware.query_after({'query': {'match_all': {}}}, ['b'], 'ogc_process')
+        return
+
+    def test_07(self):
+        self.engine.get.return_value = {'_id': 'job-1', 'found': True, '_source': {}}
+        self.es_middleware.get_by_id('job-1', 'ogc_job', routing='job-1')
+        self.assertEqual('job-1', self.engine.get.call_args.kwargs['routing'])
+        self.es_middleware.index_one({'jobID': 'job-1'}, 'job-1', 'ogc_job', routing='job-1')
+        self.assertEqual('job-1', self.engine.index.call_args.kwargs['routing'])
+        self.es_middleware.index_one({'id': 'p-1'}, 'p-1', 'ogc_process')
+        self.assertTrue('routing' not in self.engine.index.call_args.kwargs, 'default routing by _id')
+        self.es_middleware.query_after({'query': {'term': {'jobID': 'job-1'}}, 'sort': [{'updated': 'asc'}]}, None, 'ogc_job_logs', routing='job-1')
+        self.assertEqual('job-1', self.engine.search.call_args.kwargs['routing'])
+        self.engine.bulk.return_value = {'errors': False, 'items': []}
+        self.es_middleware.bulk_write([
+            {'action': 'index', 'index': 'ogc_job_logs', 'id': 'log-1', 'routing': 'job-1', 'doc': {'message': 'a'}},
+            {'action': 'update', 'index': 'ogc_job', 'id': 'job-1', 'routing': 'job-1', 'script': {'id': 'ogc_job_update', 'params': {}}},
+        ])
+        self.assertEqual({'index': {'_index': 'ogc_job_logs', '_id': 'log-1', 'routing': 'job-1'}}, self.engine.bulk.call_args.kwargs['body'][0])
+        self.assertEqual({'update': {'_index': 'ogc_job', '_id': 'job-1', 'routing': 'job-1', 'retry_on_conflict': 3}}, self.engine.bulk.call_args.kwargs['body'][2])
+        return
+
+    def test_08(self):
+        self.engine.indices.rollover.return_value = {'old_index': 'ogc_job_logs-000001', 'new_index': 'ogc_job_logs-000002', 'rolled_over': True}
+        self.assertEqual(True, self.es_middleware.rollover('ogc_job_logs', {'max_size': '5gb'}))
+        self.engine.indices.rollover.assert_called_once_with(alias='ogc_job_logs', body={'conditions': {'max_size': '5gb'}})
+        self.engine.transport.perform_request.side_effect = [NotFoundError(404, 'not found', {}), {'_id': 'logs_policy', '_seq_no': 0, '_primary_term': 1}]
+        self.assertEqual(True, self.es_middleware.put_lifecycle_policy('logs_policy', {'policy': {}}))
+        self.assertEqual({}, self.engine.transport.perform_request.call_args.kwargs['params'])
+        self.engine.transport.perform_request.side_effect = [{'_id': 'logs_policy', '_seq_no': 4, '_primary_term': 2}, {'_id': 'logs_policy', '_seq_no': 5, '_primary_term': 2}]
+        self.assertEqual(True, self.es_middleware.put_lifecycle_policy('logs_policy', {'policy': {}}))
+        self.assertEqual(('PUT', '/_opendistro/_ism/policies/logs_policy'), self.engine.transport.perform_request.call_args.args)
+        self.assertEqual({'if_seq_no': 4, 'if_primary_term': 2}, self.engine.transport.perform_request.call_args.kwargs['params'])
+        return
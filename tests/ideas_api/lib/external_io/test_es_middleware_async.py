@@ -0,0 +1,104 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock
+
+from elasticsearch.exceptions import ConflictError
+
+from ideas_api.lib.external_io.es_abstract import VersionConflictError
+from ideas_api.lib.external_io.es_middleware_async import AsyncESMiddleware
+from ideas_api.lib.processes.ogc_job_outbox import OgcJobOutbox
+from ideas_api.lib.processes.ogc_jobs import OgcJobs
+from ideas_api.lib.processes.ogc_processes import OgcProcess
+
+
+class TestAsyncESMiddleware(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.engine = AsyncMock()
+        self.es_middleware = AsyncESMiddleware('default_index', 'localhost', engine=self.engine)
+
+    async def test_01(self):
+        self.engine.get.return_value = {'_id': 'job-1', 'found': True, '_seq_no': 3, '_primary_term': 1, '_source': {'status': 'RUNNING'}}
+        result = await self.es_middleware.get_by_id('job-1', 'ogc_job', includes=['status'], routing='job-1')
+        self.assertEqual({'status': 'RUNNING'}, result['_source'])
+        self.engine.get.assert_awaited_once_with(index='ogc_job', id='job-1', ignore=404, _source_includes=['status'], routing='job-1')
+        self.engine.get.return_value = {'_id': 'job-2', 'found': False}
+        self.assertEqual(None, await self.es_middleware.get_by_id('job-2'))
+        self.engine.update.side_effect = ConflictError(409, 'version_conflict_engine_exception', {})
+        with self.assertRaises(VersionConflictError):
+            await self.es_middleware.update_one({'progress': 3}, 'job-1', 'ogc_job', if_seq_no=7, if_primary_term=1)
+        self.engine.bulk.return_value = {'errors': True, 'items': [{'update': {'_id': 'job-1', 'status': 409, 'error': {}}}]}
+        with self.assertRaises(VersionConflictError):
+            await self.es_middleware.bulk_write([{'action': 'update', 'index': 'ogc_job', 'id': 'job-1', 'doc': {}, 'if_seq_no': 2, 'if_primary_term': 1}])
+        return
+
+    async def test_02(self):
+        self.engine.search.side_effect = [
+            {'hits': {'hits': [{'_id': '1', 'sort': ['a']}, {'_id': '2', 'sort': ['b']}]}},
+            {'hits': {'hits': [{'_id': '3', 'sort': ['c']}]}},
+        ]
+        pages = [[k['_id'] for k in each] async for each in self.es_middleware.iter_pages({'size': 2, 'sort': [{'id': 'asc'}]}, 'ogc_process')]
+        self.assertEqual([['1', '2'], ['3']], pages)
+        self.assertEqual(['b'], self.engine.search.call_args_list[1].kwargs['body']['search_after'])
+        with self.assertRaises(ValueError):
+            await self.es_middleware.query_after({'query': {'match_all': {}}}, ['b'], 'ogc_process')
+        return
+
+    async def test_03(self):
+        """
+        concurrent status polls are in flight at the same time
+        """
+        in_flight = {'current': 0, 'max': 0}
+
+        async def slow_get(**kwargs):
+            in_flight['current'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['current'])
+            await asyncio.sleep(0.01)
+            in_flight['current'] -= 1
+            return {'_id': kwargs['id'], 'found': True, '_source': {
+                'processID': 'P1', 'type': 'process', 'jobID': kwargs['id'], 'status': 'RUNNING', 'message': '', 'progress': 10,
+                'created': 1700000000, 'started': 1700000000, 'finished': -999, 'updated': 1700000000,
+            }}
+        self.engine.get.side_effect = slow_get
+        ogc_jobs = OgcJobs(self.es_middleware)
+        job_statuses = await asyncio.gather(*[ogc_jobs.get_job_status_async(f'job-{i}') for i in range(50)])
+        self.assertEqual([f'job-{i}' for i in range(50)], [k['jobID'] for k in job_statuses])
+        self.assertEqual(50, in_flight['max'])
+        return
+
+    async def test_04(self):
+        self.engine.search.return_value = {'hits': {'hits': [{'_source': {'id': 'P1', 'version': '1.0', 'inputs': {}}}]}}
+        pub_sub = MagicMock()
+        pub_sub.publish_msg_async = AsyncMock()
+        new_job = await OgcProcess(self.es_middleware, pub_sub).create_new_instance_async('P1', {'inputs': {}})
+        self.assertEqual('ACCEPTED', new_job['status'])
+        self.assertEqual(new_job['jobID'], self.engine.index.call_args.kwargs['routing'])
+        self.assertEqual(new_job['jobID'], self.engine.index.call_args.kwargs['id'])
+        self.assertEqual(True, self.engine.index.call_args.kwargs['body'][OgcJobOutbox.PENDING_FIELD])
+        pub_sub.publish_msg_async.assert_awaited_once()
+        self.assertEqual({'messageType': 'RESULT', 'stage': 'PRE_PROCESSED', 'processID': 'P1', 'jobID': new_job['jobID']}, pub_sub.publish_msg_async.call_args.args[1])
+        self.engine.update.assert_not_awaited()  # the marker is cleared by the updater. only 1 ES write while submitting
+
+        pub_sub.publish_msg_async.side_effect = ConnectionError('SNS is down')
+        self.assertEqual(False, await OgcJobOutbox(self.es_middleware, pub_sub).publish_async(new_job['jobID'], new_job['processID']))
+        new_job = await OgcProcess(self.es_middleware, pub_sub).create_new_instance_async('P1', {'inputs': {}})
+        self.assertEqual(new_job['jobID'], self.engine.index.call_args.kwargs['id'], 'accepted. left to the sweeper')
+        self.engine.index.side_effect = RuntimeError('ES is down')
+        with self.assertRaises(RuntimeError):
+            await OgcProcess(self.es_middleware, pub_sub).create_new_instance_async('P1', {'inputs': {}})
+
+        await self.es_middleware.update_one({OgcJobOutbox.PENDING_FIELD: False}, 'job-1', 'ogc_job', routing='job-1', upsert=False)
+        self.assertEqual({'doc': {OgcJobOutbox.PENDING_FIELD: False}, 'doc_as_upsert': False}, self.engine.update.call_args.kwargs['body'])
+        return
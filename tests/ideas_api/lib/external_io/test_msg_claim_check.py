@@ -0,0 +1,63 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from ideas_api.lib.external_io.file_stream_local import FileStreamLocal
+from ideas_api.lib.external_io.msg_claim_check import MsgClaimCheck
+
+
+class TestMsgClaimCheck(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.claim_check = MsgClaimCheck(FileStreamLocal(), self.tmp_dir.name, 1024)
+        self.msg = {'messageType': 'REQUEST', 'jobID': 'job-1', 'processID': 'P1', 'stage': 'RRR', 'inputs': {},
+                    'current_outputs': [{'name': 'LIS__DATA', 'value': f's3://bucket/output-{i}.nc'} for i in range(100)]}
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def test_01(self):
+        small_msg = {**self.msg, 'current_outputs': []}
+        self.assertEqual(small_msg, self.claim_check.check_in(small_msg))
+        self.assertEqual(small_msg, self.claim_check.check_out(small_msg))
+        self.assertEqual([], os.listdir(self.tmp_dir.name), 'nothing is stored')
+
+        pointer = self.claim_check.check_in(self.msg)
+        self.assertTrue(MsgClaimCheck.is_pointer(pointer))
+        self.assertEqual({'messageType': 'REQUEST', 'jobID': 'job-1', 'processID': 'P1', 'stage': 'RRR'},
+                         {k: v for k, v in pointer.items() if k != MsgClaimCheck.POINTER_FIELD})
+        self.assertTrue(len(json.dumps(pointer)) < 1024)
+        self.assertEqual(len(json.dumps(self.msg)), pointer[MsgClaimCheck.POINTER_FIELD]['size'])
+        self.assertEqual(self.msg, self.claim_check.check_out(pointer))
+        self.assertEqual(pointer, self.claim_check.check_in(self.msg), 'same content is stored at the same place')
+        return
+
+    def test_02(self):
+        pointer = self.claim_check.check_in(self.msg)
+        stored_path = pointer[MsgClaimCheck.POINTER_FIELD]['url'].replace('file://', '')
+        with open(stored_path, 'w') as ff:
+            ff.write(json.dumps({**self.msg, 'stage': 'RAPID'}))
+        with self.assertRaises(ValueError):
+            self.claim_check.check_out(pointer)
+        os.remove(stored_path)
+        with self.assertRaises(IOError):
+            self.claim_check.check_out(pointer)
+        with self.assertRaises(ValueError):
+            MsgClaimCheck(FileStreamLocal(), '', 1024).check_in(self.msg)
+        return
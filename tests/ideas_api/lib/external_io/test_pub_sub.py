@@ -0,0 +1,97 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+import json
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from ideas_api.lib.external_io.pub_sub_abstract import PublishManyError
+from ideas_api.lib.external_io.pub_sub_factory import PubSubFactory
+from ideas_api.lib.external_io.pub_sub_memory import PubSubMemory
+from ideas_api.lib.external_io.pub_sub_sns import PubSubSns
+
+
+class TestPubSub(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.msgs = [json.dumps({'jobID': f'job-{i}'}) for i in range(23)]
+
+    def test_01(self):
+        pub_sub = PubSubFactory().get_instance('MEMORY').set_channel('topic-1')
+        self.assertTrue(isinstance(pub_sub, PubSubMemory))
+        pub_sub.publish_many(self.msgs, [{'jobID': f'job-{i}'} for i in range(23)])
+        self.assertEqual([10, 10, 3], pub_sub.batches)
+        self.assertEqual(self.msgs, pub_sub.msgs)
+        self.assertEqual({'jobID': 'job-22'}, pub_sub.subscribe()[-1][1])
+        self.assertEqual([], pub_sub.set_channel('topic-2').msgs)
+        with self.assertRaises(ValueError):
+            pub_sub.publish_many(self.msgs, [{}])
+        return
+
+    def test_02(self):
+        """
+        retryable failures are retried. others are not
+        """
+        pub_sub = PubSubMemory().set_channel('topic-1')
+        pub_sub.RETRY_BASE_DELAY = 0
+        pub_sub.failing_msgs = {self.msgs[3]: (2, True), self.msgs[12]: (1, True)}
+        pub_sub.publish_many(self.msgs)
+        self.assertEqual([10, 10, 3, 2, 1], pub_sub.batches)
+        self.assertEqual(sorted(self.msgs), sorted(pub_sub.msgs))
+
+        pub_sub = PubSubMemory().set_channel('topic-1')
+        pub_sub.RETRY_BASE_DELAY = 0
+        pub_sub.failing_msgs = {self.msgs[0]: (1, False), self.msgs[1]: (5, True)}
+        with self.assertRaises(PublishManyError) as context:
+            pub_sub.publish_many(self.msgs)
+        self.assertEqual([0, 1], sorted(context.exception.failed.keys()))
+        self.assertEqual([10, 10, 3, 1, 1], pub_sub.batches)
+        self.assertEqual(self.msgs[2:], pub_sub.msgs)
+        return
+
+    def test_03(self):
+        sns_client = MagicMock()
+        sns_client.publish_batch.side_effect = [
+            {'Successful': [], 'Failed': [
+                {'Id': '1', 'Code': 'InternalError', 'SenderFault': False},
+                {'Id': '2', 'Code': 'InvalidParameter', 'SenderFault': True},
+            ]},
+            {'Successful': [{'Id': '0'}], 'Failed': []},
+        ]
+        with patch.dict(PubSubSns._PubSubSns__sns_clients, clear=True), \
+                patch('ideas_api.lib.external_io.pub_sub_sns.AwsCred.get_client', return_value=sns_client) as get_client:
+            pub_sub = PubSubSns().set_channel('arn:aws:sns:us-west-2:000000000000:unit-test')
+            pub_sub.RETRY_BASE_DELAY = 0
+            self.assertTrue(sns_client is PubSubSns()._PubSubSns__sns_client, 'client is shared')
+            self.assertEqual(1, get_client.call_count)
+            with self.assertRaises(PublishManyError) as context:
+                pub_sub.publish_many(self.msgs[:3], [{'jobID': 'job-0'}, {}, {}])
+        self.assertEqual([2], list(context.exception.failed.keys()))
+        first_call = sns_client.publish_batch.call_args_list[0].kwargs
+        self.assertEqual({'jobID': {'DataType': 'String', 'StringValue': 'job-0'}}, first_call['PublishBatchRequestEntries'][0]['MessageAttributes'])
+        self.assertEqual(['0', '1', '2'], [k['Id'] for k in first_call['PublishBatchRequestEntries']])
+        self.assertEqual([self.msgs[1]], [k['Message'] for k in sns_client.publish_batch.call_args_list[1].kwargs['PublishBatchRequestEntries']])
+        return
+
+    def test_04(self):
+        msg = {'messageType': 'REQUEST', 'stage': 'LIS', 'processID': '', 'jobID': 'job-1', 'inputs': {}}
+        attributes = PubSubSns.get_attributes(msg, ['messageType', 'stage', 'processID', 'jobID', 'missing'])
+        self.assertEqual({'messageType': 'REQUEST', 'stage': 'LIS', 'jobID': 'job-1'}, attributes, 'empty or missing values are skipped')
+        sns_client = MagicMock()
+        with patch.dict(PubSubSns._PubSubSns__sns_clients, clear=True), \
+                patch('ideas_api.lib.external_io.pub_sub_sns.AwsCred.get_client', return_value=sns_client):
+            PubSubSns().set_channel('arn:aws:sns:us-west-2:000000000000:unit-test').publish_msg(json.dumps(msg), attributes)
+            PubSubSns().set_channel('arn:aws:sns:us-west-2:000000000000:unit-test').publish_msg(json.dumps(msg))
+        self.assertEqual({'DataType': 'String', 'StringValue': 'LIS'}, sns_client.publish.call_args_list[0].kwargs['MessageAttributes']['stage'])
+        self.assertEqual({}, sns_client.publish.call_args_list[1].kwargs['MessageAttributes'])
+        return
@@ -0,0 +1,66 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from threading import Lock
+from unittest import TestCase
+from unittest.mock import patch
+
+from ideas_api.lib.processes.ogc_job_batch_updater import OgcJobBatchUpdater
+
+
+class FakeOgcJobUpdater:
+    processed_msgs = []
+    lock = Lock()
+
+    def __init__(self, es_middleware, pub_sub, claim_check=None):
+        return
+
+    def process_update(self, sns_msg: dict):
+        if sns_msg.get('fail', False):
+            raise ValueError('failing on purpose')
+        with self.lock:
+            self.processed_msgs.append((sns_msg['jobID'], sns_msg['seq']))
+        return self
+
+
+class TestOgcJobBatchUpdater(TestCase):
+    def test_01(self):
+        records = [
+            ('m1', {'jobID': 'job-1', 'seq': 1}),
+            ('m2', {'jobID': 'job-2', 'seq': 1}),
+            ('m3', {'jobID': 'job-1', 'seq': 2}),
+            ('m4', {'seq': 1}),
+        ]
+        grouped_records = OgcJobBatchUpdater.group_by_job(records)
+        self.assertEqual(3, len(grouped_records))
+        self.assertEqual(['m1', 'm3'], [k[0] for k in grouped_records['job-1']])
+        return
+
+    @patch('ideas_api.lib.processes.ogc_job_batch_updater.OgcJobUpdater', FakeOgcJobUpdater)
+    def test_02(self):
+        FakeOgcJobUpdater.processed_msgs.clear()
+        records = [
+            ('m1', {'jobID': 'job-1', 'seq': 1}),
+            ('m2', {'jobID': 'job-2', 'seq': 1}),
+            ('m3', {'jobID': 'job-2', 'seq': 2, 'fail': True}),
+            ('m4', {'jobID': 'job-1', 'seq': 2}),
+            ('m5', {'jobID': 'job-2', 'seq': 3}),
+        ]
+        outcomes = OgcJobBatchUpdater(None, None).process_batch(records)
+        self.assertEqual(['m1', 'm2', 'm4'], sorted(outcomes[OgcJobBatchUpdater.SUCCEEDED]))
+        self.assertEqual(['m3'], outcomes[OgcJobBatchUpdater.FAILED])
+        self.assertEqual(['m5'], outcomes[OgcJobBatchUpdater.DEFERRED], 'later messages of a failed job should be retried')
+        self.assertEqual(['m3', 'm5'], OgcJobBatchUpdater.get_retrying_ids(outcomes))
+        job_1_msgs = [k[1] for k in FakeOgcJobUpdater.processed_msgs if k[0] == 'job-1']
+        self.assertEqual([1, 2], job_1_msgs, 'messages of the same job are out of order')
+        self.assertTrue(('job-2', 1) in FakeOgcJobUpdater.processed_msgs)
+        return
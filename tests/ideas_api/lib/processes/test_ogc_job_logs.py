@@ -0,0 +1,71 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from ideas_api.lib.processes.ogc_job_logs import OgcJobLogs
+
+
+class TestOgcJobLogs(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.logs = [{'jobID': 'job-1', 'stage': 'LIS', 'message': f'log {i}', 'updated': 1700000000 + i, 'logSeq': i, 'logID': f'log-{i}'} for i in range(4)]
+        self.es_middleware = MagicMock()
+
+    def __get_hits(self, logs: list):
+        return {'hits': {'hits': [{'_source': k, 'sort': [k['updated'], k['logSeq'], k['logID']]} for k in logs]}}
+
+    def test_01(self):
+        dsl = OgcJobLogs.get_logs_dsl('job-1', 5, 1700000000)
+        self.assertEqual([{'term': {'jobID': 'job-1'}}, {'range': {'updated': {'gte': 1700000000}}}], dsl['query']['bool']['filter'])
+        self.assertEqual(['updated', 'logSeq', 'logID'], [list(k.keys())[0] for k in dsl['sort']])
+        self.es_middleware.query_after.return_value = self.__get_hits(self.logs[:3])
+        job_logs, next_cursor = OgcJobLogs(self.es_middleware).get_logs_page('job-1', 2)
+        self.assertEqual(['log 0', 'log 1'], [k['message'] for k in job_logs])
+        self.es_middleware.query_after.return_value = self.__get_hits(self.logs[2:])
+        OgcJobLogs(self.es_middleware).get_logs_page('job-1', 2, next_cursor)
+        self.assertEqual([1700000001, 1, 'log-1'], self.es_middleware.query_after.call_args.args[1])
+        return
+
+    def test_02(self):
+        self.es_middleware.query_after.side_effect = [self.__get_hits(self.logs[:2]), self.__get_hits([])]
+        self.assertEqual(['log 0', 'log 1'], [k['message'] for k in OgcJobLogs(self.es_middleware).iter_logs('job-1')])
+        self.assertEqual(1, self.es_middleware.query_after.call_count, 'not following')
+        self.assertEqual(0, self.es_middleware.get_by_id.call_count)
+        return
+
+    def test_03(self):
+        self.es_middleware.query_after.side_effect = [self.__get_hits(self.logs[:2]), self.__get_hits([]), self.__get_hits(self.logs[2:]), self.__get_hits([])]
+        self.es_middleware.get_by_id.side_effect = [{'_source': {'status': 'RUNNING'}}, {'_source': {'status': 'RUNNING'}}, {'_source': {'status': 'SUCCESSFUL'}}, {'_source': {'status': 'SUCCESSFUL'}}]
+        with patch.object(OgcJobLogs, 'FOLLOW_INTERVAL', 0):
+            job_logs = [k['message'] for k in OgcJobLogs(self.es_middleware).iter_logs('job-1', follow=True)]
+        self.assertEqual(['log 0', 'log 1', 'log 2', 'log 3'], job_logs)
+        self.assertEqual(3, self.es_middleware.query_after.call_count, 'stops after the job is finished')
+        self.assertEqual([1700000001, 1, 'log-1'], self.es_middleware.query_after.call_args_list[1].args[1])
+        self.assertEqual([1700000001, 1, 'log-1'], self.es_middleware.query_after.call_args_list[2].args[1])
+        return
+
+    def test_04(self):
+        self.es_middleware.query_after.return_value = self.__get_hits([])
+        self.es_middleware.get_by_id.return_value = {'_source': {'status': 'RUNNING'}}
+        with patch.object(OgcJobLogs, 'FOLLOW_INTERVAL', 0), patch.object(OgcJobLogs, 'FOLLOW_TIMEOUT', 0.05):
+            self.assertEqual([], list(OgcJobLogs(self.es_middleware).iter_logs('job-1', follow=True)))
+        self.assertTrue(self.es_middleware.query_after.call_count > 1)
+        return
+
+    def test_05(self):
+        """
+        following ends before the 29 seconds timeout of API Gateway even after the last interval
+        """
+        self.assertLess(OgcJobLogs.FOLLOW_TIMEOUT + OgcJobLogs.FOLLOW_INTERVAL, 29 - 5)  # leaving a margin for the searches
+        return
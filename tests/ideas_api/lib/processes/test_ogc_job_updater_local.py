@@ -0,0 +1,733 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import json
+import os
+import tempfile
+from copy import deepcopy
+from unittest import TestCase
+from unittest.mock import patch
+
+from ideas_api import job_outbox_lambda_entry
+from ideas_api.lib.external_io.es_abstract import ESAbstract, VersionConflictError
+from ideas_api.lib.external_io.file_stream_local import FileStreamLocal
+from ideas_api.lib.external_io.msg_claim_check import MsgClaimCheck
+from ideas_api.lib.external_io.pub_sub_abstract import PubSubAbstract
+from ideas_api.lib.external_io.pub_sub_memory import PubSubMemory
+from ideas_api.lib.job_management.job_constants import JobConstants, OGC_JOB_SCRIPTS
+from ideas_api.lib.processes.ogc_job_logs import OgcJobLogs
+from ideas_api.lib.processes.ogc_job_outbox import OgcJobOutbox
+from ideas_api.lib.processes.ogc_job_updater import OgcJobUpdater
+from ideas_api.lib.processes.ogc_jobs import OgcJobs
+from ideas_api.lib.processes.ogc_process_cache import OgcProcessCache
+from ideas_api.lib.processes.ogc_processes import OgcProcess
+from ideas_api.lib.processes.ogc_stage_cache import OgcStageCache
+from ideas_api.lib.utils.TimeUtlis import TimeUtils
+
+
+class FakeESMiddleware(ESAbstract):
+    """
+    in-memory stand-in which understands the `term` queries used by the processes
+    """
+    ROUTING_REQUIRED = [JobConstants.OGC_JOB_INDEX_ALIAS, JobConstants.OGC_JOB_LOGS_INDEX_ALIAS]
+
+    def __init__(self):
+        self.indices = {}
+        self.routings = {}
+        self.calls = []
+        self.seq_no = 0
+        self.seq_nos = {}
+        self.before_write = None  # simulating a concurrent update
+        self.scripts = {}
+
+    def __get_index(self, index):
+        if index not in self.indices:
+            self.indices[index] = {}
+        return self.indices[index]
+
+    @staticmethod
+    def __get_value(doc, field):
+        for each_key in field.split('.'):
+            if not isinstance(doc, dict) or each_key not in doc:
+                return None
+            doc = doc[each_key]
+        return doc
+
+    @staticmethod
+    def get_source_filtered(doc, includes=None):
+        if includes is None:
+            return deepcopy(doc)
+        filtered_doc = {}
+        for each_field in includes:
+            current_doc, current_filtered = doc, filtered_doc
+            each_keys = each_field.split('.')
+            for each_key in each_keys[:-1]:
+                if not isinstance(current_doc, dict) or each_key not in current_doc:
+                    break
+                current_doc = current_doc[each_key]
+                current_filtered = current_filtered.setdefault(each_key, {})
+            else:
+                if isinstance(current_doc, dict) and each_keys[-1] in current_doc:
+                    current_filtered[each_keys[-1]] = deepcopy(current_doc[each_keys[-1]])
+        return filtered_doc
+
+    def __is_matched(self, doc_id, doc, query):
+        if 'match_all' in query:
+            return True
+        if 'term' in query:
+            field, value = list(query['term'].items())[0]
+            value = value['value'] if isinstance(value, dict) else value
+            return (doc_id if field == '_id' else self.__get_value(doc, field)) == value
+        if 'range' in query:
+            field, conditions = list(query['range'].items())[0]
+            value = self.__get_value(doc, field)
+            operators = {'lt': lambda a, b: a < b, 'lte': lambda a, b: a <= b, 'gt': lambda a, b: a > b, 'gte': lambda a, b: a >= b}
+            return value is not None and all([operators[k](value, v) for k, v in conditions.items()])
+        if 'bool' in query:
+            return all([self.__is_matched(doc_id, doc, k) for k in query['bool'].get('must', []) + query['bool'].get('filter', [])]) and \
+                not any([self.__is_matched(doc_id, doc, k) for k in query['bool'].get('must_not', [])])
+        raise NotImplementedError(f'unknown query: {query}')
+
+    def create_index(self, index_name, index_body):
+        return
+
+    def has_index(self, index_name):
+        return index_name in self.indices
+
+    def create_alias(self, index_name, alias_name):
+        return
+
+    def delete_index(self, index_name):
+        return
+
+    def put_index_template(self, template_name: str, template_body: dict):
+        raise NotImplementedError()
+
+    def rollover(self, alias_name: str, conditions: dict = None):
+        raise NotImplementedError()
+
+    def put_lifecycle_policy(self, policy_id: str, policy: dict):
+        raise NotImplementedError()
+
+    def index_many(self, docs=None, doc_ids=None, doc_dict=None, index=None):
+        raise NotImplementedError()
+
+    @staticmethod
+    def __merge_dict(base_dict: dict, new_dict: dict):
+        for k, v in new_dict.items():
+            if isinstance(v, dict) and isinstance(base_dict.get(k, None), dict):
+                FakeESMiddleware.__merge_dict(base_dict[k], v)
+            else:
+                base_dict[k] = deepcopy(v)
+        return base_dict
+
+    def __run_script(self, doc, script):
+        """
+        same logic as the stored painless scripts
+        """
+        if script['id'] not in self.scripts:
+            raise ValueError(f'unable to find script: {script["id"]}')
+        params = script['params']
+        doc = deepcopy(doc)
+        if script['id'] == JobConstants.OGC_JOB_PROGRESS_SCRIPT:
+            current = doc.get('progress', 0)
+            if current < params['step_end']:
+                one_percent = (params['step_end'] - params['step_start']) * 0.01
+                new_progress = current + one_percent
+                while new_progress >= params['step_end']:
+                    one_percent *= 0.5
+                    new_progress = current + one_percent
+                doc['progress'] = new_progress
+            doc['message'] = params['message']
+            doc['updated'] = params['updated']
+            return doc
+        doc.update(deepcopy(params['fields']))
+        if params['progress'] is not None and params['progress'] > doc.get('progress', 0):
+            doc['progress'] = params['progress']
+        outputs = doc.setdefault('job', {}).setdefault('outputs', [])
+        outputs.extend([deepcopy(k) for k in params['outputs'] if k not in outputs])
+        return doc
+
+    def __check_routing(self, index, routing):
+        if index in self.ROUTING_REQUIRED and routing is None:
+            raise ValueError(f'routing_missing_exception: {index}')
+        return
+
+    def __write(self, index, doc_id, doc, is_updating=False, if_seq_no=None, script=None, routing=None):
+        seq_key = (index, doc_id)
+        self.__check_routing(index, routing)
+        if if_seq_no is not None and self.seq_nos.get(seq_key, None) != if_seq_no:
+            raise VersionConflictError(f'{seq_key} is not at {if_seq_no}')
+        if script is not None:
+            if doc_id not in self.__get_index(index):
+                raise ValueError(f'document missing: {seq_key}')
+            self.__get_index(index)[doc_id] = self.__run_script(self.__get_index(index)[doc_id], script)
+        elif is_updating:
+            self.__get_index(index)[doc_id] = self.__merge_dict(self.__get_index(index).get(doc_id, {}), doc)
+        else:
+            self.__get_index(index)[doc_id] = deepcopy(doc)
+        self.seq_no += 1
+        self.seq_nos[seq_key] = self.seq_no
+        self.routings[seq_key] = routing
+        return self.seq_no
+
+    def index_one(self, doc, doc_id, index=None, routing=None):
+        self.calls.append('index_one')
+        self.__write(index, doc_id, doc, routing=routing)
+        return self
+
+    def update_many(self, docs=None, doc_ids=None, doc_dict=None, index=None):
+        raise NotImplementedError()
+
+    def update_one(self, doc, doc_id, index=None, if_seq_no=None, if_primary_term=None, routing=None, upsert=True):
+        self.calls.append('update_one')
+        if not upsert and doc_id not in self.__get_index(index):
+            return None  # document_missing_exception is logged by ESMiddleware
+        return self.__write(index, doc_id, doc, True, if_seq_no, routing=routing)
+
+    def put_script(self, script_id: str, source: str):
+        self.scripts[script_id] = source
+        return True
+
+    def update_by_script(self, doc_id, script_id: str, params: dict, index=None, if_seq_no=None, if_primary_term=None, routing=None):
+        self.calls.append('update_by_script')
+        if self.before_write is not None:
+            self.before_write(self)
+        return self.__write(index, doc_id, None, True, if_seq_no, {'id': script_id, 'params': params}, routing)
+
+    def bulk_write(self, operations: list):
+        self.calls.append('bulk_write')
+        if self.before_write is not None:
+            self.before_write(self)
+        errors = []
+        missing_errors = []
+        for each in operations:
+            if each['action'] == 'update' and not each.get('upsert', True) and each['id'] not in self.__get_index(each['index']):
+                missing_errors.append(f'document_missing_exception: {each["id"]}')
+                continue
+            try:
+                self.__write(each['index'], each['id'], each.get('doc', None), each['action'] == 'update', each.get('if_seq_no', None), each.get('script', None), each.get('routing', None))
+            except VersionConflictError as ve:
+                errors.append(str(ve))
+        if len(errors) > 0:
+            raise VersionConflictError(f'version conflict for some items in bulk: {errors}')
+        if len(missing_errors) > 0:
+            raise ValueError(f'failed to write some items in bulk: {missing_errors}')
+        return [{each['action']: {'_id': each['id'], 'result': 'ok'}} for each in operations]
+
+    def delete_by_query(self, dsl, index=None):
+        deleting_ids = [k for k, v in self.__get_index(index).items() if self.__is_matched(k, v, dsl['query'])]
+        for each in deleting_ids:
+            self.__get_index(index).pop(each)
+        return len(deleting_ids)
+
+    @staticmethod
+    def get_result_size(result):
+        return result['hits']['total']['value']
+
+    def query_with_scroll(self, dsl, querying_index=None):
+        return self.query(dsl, querying_index)
+
+    def query(self, dsl, querying_index=None, routing=None):
+        self.calls.append('query')
+        hits = [{'_id': k, '_source': self.get_source_filtered(v, dsl.get('_source', None))} for k, v in self.__get_index(querying_index).items()
+                if self.__is_matched(k, v, dsl.get('query', {'match_all': {}})) and routing in [None, self.routings[(querying_index, k)]]]
+        hits = hits[:dsl.get('size', 10)]
+        return {'hits': {'hits': hits, 'total': {'value': len(hits)}}}
+
+    def query_pages(self, dsl, querying_index=None):
+        return self.query(dsl, querying_index)
+
+    def query_after(self, dsl, search_after: list = None, querying_index=None, routing=None):
+        self.calls.append('query')
+        hits = [{'_id': k, '_source': self.get_source_filtered(v, dsl.get('_source', None)),
+                 'sort': [v.get(list(s.keys())[0], -2 ** 63) for s in dsl['sort']]}  # only ascending sort with missing values first
+                for k, v in self.__get_index(querying_index).items()
+                if self.__is_matched(k, v, dsl['query']) and routing in [None, self.routings[(querying_index, k)]]]
+        hits = sorted(hits, key=lambda k: k['sort'])
+        if search_after is not None:
+            hits = [k for k in hits if k['sort'] > list(search_after)]
+        return {'hits': {'hits': hits[:dsl.get('size', 10)]}}
+
+    def iter_pages(self, dsl, querying_index=None, routing=None):
+        raise NotImplementedError()
+
+    def query_by_id(self, doc_id, querying_index=None):
+        return self.get_by_id(doc_id, querying_index)
+
+    def get_by_id(self, doc_id, index=None, includes: list = None, excludes: list = None, routing=None):
+        self.calls.append('get_by_id')
+        self.__check_routing(index, routing)
+        doc = self.__get_index(index).get(doc_id, None)
+        if doc is None or self.routings[(index, doc_id)] != routing:  # looking at a different shard
+            return None
+        source = self.get_source_filtered(doc, includes)
+        for each in [] if excludes is None else excludes:
+            source.pop(each, None)
+        return {'_id': doc_id, 'found': True, '_seq_no': self.seq_nos[(index, doc_id)], '_primary_term': 1, '_source': source}
+
+    def mget(self, doc_ids: list, index=None, includes: list = None, excludes: list = None, routing=None):
+        return [self.get_by_id(k, index, includes, excludes, routing) for k in doc_ids]
+
+
+class FakePubSub(PubSubAbstract):
+    def __init__(self):
+        self.msgs = []
+        self.attributes = []
+
+    def set_channel(self, channel_id):
+        return self
+
+    def publish_msg(self, msg: str, attributes: dict = None):
+        self.msgs.append(json.loads(msg))
+        self.attributes.append(attributes)
+        return self
+
+    def publish_batch(self, msgs: list, attributes: list):
+        self.msgs.extend([json.loads(k) for k in msgs])
+        return []
+
+    def subscribe(self):
+        return
+
+
+class TestOgcJobUpdaterLocal(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        os.environ['ES_URL'] = os.environ.get('ES_URL', 'localhost')
+        os.environ['SNS_TOPIC'] = os.environ.get('SNS_TOPIC', 'arn:aws:sns:us-west-2:000000000000:unit-test')
+        OgcProcessCache().clear()
+        self.es_middleware = FakeESMiddleware()
+        for script_id, script_source in OGC_JOB_SCRIPTS.items():
+            self.es_middleware.put_script(script_id, script_source)
+        self.pub_sub = FakePubSub()
+        self.process_def = {
+            'id': 'UNIT-TEST:LOCAL',
+            'version': '0.0.1',
+            'additionalParameters': {'parameters': [
+                {'name': 'stagesCount', 'value': ['2']},
+                {'name': 'stage001Names', 'value': ['LIS']},
+                {'name': 'stage002Names', 'value': ['RRR', 'RAPID']},
+            ]},
+            'inputs': {},
+        }
+        self.es_middleware.index_one(self.process_def, 'UNIT-TEST:LOCAL___0.0.1', JobConstants.OGC_PROCESS_INDEX_ALIAS)
+        self.job_inputs = {'executingStageFlags': [True, True], 'scenario': '1x'}
+        self.es_middleware.index_one(self.__new_job('job-1'), 'job-1', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-1')
+        self.es_middleware.calls.clear()
+
+    def __new_job(self, job_id: str):
+        return {
+            'processID': 'UNIT-TEST:LOCAL',
+            'processVersion': '0.0.1',
+            'jobID': job_id,
+            'job': {'inputs': deepcopy(self.job_inputs)},
+            'inputsHash': OgcJobs.get_inputs_hash(self.job_inputs),
+            'created': 1, 'started': -999, 'finished': -999, 'updated': -999,
+            'progress': 0, 'status': 'ACCEPTED', 'type': 'process', 'message': '',
+        }
+
+    def __get_job(self, job_id: str = 'job-1'):
+        return self.es_middleware.indices[JobConstants.OGC_JOB_INDEX_ALIAS][job_id]
+
+    def __get_logs(self, job_id: str = 'job-1'):
+        return [k for k in self.es_middleware.indices.get(JobConstants.OGC_JOB_LOGS_INDEX_ALIAS, {}).values() if k['jobID'] == job_id]
+
+    def test_01(self):
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+            'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': JobConstants.PRE_PROCESSED,
+        })
+        self.assertEqual(['update_by_script', 'bulk_write'], [k for k in self.es_middleware.calls if k != 'get_by_id' and k != 'query'], 'job first. then logs')
+        self.assertEqual('RUNNING', self.__get_job()['status'])
+        self.assertEqual('LIS:: starting', self.__get_job()['message'])
+        self.assertEqual(2, len(self.__get_logs()))
+        self.assertEqual(sorted(self.es_middleware.indices[JobConstants.OGC_JOB_LOGS_INDEX_ALIAS].keys()), sorted([k['logID'] for k in self.__get_logs()]))
+        self.assertEqual('LIS', self.pub_sub.msgs[-1]['stage'])
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+            'messageType': 'UPDATE', 'jobID': 'job-1', 'status': 'RUNNING', 'stage': 'LIS', 'message': 'running',
+        })
+        self.assertEqual(2, self.es_middleware.calls.count('bulk_write'), f'ES writes: {self.es_middleware.calls}')
+        self.assertEqual('LIS:: running', self.__get_job()['message'])
+        self.assertEqual((1, 1), (OgcProcessCache().misses, OgcProcessCache().hits), 'process definition is retrieved once')
+        self.assertTrue(self.__get_job()['progress'] > 1)
+        return
+
+    def test_02(self):
+        """
+        all later stages are cached in a previous job with the same inputs
+        """
+        cached_job = self.__new_job('job-0')
+        cached_job['status'] = JobConstants.JOB_STATUS_SUCCESS
+        cached_job['started'] = 1
+        cached_job['finished'] = 2
+        cached_job['job']['outputs'] = [
+            {'name': 'LIS__DATA', 'value': 's3://lis/data'},
+            {'name': 'RRR__DATA', 'value': 's3://rrr/data'},
+            {'name': 'RAPID__DATA', 'value': 's3://rapid/data'},
+        ]
+        self.es_middleware.index_one(cached_job, 'job-0', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-0')
+        self.es_middleware.calls.clear()
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+            'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': 'LIS',
+            'outputs': [{'name': 'DATA', 'value': 's3://lis/new_data'}],
+        })
+        self.assertEqual(1, self.es_middleware.calls.count('bulk_write'), f'ES writes: {self.es_middleware.calls}')
+        self.assertEqual(0, self.es_middleware.calls.count('update_one') + self.es_middleware.calls.count('index_one'))
+        self.assertEqual(JobConstants.JOB_STATUS_SUCCESS, self.__get_job()['status'])
+        self.assertEqual(100, self.__get_job()['progress'])
+        self.assertEqual(['LIS__DATA', 'RRR__DATA', 'RAPID__DATA'], [k['name'] for k in self.__get_job()['job']['outputs']])
+        self.assertEqual(3, len(self.__get_logs()))
+        self.assertEqual(0, len(self.pub_sub.msgs), 'no more stages to request')
+        return
+
+    def test_03(self):
+        with self.assertRaises(ValueError):
+            OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+                'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': 'LIS',
+            })
+        self.assertEqual('FAILED', self.__get_job()['status'])
+        self.assertEqual(1, len(self.__get_logs()))
+        return
+
+    def test_04(self):
+        """
+        cache lookup is by the inputs fingerprint. only successful jobs are reused
+        """
+        self.assertEqual(OgcJobs.get_inputs_hash({'a': 1, 'b': [1, 2]}), OgcJobs.get_inputs_hash({'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(OgcJobs.get_inputs_hash({'a': 1, 'b': [1, 2]}), OgcJobs.get_inputs_hash({'a': 1, 'b': [2, 1]}))
+        ogc_jobs = OgcJobs(self.es_middleware)
+        self.assertEqual(None, ogc_jobs.get_cached_result(self.__get_job()), 'the job itself is not a cache')
+        failed_job = self.__new_job('job-0')
+        failed_job['status'] = JobConstants.JOB_STATUS_FAILURE
+        self.es_middleware.index_one(failed_job, 'job-0', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-0')
+        self.assertEqual(None, ogc_jobs.get_cached_result(self.__get_job()))
+        other_job = self.__new_job('job-2')
+        other_job['status'] = JobConstants.JOB_STATUS_SUCCESS
+        other_job['inputsHash'] = OgcJobs.get_inputs_hash({'scenario': '1x', 'executingStageFlags': [True, False]})
+        self.es_middleware.index_one(other_job, 'job-2', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-2')
+        self.assertEqual(None, ogc_jobs.get_cached_result(self.__get_job()))
+        cached_job = self.__new_job('job-3')
+        cached_job['status'] = JobConstants.JOB_STATUS_SUCCESS
+        self.es_middleware.index_one(cached_job, 'job-3', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-3')
+        self.assertEqual('job-3', ogc_jobs.get_cached_result(self.__get_job())['jobID'])
+        return
+
+    def test_05(self):
+        """
+        LIS outputs are reused by a job which differs only in the inputs LIS does not depend on
+        """
+        self.process_def['additionalParameters']['parameters'].append({'name': 'LISCacheInputs', 'value': ['scenario']})
+        self.es_middleware.index_one(self.process_def, 'UNIT-TEST:LOCAL___0.0.1', JobConstants.OGC_PROCESS_INDEX_ALIAS)
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+            'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': 'LIS',
+            'outputs': [{'name': 'DATA', 'value': 's3://lis/data'}],
+        })
+        cache_docs = list(self.es_middleware.indices[JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS].values())
+        self.assertEqual(1, len(cache_docs))
+        self.assertEqual('LIS', cache_docs[0]['stage'])
+        self.assertEqual([{'name': 'LIS__DATA', 'value': 's3://lis/data'}], cache_docs[0]['outputs'])
+        self.assertEqual(JobConstants.DEFAULT_STAGE_CACHE_TTL, cache_docs[0]['expires'] - cache_docs[0]['created'])
+        self.assertEqual(1, self.es_middleware.calls.count('bulk_write'), 'stage cache is written with the logs')
+
+        self.job_inputs['rrrParam'] = 'another value'
+        self.es_middleware.index_one(self.__new_job('job-2'), 'job-2', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-2')
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+            'messageType': 'RESULT', 'jobID': 'job-2', 'status': 'SUCCESSFUL', 'stage': JobConstants.PRE_PROCESSED,
+        })
+        self.assertEqual('RRR', self.pub_sub.msgs[-1]['stage'])
+        self.assertEqual([{'name': 'LIS__DATA', 'value': 's3://lis/data'}], self.__get_job('job-2')['job']['outputs'])
+
+        self.job_inputs['scenario'] = '2x'
+        self.es_middleware.index_one(self.__new_job('job-3'), 'job-3', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-3')
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+            'messageType': 'RESULT', 'jobID': 'job-3', 'status': 'SUCCESSFUL', 'stage': JobConstants.PRE_PROCESSED,
+        })
+        self.assertEqual('LIS', self.pub_sub.msgs[-1]['stage'])
+        return
+
+    def test_06(self):
+        stage_cache = OgcStageCache(self.es_middleware)
+        job_details = self.__new_job('job-1')
+        cache_key = OgcStageCache.get_cache_key('UNIT-TEST:LOCAL', '0.0.1', 'LIS', {'scenario': '1x', 'other': 1}, ['scenario'])
+        self.assertEqual(cache_key, OgcStageCache.get_cache_key('UNIT-TEST:LOCAL', '0.0.1', 'LIS', {'scenario': '1x'}, ['scenario']))
+        self.assertNotEqual(cache_key, OgcStageCache.get_cache_key('UNIT-TEST:LOCAL', '0.0.1', 'RRR', {'scenario': '1x'}, ['scenario']))
+        self.assertEqual([], stage_cache.get_stage_output(cache_key))
+        expired_doc = OgcStageCache.get_cache_doc(cache_key, job_details, 'LIS', [{'name': 'LIS__DATA', 'value': 's3://a'}], -10)
+        self.es_middleware.index_one(expired_doc, cache_key, JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS)
+        self.assertEqual([], stage_cache.get_stage_output(cache_key), 'expired')
+        valid_doc = OgcStageCache.get_cache_doc('another-key', job_details, 'LIS', [{'name': 'LIS__DATA', 'value': 's3://a'}], 100)
+        self.es_middleware.index_one(valid_doc, 'another-key', JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS)
+        self.assertEqual(1, stage_cache.evict_expired())
+        self.assertEqual(['another-key'], list(self.es_middleware.indices[JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS].keys()))
+        self.assertEqual([{'name': 'LIS__DATA', 'value': 's3://a'}], stage_cache.get_stage_output('another-key'))
+        return
+
+    def test_07(self):
+        ogc_jobs = OgcJobs(self.es_middleware)
+        self.assertEqual({'progress': 0, 'job': {'inputs': self.job_inputs}}, ogc_jobs.get_job_raw('job-1', includes=['progress', 'job.inputs']))
+        self.assertEqual('job-1', ogc_jobs.get_job_raw('job-1', excludes=['job'])['jobID'])
+        self.assertTrue('job' not in ogc_jobs.get_job_raw('job-1', excludes=['job']))
+        with self.assertRaises(ValueError):
+            ogc_jobs.get_job_raw('job-x')
+        self.assertEqual('ACCEPTED', ogc_jobs.get_job_status('job-1')['status'])
+        self.assertEqual(['job-1', None], [k if k is None else k['_id'] for k in self.es_middleware.mget(['job-1', 'job-x'], JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-1')])
+        self.assertEqual(0, self.es_middleware.calls.count('query'), 'no search for job lookups')
+        return
+
+    def test_08(self):
+        """
+        job details are updated by another message after they are read
+        """
+        def concurrent_update(es_middleware):
+            es_middleware.before_write = None
+            es_middleware.update_one({'progress': 20, 'job': {'outputs': [{'name': 'LIS__METADATA', 'value': 's3://lis/metadata'}]}}, 'job-1', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-1')
+        self.es_middleware.before_write = concurrent_update
+        result_msg = {
+            'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': 'LIS',
+            'outputs': [{'name': 'DATA', 'value': 's3://lis/data'}],
+        }
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update(result_msg)
+        self.assertEqual(2, self.es_middleware.calls.count('update_by_script'), 'retried once')
+        self.assertEqual(1, self.es_middleware.calls.count('bulk_write'), 'logs are written only after the job update')
+        self.assertEqual(['LIS__METADATA', 'LIS__DATA'], [k['name'] for k in self.__get_job()['job']['outputs']])
+        self.assertEqual(self.job_inputs, self.__get_job()['job']['inputs'])
+        self.assertEqual('DATA', result_msg['outputs'][0]['name'], 'message is not modified')
+        self.assertEqual(2, len(self.__get_logs()), 'logs of the failed attempt are overwritten')
+        self.assertEqual(1, len(self.pub_sub.msgs), 'next stage is requested only once')
+        return
+
+    def test_09(self):
+        def concurrent_update(es_middleware):
+            es_middleware.update_one({'updated': 5}, 'job-1', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-1')
+        self.es_middleware.before_write = concurrent_update
+        with self.assertRaises(VersionConflictError):
+            OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+                'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': JobConstants.PRE_PROCESSED,
+            })
+        self.assertEqual(OgcJobUpdater.MAX_ATTEMPTS, self.es_middleware.calls.count('update_by_script'))
+        self.assertEqual(0, self.es_middleware.calls.count('bulk_write'))
+        self.assertEqual(0, len(self.pub_sub.msgs))
+        return
+
+    def test_10(self):
+        """
+        UPDATE messages are applied by a script. concurrent updates do not conflict. progress never goes down.
+        """
+        def concurrent_update(es_middleware):
+            es_middleware.before_write = None
+            es_middleware.update_one({'progress': 60}, 'job-1', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-1')
+        self.es_middleware.before_write = concurrent_update
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+            'messageType': 'UPDATE', 'jobID': 'job-1', 'status': 'RUNNING', 'stage': 'LIS', 'message': 'running',
+        })
+        self.assertEqual(1, self.es_middleware.calls.count('bulk_write'))
+        self.assertEqual(60, self.__get_job()['progress'])
+        self.assertEqual('LIS:: running', self.__get_job()['message'])
+        self.es_middleware.update_one({'progress': 10}, 'job-1', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-1')
+        for _ in range(200):
+            OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+                'messageType': 'UPDATE', 'jobID': 'job-1', 'status': 'RUNNING', 'stage': 'LIS', 'message': 'running',
+            })
+        self.assertTrue(10 < self.__get_job()['progress'] < 33, f'progress stays in LIS range: {self.__get_job()["progress"]}')
+        return
+
+    def test_11(self):
+        """
+        outputs are appended once even if the same result is applied twice
+        """
+        result_msg = {
+            'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'FAILED', 'stage': 'LIS',
+            'outputs': [{'name': 'METADATA', 'value': 's3://lis/metadata'}],
+        }
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update(result_msg)
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update(result_msg)
+        self.assertEqual([{'name': 'LIS__METADATA', 'value': 's3://lis/metadata'}], self.__get_job()['job']['outputs'])
+        self.assertEqual(self.job_inputs, self.__get_job()['job']['inputs'])
+        self.assertEqual('FAILED', self.__get_job()['status'])
+        return
+
+    def test_12(self):
+        """
+        job and its logs are routed by jobID
+        """
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+            'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': JobConstants.PRE_PROCESSED,
+        })
+        routings = {k: v for k, v in self.es_middleware.routings.items() if k[0] in FakeESMiddleware.ROUTING_REQUIRED}
+        self.assertEqual(3, len(routings), f'1 job and 2 logs: {routings}')
+        self.assertEqual({'job-1'}, set(routings.values()))
+        self.assertEqual('RUNNING', OgcJobs(self.es_middleware).get_job_status('job-1')['status'])
+        with self.assertRaises(ValueError):
+            self.es_middleware.get_by_id('job-1', JobConstants.OGC_JOB_INDEX_ALIAS)
+        return
+
+    def test_13(self):
+        """
+        the start message of a new job is published by the outbox. a duplicated one is ignored
+        """
+        self.process_def['inputs'] = {'executingStageFlags': {'type': 'array'}, 'scenario': {'type': 'string'}}
+        self.es_middleware.index_one(self.process_def, 'UNIT-TEST:LOCAL___0.0.1', JobConstants.OGC_PROCESS_INDEX_ALIAS)
+        calls_before = len(self.es_middleware.calls)
+        new_job = OgcProcess(self.es_middleware, self.pub_sub).create_new_instance('UNIT-TEST:LOCAL', {'inputs': deepcopy(self.job_inputs)})
+        self.assertEqual(JobConstants.JOB_STATUS_ACCEPTED, new_job['status'])
+        self.assertEqual(['index_one'], [k for k in self.es_middleware.calls[calls_before:] if k != 'query'], 'only 1 ES write while submitting')
+        self.assertEqual(True, self.__get_job(new_job['jobID'])[OgcJobOutbox.PENDING_FIELD])
+        self.assertEqual([OgcJobOutbox.get_start_msg(new_job['jobID'], 'UNIT-TEST:LOCAL')], self.pub_sub.msgs)
+        for _ in range(2):
+            OgcJobUpdater(self.es_middleware, self.pub_sub).process_update(OgcJobOutbox.get_start_msg(new_job['jobID'], 'UNIT-TEST:LOCAL'))
+        self.assertEqual('RUNNING', self.__get_job(new_job['jobID'])['status'])
+        self.assertEqual(False, self.__get_job(new_job['jobID'])[OgcJobOutbox.PENDING_FIELD], 'cleared by the updater')
+        self.assertEqual(['LIS'], [k['stage'] for k in self.pub_sub.msgs[1:]], 'first stage is requested once')
+        self.assertEqual(2, len(self.__get_logs(new_job['jobID'])))
+        self.assertEqual([{'messageType': 'RESULT', 'stage': JobConstants.PRE_PROCESSED, 'processID': 'UNIT-TEST:LOCAL', 'jobID': new_job['jobID']},
+                          {'messageType': 'REQUEST', 'stage': 'LIS', 'processID': 'UNIT-TEST:LOCAL', 'jobID': new_job['jobID']}], self.pub_sub.attributes)
+        return
+
+    def test_14(self):
+        """
+        jobs whose start message is not published are published by the sweeper
+        """
+        for job_id, created in [('job-2', 1), ('job-3', 1), ('job-4', int(TimeUtils().get_datetime_unix(False)))]:
+            self.es_middleware.index_one({**self.__new_job(job_id), 'created': created, OgcJobOutbox.PENDING_FIELD: True}, job_id,
+                                         JobConstants.OGC_JOB_INDEX_ALIAS, routing=job_id)
+        pub_sub = PubSubMemory()
+        pub_sub.failing_msgs = {json.dumps(OgcJobOutbox.get_start_msg('job-3', 'UNIT-TEST:LOCAL')): (1, False)}
+        self.assertEqual({'published': 1, 'failed': 1}, OgcJobOutbox(self.es_middleware, pub_sub).sweep())
+        self.assertEqual([False, True, True], [self.__get_job(k)[OgcJobOutbox.PENDING_FIELD] for k in ['job-2', 'job-3', 'job-4']])
+        self.assertEqual(1, self.es_middleware.calls.count('bulk_write'), 'markers are cleared in 1 request')
+        self.assertEqual({'published': 1, 'failed': 0}, OgcJobOutbox(self.es_middleware, pub_sub).sweep())
+        self.assertEqual(['job-2', 'job-3'], [json.loads(k)['jobID'] for k in pub_sub.msgs])
+        self.assertEqual({'published': 1, 'failed': 0}, OgcJobOutbox(self.es_middleware, pub_sub).sweep(min_age=-10))
+        self.assertEqual({'published': 0, 'failed': 0}, OgcJobOutbox(self.es_middleware, pub_sub).sweep(min_age=-10))
+        self.assertEqual([2, 1, 1], pub_sub.batches)
+        self.assertEqual({'messageType': 'RESULT', 'stage': JobConstants.PRE_PROCESSED, 'processID': 'UNIT-TEST:LOCAL', 'jobID': 'job-2'}, pub_sub.subscribe()[0][1])
+        return
+
+    def test_15(self):
+        """
+        large REQUEST messages are published as pointers to stored messages
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            claim_check = MsgClaimCheck(FileStreamLocal(), tmp_dir, 512)
+            OgcJobUpdater(self.es_middleware, self.pub_sub, claim_check).process_update({
+                'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': JobConstants.PRE_PROCESSED,
+            })
+            self.assertFalse(MsgClaimCheck.is_pointer(self.pub_sub.msgs[-1]), 'small message')
+            OgcJobUpdater(self.es_middleware, self.pub_sub, claim_check).process_update({
+                'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': 'LIS',
+                'outputs': [{'name': 'DATA', 'value': f's3://lis/data-{i}.nc'} for i in range(50)],
+            })
+            pointer = self.pub_sub.msgs[-1]
+            self.assertTrue(MsgClaimCheck.is_pointer(pointer))
+            self.assertEqual({'messageType': 'REQUEST', 'stage': 'RRR', 'processID': 'UNIT-TEST:LOCAL', 'jobID': 'job-1'}, self.pub_sub.attributes[-1])
+            request_msg = claim_check.check_out(pointer)
+            self.assertEqual(50, len(request_msg['current_outputs']))
+            self.assertEqual('RRR', request_msg['stage'])
+            with self.assertRaises(ValueError):
+                OgcJobUpdater(self.es_middleware, self.pub_sub, claim_check).process_update(pointer)
+        return
+
+    def test_16(self):
+        """
+        a start message which arrives before its job is indexed is left to the sweeper. a deleted job is not re-created as a stub
+        """
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update(OgcJobOutbox.get_start_msg('job-missing', 'UNIT-TEST:LOCAL'))
+        self.assertEqual([], self.pub_sub.msgs)
+        self.assertNotIn('job-missing', self.es_middleware.indices[JobConstants.OGC_JOB_INDEX_ALIAS])
+        with self.assertRaises(ValueError):
+            OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({**OgcJobOutbox.get_start_msg('job-missing', 'UNIT-TEST:LOCAL'), 'stage': 'LIS'})
+
+        self.es_middleware.index_one({**self.__new_job('job-5'), 'created': 1, OgcJobOutbox.PENDING_FIELD: True}, 'job-5',
+                                     JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-5')
+        self.es_middleware.before_write = lambda es_middleware: es_middleware.indices[JobConstants.OGC_JOB_INDEX_ALIAS].pop('job-5')
+        self.assertEqual({'published': 1, 'failed': 0}, OgcJobOutbox(self.es_middleware, PubSubMemory()).sweep())
+        self.assertNotIn('job-5', self.es_middleware.indices[JobConstants.OGC_JOB_INDEX_ALIAS])
+        return
+
+    def test_17(self):
+        """
+        a cursor taken after a log still returns the next log written in the same second. logID of the 2nd log is smaller
+        """
+        with patch.object(TimeUtils, 'get_datetime_unix', return_value=1700000000):
+            for i in range(2):
+                OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+                    'messageType': 'UPDATE', 'jobID': 'job-1', 'status': 'RUNNING', 'stage': 'LIS', 'message': f'step {i}',
+                })
+        self.assertEqual([1700000000, 1700000000], [k['updated'] for k in self.__get_logs()])
+        job_logs, next_cursor = OgcJobLogs(self.es_middleware).get_logs_page('job-1', 1)
+        self.assertEqual(['step 0'], [k['message'] for k in job_logs])
+        job_logs, next_cursor = OgcJobLogs(self.es_middleware).get_logs_page('job-1', 1, next_cursor)
+        self.assertEqual(['step 1'], [k['message'] for k in job_logs])
+        self.assertEqual(None, next_cursor)
+        return
+
+    def test_18(self):
+        """
+        the scheduled sweeper deletes expired stage cache entries. no need to call DELETE /setup_es/stage_cache
+        """
+        job_details = self.__new_job('job-1')
+        for cache_key, ttl in [('expired-key', -10), ('valid-key', 100)]:
+            self.es_middleware.index_one(OgcStageCache.get_cache_doc(cache_key, job_details, 'LIS', [{'name': 'LIS__DATA', 'value': 's3://a'}], ttl),
+                                         cache_key, JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS)
+        with patch.object(job_outbox_lambda_entry, 'ESFactory') as es_factory, \
+                patch.object(job_outbox_lambda_entry, 'PubSubFactory') as pub_sub_factory, \
+                patch.object(job_outbox_lambda_entry, 'CloudWatchEmfMetrics'):
+            es_factory.return_value.get_pooled_instance.return_value = self.es_middleware
+            pub_sub_factory.return_value.get_instance.return_value.set_channel.return_value = PubSubMemory()
+            self.assertEqual({'published': 0, 'failed': 0, 'evicted': 1}, job_outbox_lambda_entry.sweep_pending_jobs({}, None))
+        self.assertEqual(['valid-key'], list(self.es_middleware.indices[JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS].keys()))
+        return
+
+    def test_19(self):
+        """
+        the retried transition writes fewer logs than the rejected one. no logs of the rejected one are left
+        """
+        cached_job = self.__new_job('job-0')
+        cached_job.update({'status': JobConstants.JOB_STATUS_SUCCESS, 'started': 1, 'finished': 2})
+        cached_job['job']['outputs'] = [{'name': 'RRR__DATA', 'value': 's3://rrr/data'}, {'name': 'RAPID__DATA', 'value': 's3://rapid/data'}]
+        self.es_middleware.index_one(cached_job, 'job-0', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-0')
+
+        def concurrent_update(es_middleware):  # cached job is removed and the job is updated after they are read
+            es_middleware.before_write = None
+            es_middleware.indices[JobConstants.OGC_JOB_INDEX_ALIAS].pop('job-0')
+            es_middleware.update_one({'updated': 5}, 'job-1', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-1')
+        self.es_middleware.before_write = concurrent_update
+        OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+            'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': 'LIS',
+            'outputs': [{'name': 'DATA', 'value': 's3://lis/data'}],
+        })
+        self.assertEqual(2, self.es_middleware.calls.count('update_by_script'), 'retried once')
+        self.assertEqual(['finished:: SUCCESSFUL:: ', 'starting'], [k['message'] for k in self.__get_logs()], '3 logs of the rejected attempt are not written')
+        self.assertEqual('RRR', self.pub_sub.msgs[-1]['stage'])
+        return
+
+    def test_20(self):
+        """
+        a transition rejected for all attempts leaves no logs or stage cache entries behind
+        """
+        self.process_def['additionalParameters']['parameters'].append({'name': 'LISCacheInputs', 'value': ['scenario']})
+        self.es_middleware.index_one(self.process_def, 'UNIT-TEST:LOCAL___0.0.1', JobConstants.OGC_PROCESS_INDEX_ALIAS)
+
+        def concurrent_update(es_middleware):
+            es_middleware.update_one({'updated': 5}, 'job-1', JobConstants.OGC_JOB_INDEX_ALIAS, routing='job-1')
+        self.es_middleware.before_write = concurrent_update
+        with self.assertRaises(VersionConflictError):
+            OgcJobUpdater(self.es_middleware, self.pub_sub).process_update({
+                'messageType': 'RESULT', 'jobID': 'job-1', 'status': 'SUCCESSFUL', 'stage': 'LIS',
+                'outputs': [{'name': 'DATA', 'value': 's3://lis/data'}],
+            })
+        self.assertEqual(OgcJobUpdater.MAX_ATTEMPTS, self.es_middleware.calls.count('update_by_script'))
+        self.assertEqual([], self.__get_logs())
+        self.assertEqual({}, self.es_middleware.indices.get(JobConstants.OGC_STAGE_CACHE_INDEX_ALIAS, {}))
+        self.assertEqual('ACCEPTED', self.__get_job()['status'])
+        self.assertEqual([], self.__get_job()['job'].get('outputs', []))
+        return
@@ -0,0 +1,75 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from fastapi import HTTPException
+
+from ideas_api.lib.processes.ogc_jobs import OgcJobs
+from ideas_api.lib.utils.TimeUtlis import TimeUtils
+
+
+class TestOgcJobs(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.job_detail = {
+            'processID': 'P1', 'type': 'process', 'jobID': 'job-1', 'status': 'RUNNING', 'message': 'LIS:: running',
+            'created': 1700000000, 'started': 1700000010, 'finished': -999, 'updated': 1700000020, 'progress': 12.5,
+        }
+        self.es_middleware = MagicMock()
+        self.es_middleware.get_by_id.return_value = {'_id': 'job-1', '_seq_no': 1, '_primary_term': 1, '_source': self.job_detail}
+
+    def test_01(self):
+        job_status = OgcJobs(self.es_middleware).get_job_status('job-1')
+        self.assertEqual(OgcJobs.STATUS_FIELDS, list(job_status.keys()))
+        for k in OgcJobs.STATUS_TIME_FIELDS:
+            self.assertEqual(TimeUtils().parse_from_unix(self.job_detail[k], False).get_datetime_str(in_ms=False), job_status[k])
+        self.assertEqual('2023-11-14T22:13:20 +00:00', job_status['created'])
+        self.assertEqual(12.5, job_status['progress'])
+        self.assertEqual(OgcJobs.STATUS_FIELDS, self.es_middleware.get_by_id.call_args.kwargs['includes'])
+        return
+
+    def test_02(self):
+        self.es_middleware.get_by_id.return_value = {'_id': 'job-1', '_source': {'job': {'outputs': [{'name': 'LIS__DATA', 'value': 's3://a'}]}}}
+        self.assertEqual({'processResults': [{'name': 'LIS__DATA', 'value': 's3://a'}]}, OgcJobs(self.es_middleware).get_job_result('job-1'))
+        self.assertEqual(OgcJobs.RESULT_FIELDS, self.es_middleware.get_by_id.call_args.kwargs['includes'])
+        self.es_middleware.get_by_id.return_value = None
+        with self.assertRaises(HTTPException):
+            OgcJobs(self.es_middleware).get_job_status('job-x')
+        with self.assertRaises(ValueError):
+            OgcJobs(self.es_middleware).get_job_result('job-x')
+        return
+
+    def test_03(self):
+        dsl = OgcJobs.get_jobs_dsl(11, ['P1', 'P2'], ['RUNNING'], (1700000000, None), (None, 1800000000))
+        self.assertEqual(11, dsl['size'])
+        self.assertEqual(OgcJobs.STATUS_FIELDS, dsl['_source'])
+        self.assertEqual([
+            {'terms': {'processID': ['P1', 'P2']}},
+            {'terms': {'status': ['RUNNING']}},
+            {'range': {'created': {'gte': 1700000000}}},
+            {'range': {'finished': {'lte': 1800000000}}},
+        ], dsl['query']['bool']['filter'])
+        self.assertEqual(['created', 'jobID'], [list(k.keys())[0] for k in dsl['sort']])
+        self.assertEqual([], OgcJobs.get_jobs_dsl(1)['query']['bool']['filter'])
+        return
+
+    def test_04(self):
+        self.es_middleware.query.return_value = {'hits': {'hits': [{'_source': {'jobID': 'job-0', 'job': {'outputs': []}}}]}}
+        job_detail = {**self.job_detail, 'processVersion': '1.0', 'inputsHash': 'hash-1'}
+        self.assertEqual('job-0', OgcJobs(self.es_middleware).get_cached_result(job_detail)['jobID'])
+        bool_query = self.es_middleware.query.call_args.args[0]['query']['bool']
+        self.assertEqual(['filter', 'must_not'], sorted(bool_query.keys()), 'exact matches are not scored')
+        self.assertEqual([{'term': {'processID': 'P1'}}, {'term': {'processVersion': '1.0'}}, {'term': {'inputsHash': 'hash-1'}}, {'term': {'status': 'SUCCESSFUL'}}],
+                         bool_query['filter'])
+        return
@@ -0,0 +1,77 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from ideas_api.lib.processes.ogc_process_cache import OgcProcessCache
+
+
+class TestOgcProcessCache(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.loaded = []
+        OgcProcessCache().clear()
+
+    def __load_process(self, process_id: str, process_version: str):
+        self.loaded.append((process_id, process_version))
+        return {
+            'id': process_id,
+            'version': process_version,
+            'additionalParameters': {'parameters': [
+                {'name': 'stagesCount', 'value': ['1']},
+                {'name': 'stage001Names', 'value': ['LIS']},
+            ]},
+        }
+
+    def test_01(self):
+        process_def, process_stages = OgcProcessCache().get_process('P1', '1.0', self.__load_process)
+        self.assertEqual('P1', process_def['id'])
+        self.assertEqual((1, 100), process_stages.get_process_range('LIS'))
+        process_def2, process_stages2 = OgcProcessCache().get_process('P1', '1.0', self.__load_process)
+        self.assertTrue(process_def is process_def2)
+        self.assertTrue(process_stages is process_stages2)
+        OgcProcessCache().get_process('P1', '2.0', self.__load_process)
+        self.assertEqual([('P1', '1.0'), ('P1', '2.0')], self.loaded)
+        self.assertEqual((2, 1), (OgcProcessCache().misses, OgcProcessCache().hits))
+        return
+
+    def test_02(self):
+        OgcProcessCache().get_process('P1', '1.0', self.__load_process)
+        OgcProcessCache().get_process('P1', '', self.__load_process)
+        OgcProcessCache().invalidate('P1', '1.0')
+        OgcProcessCache().get_process('P1', '1.0', self.__load_process)
+        OgcProcessCache().get_process('P1', '', self.__load_process)
+        self.assertEqual(4, len(self.loaded), 'latest version is invalidated as well')
+        return
+
+    def test_03(self):
+        with patch.object(OgcProcessCache, 'DEFAULT_MAX_SIZE', 2):
+            for each in ['1', '2', '3']:
+                OgcProcessCache().get_process('P1', each, self.__load_process)
+            OgcProcessCache().get_process('P1', '3', self.__load_process)
+            OgcProcessCache().get_process('P1', '1', self.__load_process)
+        self.assertEqual(['1', '2', '3', '1'], [k[1] for k in self.loaded], 'least recently used one is evicted')
+        with patch.object(OgcProcessCache, 'DEFAULT_TTL', -1):
+            OgcProcessCache().get_process('P1', '5', self.__load_process)
+        OgcProcessCache().get_process('P1', '5', self.__load_process)
+        self.assertEqual(6, len(self.loaded), 'expired one is reloaded')
+        return
+
+    def test_04(self):
+        def failed_loader(process_id, process_version):
+            raise ValueError(f'no such process: {process_id}, optional version: {process_version}')
+        with self.assertRaises(ValueError):
+            OgcProcessCache().get_process('P2', '1.0', failed_loader)
+        OgcProcessCache().get_process('P2', '1.0', self.__load_process)
+        self.assertEqual([('P2', '1.0')], self.loaded, 'failures are not cached')
+        return
@@ -0,0 +1,51 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from unittest import TestCase
+
+from ideas_api.lib.processes.ogc_process_input_validator import OgcProcessInputValidatorCache
+
+
+class TestOgcProcessInputValidator(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.process_details = {
+            'id': 'UNIT-TEST:INPUT-VALIDATOR',
+            'version': '0.0.1',
+            'inputs': {
+                'executingStageFlags': {'$ref': '#/definitions/executingStageFlagsSchema'},
+                'scenario': {'type': 'string', 'enum': ['1x', '2x']},
+            },
+            'definitions': {
+                'executingStageFlagsSchema': {'type': 'array', 'minItems': 2, 'maxItems': 2, 'items': {'type': 'boolean'}},
+            },
+        }
+
+    def test_01(self):
+        validator = OgcProcessInputValidatorCache().get_validator(self.process_details)
+        self.assertEqual({}, validator.validate({'executingStageFlags': [True, False], 'scenario': '1x'}))
+        errors = validator.validate({'executingStageFlags': [True], 'scenario': '3x', 'unknown': 1})
+        self.assertEqual(['executingStageFlags', 'scenario', 'unknown'], sorted(errors.keys()))
+        self.assertTrue('not defined in process details' in errors['unknown']['message'], f'wrong err msg: {errors}')
+        self.assertTrue('definitions' not in self.process_details['inputs']['scenario'], 'process inputs are mutated')
+        return
+
+    def test_02(self):
+        validator = OgcProcessInputValidatorCache().get_validator(self.process_details)
+        self.assertTrue(validator is OgcProcessInputValidatorCache().get_validator(self.process_details), 'not cached')
+        self.process_details['inputs']['scenario']['enum'].append('3x')
+        updated_validator = OgcProcessInputValidatorCache().get_validator(self.process_details)
+        self.assertFalse(validator is updated_validator, 'changed definition is not rebuilt')
+        self.assertEqual({}, updated_validator.validate({'scenario': '3x'}))
+        OgcProcessInputValidatorCache().invalidate(self.process_details['id'], self.process_details['version'])
+        self.assertFalse(updated_validator is OgcProcessInputValidatorCache().get_validator(self.process_details), 'not invalidated')
+        return
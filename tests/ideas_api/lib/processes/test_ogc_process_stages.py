@@ -273,3 +273,41 @@ class TestOgcProcessStages(TestCase):
         self.assertEqual(start, 85)
         self.assertEqual(end, 98)
         return
+
+    def test_08(self):
+        process_def = {
+            'additionalParameters': {
+                'parameters': [
+                    {
+                        "name": "stagesCount",
+                        "value": ["2"]
+                    },
+                    {
+                        "name": "stage001Names",
+                        "value": ["T1"]
+                    },
+                    {
+                        "name": "stage002Names",
+                        "value": ["S1"]
+                    },
+                    {
+                        "name": "T1CacheInputs",
+                        "value": ["startDate", "endDate"]
+                    },
+                    {
+                        "name": "stageCacheTtl",
+                        "value": ["3600"]
+                    }
+                ]
+            }
+        }
+        ogc_process_stages = OgcProcessStages().setup(process_def)
+        self.assertEqual(['endDate', 'startDate'], ogc_process_stages.get_cache_input_keys('T1'))
+        self.assertEqual([], ogc_process_stages.get_cache_input_keys('S1'))
+        self.assertEqual(3600, ogc_process_stages.get_cache_ttl())
+        with self.assertRaises(ValueError):
+            ogc_process_stages.get_cache_input_keys('P1')
+        ogc_process_stages.setup(process_def)  # same instance can be set up again
+        process_def['additionalParameters']['parameters'] = process_def['additionalParameters']['parameters'][:3]
+        self.assertEqual(JobConstants.DEFAULT_STAGE_CACHE_TTL, ogc_process_stages.setup(process_def).get_cache_ttl())
+        return
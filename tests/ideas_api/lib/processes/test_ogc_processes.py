@@ -0,0 +1,76 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import json
+import os
+from copy import deepcopy
+from datetime import datetime
+from unittest import TestCase, skipUnless
+
+from jsonschema.validators import validate, validator_for
+
+from ideas_api.lib.ogc_processes.process_schema import process_schema
+from ideas_api.lib.processes.ogc_processes import get_process_schema_errors, OgcProcess
+
+
+class TestOgcProcesses(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        sample_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'ogc.proposal', 'ogc.process.storage.json')
+        with open(sample_path, 'r') as ff:
+            self.sample_process = json.loads(ff.read())
+
+    def test_01(self):
+        self.assertEqual([], get_process_schema_errors(self.sample_process))
+        wrong_process = deepcopy(self.sample_process)
+        wrong_process['title'] = 123
+        wrong_process['jobControlOptions'] = ['unknown-execute']
+        schema_errors = get_process_schema_errors(wrong_process)
+        self.assertEqual(['/jobControlOptions/0', '/title'], sorted(set([k['path'] for k in schema_errors])))
+        with self.assertRaises(ValueError) as cm:
+            OgcProcess(None, None).create_new_process(wrong_process)
+        self.assertTrue('/jobControlOptions/0' in str(cm.exception), f'wrong err msg: {cm.exception}')
+        return
+
+    def test_02(self):
+        """
+        every failing path is reported at once. same errors as jsonschema
+        """
+        wrong_process = deepcopy(self.sample_process)
+        wrong_process['title'] = 123
+        wrong_process['description'] = ['not a string']
+        wrong_process['jobControlOptions'] = ['unknown-execute', 'sync-execute', 'unknown-dismiss']
+        wrong_process['links'] = 'not a list'
+        schema_errors = get_process_schema_errors(wrong_process)
+        self.assertEqual(['/description', '/jobControlOptions/0', '/jobControlOptions/2', '/links', '/title'], sorted(set([k['path'] for k in schema_errors])))
+        self.assertTrue(all(len(k['message']) > 0 for k in schema_errors))
+        expected_errors = validator_for(process_schema)(process_schema).iter_errors(wrong_process)
+        self.assertEqual(sorted([k.message for k in expected_errors]), sorted([k['message'] for k in schema_errors]))
+        return
+
+    @skipUnless(os.environ.get('RUN_BENCHMARK', 'FALSE').upper() == 'TRUE', 'benchmark. set RUN_BENCHMARK=TRUE to run it')
+    def test_03(self):
+        """
+        benchmark: validating the sample process with jsonschema.validate and with the precompiled validator.
+        timings are only printed. they depend on the machine.
+        """
+        rounds = int(os.environ.get('BENCHMARK_ROUNDS', '20'))
+        start_time = datetime.now()
+        for _ in range(rounds):
+            validate(instance=self.sample_process, schema=process_schema)
+        old_duration = datetime.now() - start_time
+        start_time = datetime.now()
+        for _ in range(rounds):
+            get_process_schema_errors(self.sample_process)
+        new_duration = datetime.now() - start_time
+        print(f'process registration validation for {rounds} rounds. jsonschema.validate: {old_duration}. precompiled: {new_duration}')
+        return
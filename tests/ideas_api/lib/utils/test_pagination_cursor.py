@@ -0,0 +1,33 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from unittest import TestCase
+
+from ideas_api.lib.utils.pagination_cursor import PaginationCursor
+
+
+class TestPaginationCursor(TestCase):
+    def test_01(self):
+        for sort_values in [['PROCESS:A', '1.0.0'], [1700000000, 'job-1?&=/+'], []]:
+            cursor = PaginationCursor.encode(sort_values)
+            self.assertTrue('=' not in cursor and '+' not in cursor and '/' not in cursor, f'url-safe: {cursor}')
+            self.assertEqual(sort_values, PaginationCursor.decode(cursor, len(sort_values)))
+        return
+
+    def test_02(self):
+        with self.assertRaises(ValueError):
+            PaginationCursor.decode('not-a-cursor', 2)
+        with self.assertRaises(ValueError):
+            PaginationCursor.decode(PaginationCursor.encode(['a']), 2)
+        with self.assertRaises(ValueError):
+            PaginationCursor.decode(PaginationCursor.encode({'a': 1}), 1)
+        return
@@ -0,0 +1,43 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from unittest import TestCase
+
+from ideas_api.lib.utils.parallel_json_validator import CompiledSchemaRegistry, SingleJsonValidator
+
+
+class TestCompiledSchemaRegistry(TestCase):
+    def test_01(self):
+        schema_1 = {'type': 'object', 'required': ['a'], 'properties': {'a': {'type': 'string'}}}
+        schema_2 = {'properties': {'a': {'type': 'string'}}, 'required': ['a'], 'type': 'object'}
+        registry = CompiledSchemaRegistry()
+        self.assertEqual(registry.get_schema_hash(schema_1), registry.get_schema_hash(schema_2), 'key order should not matter')
+        before_misses = registry.misses
+        before_hits = registry.hits
+        self.assertTrue(registry.get_validator(schema_1) is registry.get_validator(schema_2))
+        self.assertEqual(before_misses + 1, registry.misses, 'misses')
+        self.assertEqual(before_hits + 1, registry.hits, 'hits')
+        result, errors = SingleJsonValidator().load_schema(schema_2).validate({'a': 1})
+        self.assertFalse(result)
+        self.assertEqual(before_hits + 2, registry.hits, 'hits')
+        return
+
+    def test_02(self):
+        registry = CompiledSchemaRegistry()
+        max_size = registry.get_stats()['max_size']
+        for i in range(max_size + 5):
+            registry.get_validator({'type': 'object', 'required': [f'key_{i}']})
+        self.assertEqual(max_size, registry.size, 'registry is not bounded')
+        before_misses = registry.misses
+        registry.get_validator({'type': 'object', 'required': ['key_0']})  # evicted as it is the oldest
+        self.assertEqual(before_misses + 1, registry.misses, 'misses')
+        return
@@ -0,0 +1,83 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import json
+from unittest import TestCase
+from unittest.mock import AsyncMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ideas_api.lib.utils.fast_api_utils import FastApiUtils
+from ideas_api.lib.utils.pagination_cursor import PaginationCursor
+from ideas_api.src.endpoints import job_endpoints
+
+
+class TestJobEndpoints(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.jobs = [{
+            'processID': 'P1', 'type': 'process', 'jobID': f'job-{i}', 'status': 'SUCCESSFUL', 'message': '',
+            'created': 1700000000 - i, 'started': 1700000000, 'finished': 1700000100, 'updated': 1700000100, 'progress': 100,
+        } for i in range(3)]
+        self.es_middleware = AsyncMock()
+        app = FastAPI()
+        app.include_router(job_endpoints.router)
+        app.dependency_overrides[FastApiUtils.get_async_es_middleware] = lambda: self.es_middleware
+        self.client = TestClient(app)
+
+    def __get_hits(self, jobs: list):
+        return {'hits': {'hits': [{'_source': k, 'sort': [k['created'], k['jobID']]} for k in jobs]}}
+
+    def test_01(self):
+        self.es_middleware.query_after.return_value = self.__get_hits(self.jobs)
+        response = self.client.get('/jobs?limit=2&processID=P1&processID=P2&status=SUCCESSFUL&created_after=1600000000')
+        self.assertEqual(200, response.status_code, response.text)
+        response = response.json()
+        self.assertEqual(['job-0', 'job-1'], [k['jobID'] for k in response['jobs']])
+        self.assertEqual('2023-11-14T22:13:20 +00:00', response['jobs'][0]['created'])
+        dsl = self.es_middleware.query_after.call_args.args[0]
+        self.assertEqual(3, dsl['size'])
+        self.assertEqual({'terms': {'processID': ['P1', 'P2']}}, dsl['query']['bool']['filter'][0])
+        self.assertEqual({'range': {'created': {'gte': 1600000000}}}, dsl['query']['bool']['filter'][2])
+        next_link = [k for k in response['links'] if k['rel'] == 'next'][0]
+        self.assertEqual([1699999999, 'job-1'], PaginationCursor.decode(next_link['href'].split('cursor=')[1], 2))
+        self.assertTrue('processID=P2' in next_link['href'], 'filters are kept in the next link')
+
+        self.es_middleware.query_after.return_value = self.__get_hits(self.jobs[2:])
+        response = self.client.get(next_link['href'].replace('http://testserver', '')).json()
+        self.assertEqual(['job-2'], [k['jobID'] for k in response['jobs']])
+        self.assertEqual([1699999999, 'job-1'], self.es_middleware.query_after.call_args.args[1])
+        self.assertEqual(['self'], [k['rel'] for k in response['links']])
+        return
+
+    def test_02(self):
+        self.assertEqual(422, self.client.get('/jobs?limit=0').status_code)
+        self.assertEqual(422, self.client.get('/jobs?created_after=yesterday').status_code)
+        self.assertEqual(400, self.client.get('/jobs?cursor=abc').status_code)
+        self.es_middleware.query_after.side_effect = RuntimeError('ES is down')
+        self.assertEqual(500, self.client.get('/jobs').status_code)
+        return
+
+    def test_03(self):
+        job_logs = [{'jobID': 'job-1', 'stage': 'LIS', 'message': f'log {i}', 'updated': 1700000000 + i} for i in range(3)]
+        self.es_middleware.query_after.return_value = {'hits': {'hits': [{'_source': k, 'sort': [k['updated'], f'id-{i}']} for i, k in enumerate(job_logs)]}}
+        response = self.client.get('/jobs/job-1/logs?limit=2&since=1700000000')
+        self.assertEqual(200, response.status_code, response.text)
+        self.assertEqual(job_logs[:2], response.json()['logs'])
+        self.assertEqual(['self', 'next'], [k['rel'] for k in response.json()['links']])
+        response = self.client.get('/jobs/job-1/logs?format=ndjson')
+        self.assertEqual('application/x-ndjson', response.headers['content-type'])
+        self.assertEqual(job_logs, [json.loads(k) for k in response.text.splitlines()])
+        self.assertEqual(422, self.client.get('/jobs/job-1/logs?format=xml').status_code)
+        self.assertEqual(400, self.client.get('/jobs/job-1/logs?format=ndjson&cursor=abc').status_code)
+        return
@@ -0,0 +1,115 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import json
+import os
+from unittest import TestCase
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ideas_api.lib.utils.fast_api_utils import FastApiUtils
+from ideas_api.lib.utils.pagination_cursor import PaginationCursor
+from ideas_api.src.endpoints import process_endpoints
+
+
+class TestProcessEndpoints(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        os.environ['ES_URL'] = os.environ.get('ES_URL', 'localhost')
+        os.environ['SNS_TOPIC'] = os.environ.get('SNS_TOPIC', 'arn:aws:sns:us-west-2:000000000000:unit-test')
+        self.processes = [{'id': f'P{i:02d}', 'version': '1.0', 'title': f'title {i}', 'description': ''} for i in range(5)]
+        self.es_middleware = AsyncMock()
+        app = FastAPI()
+        app.include_router(process_endpoints.router)
+        app.dependency_overrides[FastApiUtils.get_async_es_middleware] = lambda: self.es_middleware
+        self.client = TestClient(app)
+
+    @staticmethod
+    async def __iter_async(pages: list):
+        for each in pages:
+            yield each
+
+    def __get_hits(self, processes: list):
+        return {'hits': {'hits': [{'_source': k, 'sort': [k['id'], k['version']]} for k in processes]}}
+
+    def test_01(self):
+        self.es_middleware.query_after.return_value = self.__get_hits(self.processes[:3])
+        response = self.client.get('/processes?limit=2')
+        self.assertEqual(200, response.status_code, response.text)
+        response = response.json()
+        self.assertEqual(['P00', 'P01'], [k['id'] for k in response['processes']])
+        self.assertEqual(3, self.es_middleware.query_after.call_args.args[0]['size'], 'one more to know if there is a next page')
+        self.assertEqual(None, self.es_middleware.query_after.call_args.args[1])
+        next_link = [k for k in response['links'] if k['rel'] == 'next'][0]
+        self.assertTrue(next_link['href'].startswith('http://testserver/processes?'))
+        cursor = next_link['href'].split('cursor=')[1]
+        self.assertEqual(['P01', '1.0'], PaginationCursor.decode(cursor, 2))
+
+        self.es_middleware.query_after.return_value = self.__get_hits(self.processes[2:])
+        response = self.client.get(next_link['href'].replace('http://testserver', '')).json()
+        self.assertEqual(['P02', 'P03'], [k['id'] for k in response['processes']])
+        self.assertEqual(['P01', '1.0'], self.es_middleware.query_after.call_args.args[1])
+
+        self.es_middleware.query_after.return_value = self.__get_hits(self.processes[4:])
+        response = self.client.get(f'/processes?limit=2&cursor={cursor}').json()
+        self.assertEqual(['self'], [k['rel'] for k in response['links']], 'last page')
+        return
+
+    def test_02(self):
+        self.assertEqual(400, self.client.get('/processes?limit=0').status_code)
+        self.assertEqual(400, self.client.get('/processes?limit=1001').status_code)
+        self.assertEqual(400, self.client.get('/processes?limit=abc').status_code)
+        self.assertEqual(400, self.client.get('/processes?cursor=abc').status_code)
+        self.es_middleware.query_after.side_effect = RuntimeError('ES is down')
+        self.assertEqual(500, self.client.get('/processes').status_code)
+        return
+
+    def test_03(self):
+        pages = [self.__get_hits(self.processes[:2])['hits']['hits'], self.__get_hits(self.processes[2:])['hits']['hits']]
+        self.es_middleware.iter_pages = MagicMock(side_effect=lambda *args, **kwargs: self.__iter_async(pages))
+        response = self.client.get('/processes?limit=all')
+        self.assertEqual(200, response.status_code)
+        response = json.loads(response.text)
+        self.assertEqual(self.processes, response['processes'])
+        self.assertEqual(['self'], [k['rel'] for k in response['links']])
+        pages = []
+        self.assertEqual({'processes': [], 'links': [{'href': 'http://testserver/processes?limit=all', 'rel': 'self', 'type': 'application/json'}]},
+                         self.client.get('/processes?limit=all').json())
+        self.es_middleware.iter_pages.side_effect = RuntimeError('ES is down')
+        self.assertEqual(500, self.client.get('/processes?limit=all').status_code)
+        return
+
+    def test_04(self):
+        """
+        the job is stored and its start message is published concurrently. no other ES write
+        """
+        self.es_middleware.query.return_value = {'hits': {'hits': [{'_source': {'id': 'P00', 'version': '1.0', 'inputs': {}}}]}}
+        pub_sub = MagicMock()
+        pub_sub.publish_msg_async = AsyncMock()
+        with patch.object(process_endpoints, 'PubSubFactory') as pub_sub_factory:
+            pub_sub_factory.return_value.get_instance.return_value.set_channel.return_value = pub_sub
+            response = self.client.post('/processes/P00/execution', json={'inputs': {}})
+        self.assertEqual(200, response.status_code, response.text)
+        job_id = response.json()['jobID']
+        self.assertEqual(True, self.es_middleware.index_one.call_args.args[0]['publishPending'])
+        self.assertEqual(job_id, json.loads(pub_sub.publish_msg_async.call_args.args[0])['jobID'])
+        self.es_middleware.update_one.assert_not_awaited()
+
+        pub_sub.publish_msg_async.side_effect = ConnectionError('SNS is down')
+        with patch.object(process_endpoints, 'PubSubFactory') as pub_sub_factory:
+            pub_sub_factory.return_value.get_instance.return_value.set_channel.return_value = pub_sub
+            self.assertEqual(200, self.client.post('/processes/P00/execution', json={'inputs': {}}).status_code, 'left to the sweeper')
+            self.es_middleware.index_one.side_effect = RuntimeError('ES is down')
+            self.assertEqual(500, self.client.post('/processes/P00/execution', json={'inputs': {}}).status_code)
+        return
@@ -0,0 +1,58 @@
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Copyright 2024, by the California Institute of Technology. ALL RIGHTS RESERVED.
+#  United States Government Sponsorship acknowledged. Any commercial use must be
+#  negotiated with the Office of Technology Transfer at the California Institute of
+#  Technology.  This software is subject to U.S. export control laws and regulations
+#  and has been classified as EAR99.  By accepting this software, the user agrees to
+#  comply with all applicable U.S. export laws and regulations.  User has the
+#  responsibility to obtain export licenses, or other export authority as may be
+#  required before exporting such information to foreign countries or providing
+#  access to foreign persons.
+#  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ideas_api.lib.job_management.job_constants import JobConstants, OGC_JOB_LOGS_ROLLOVER_CONDITIONS
+from ideas_api.lib.utils.fast_api_utils import FastApiUtils
+from ideas_api.src.endpoints import setup_es
+
+
+class TestSetupEs(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.es_middleware = MagicMock()
+        app = FastAPI()
+        app.include_router(setup_es.router)
+        app.dependency_overrides[FastApiUtils.get_es_middleware] = lambda: self.es_middleware
+        self.client = TestClient(app)
+
+    def test_01(self):
+        self.es_middleware.has_index.return_value = False
+        response = self.client.put('/setup_es')
+        self.assertEqual(200, response.status_code, response.text)
+        self.assertEqual(JobConstants.OGC_JOB_LOGS_TEMPLATE, self.es_middleware.put_index_template.call_args.args[0])
+        self.assertEqual(JobConstants.OGC_JOB_LOGS_POLICY, self.es_middleware.put_lifecycle_policy.call_args.args[0])
+        created_indices = {k.args[0]: k.args[1] for k in self.es_middleware.create_index.call_args_list}
+        self.assertEqual({'aliases': {'ogc_job_logs': {'is_write_index': True}}}, created_indices['ogc_job_logs-000001'])
+        self.assertTrue('ogc_job_logs_1' not in created_indices)
+        self.es_middleware.create_index.reset_mock()
+        self.es_middleware.has_index.return_value = True
+        self.assertEqual(200, self.client.put('/setup_es').status_code)
+        self.assertTrue('ogc_job_logs-000001' not in [k.args[0] for k in self.es_middleware.create_index.call_args_list], 'existing write alias')
+        return
+
+    def test_02(self):
+        self.es_middleware.rollover.return_value = False
+        response = self.client.post('/setup_es/job_logs/rollover')
+        self.assertEqual({'status': 'finished', 'rolled_over': False}, response.json())
+        self.es_middleware.rollover.assert_called_with(JobConstants.OGC_JOB_LOGS_INDEX_ALIAS, OGC_JOB_LOGS_ROLLOVER_CONDITIONS)
+        self.es_middleware.rollover.return_value = True
+        self.assertEqual(True, self.client.post('/setup_es/job_logs/rollover?force=true').json()['rolled_over'])
+        self.es_middleware.rollover.assert_called_with(JobConstants.OGC_JOB_LOGS_INDEX_ALIAS, None)
+        self.es_middleware.rollover.side_effect = ValueError('no write index')
+        self.assertEqual(500, self.client.post('/setup_es/job_logs/rollover').status_code)
+        return
@@ -39,6 +39,7 @@ resource "aws_lambda_function" "ideas_api_updater_trigger" {
       ES_URL = data.aws_elasticsearch_domain.ideas-es.endpoint
       ES_PORT = 443
       SNS_TOPIC = aws_sns_topic.ideas_api_main_topic.arn
+      CLAIM_CHECK_BUCKET = aws_s3_bucket.ideas_api_claim_check.id
     }
   }
 
@@ -48,3 +49,47 @@ resource "aws_lambda_function" "ideas_api_updater_trigger" {
   }
   tags = var.tags
 }
+
+resource "aws_lambda_function" "ideas_api_job_outbox_sweeper" {
+  filename      = local.lambda_file_name
+  function_name = "${var.prefix}-ideas_api_job_outbox_sweeper"
+  source_code_hash = filebase64sha256(local.lambda_file_name)
+  role          = var.lambda_processing_role_arn
+  handler       = "ideas_api.job_outbox_lambda_entry.sweep_pending_jobs"
+  runtime       = "python3.9"
+  timeout       = 300
+  environment {
+    variables = {
+      LOG_LEVEL = var.log_level
+      ES_URL = data.aws_elasticsearch_domain.ideas-es.endpoint
+      ES_PORT = 443
+      SNS_TOPIC = aws_sns_topic.ideas_api_main_topic.arn
+    }
+  }
+
+  vpc_config {
+    subnet_ids         = var.ideas_api_lambda_subnet_ids
+    security_group_ids = local.security_group_ids_set ? var.security_group_ids : [aws_security_group.unity_cumulus_lambda_sg[0].id]
+  }
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_rule" "ideas_api_job_outbox_sweeper" {
+  name                = "${var.prefix}-ideas_api_job_outbox_sweeper"
+  description         = "publish start messages of accepted jobs which are not published by the API"
+  schedule_expression = "rate(5 minutes)"
+  tags                = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "ideas_api_job_outbox_sweeper" {
+  rule = aws_cloudwatch_event_rule.ideas_api_job_outbox_sweeper.name
+  arn  = aws_lambda_function.ideas_api_job_outbox_sweeper.arn
+}
+
+resource "aws_lambda_permission" "ideas_api_job_outbox_sweeper" {
+  statement_id  = "AllowExecutionFromCloudWatch"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ideas_api_job_outbox_sweeper.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.ideas_api_job_outbox_sweeper.arn
+}
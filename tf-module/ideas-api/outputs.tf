@@ -1,3 +1,12 @@
 output "lambda_ideas_api_arn" {
   value = aws_lambda_function.ideas_api.arn
 }
+
+output "claim_check_bucket" {
+  value = aws_s3_bucket.ideas_api_claim_check.id
+}
+
+output "claim_check_bucket_arn" {
+  value       = aws_s3_bucket.ideas_api_claim_check.arn
+  description = "consumers of REQUEST messages need s3:GetObject on <arn>/claim_check/* to read the stored messages"
+}
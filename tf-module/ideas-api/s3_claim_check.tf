@@ -0,0 +1,39 @@
+resource "aws_s3_bucket" "ideas_api_claim_check" {  // https://registry.terraform.io/providers/hashicorp/aws/latest/docs/resources/s3_bucket
+  bucket = "${var.prefix}-ideas-api-claim-check"
+  tags   = var.tags
+}
+
+resource "aws_s3_bucket_public_access_block" "ideas_api_claim_check" {
+  bucket                  = aws_s3_bucket.ideas_api_claim_check.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "ideas_api_claim_check" {
+  bucket = aws_s3_bucket.ideas_api_claim_check.id
+  rule {
+    id     = "expire-stored-messages"
+    status = "Enabled"
+    filter {
+      prefix = "claim_check/"
+    }
+    expiration {
+      days = 7  // longer than message_retention_seconds of the queues
+    }
+  }
+}
+
+data "aws_iam_policy_document" "ideas_api_claim_check_access" {
+  statement {
+    actions   = ["s3:PutObject", "s3:GetObject"]
+    resources = ["${aws_s3_bucket.ideas_api_claim_check.arn}/claim_check/*"]
+  }
+}
+
+resource "aws_iam_role_policy" "ideas_api_claim_check_access" {  // the job updater stores large REQUEST messages here
+  name   = "${var.prefix}-ideas-api-claim-check-access"
+  role   = element(split("/", var.lambda_processing_role_arn), length(split("/", var.lambda_processing_role_arn)) - 1)  // role name from its ARN
+  policy = data.aws_iam_policy_document.ideas_api_claim_check_access.json
+}
@@ -24,7 +24,7 @@ resource "aws_sns_topic_subscription" "ideas_api_sns_lis_subscription" { // http
   topic_arn = aws_sns_topic.ideas_api_main_topic.arn
   protocol  = "sqs"
   endpoint  = aws_sqs_queue.ideas_jobs_lis_queue.arn
-  filter_policy_scope = "MessageBody"  // MessageAttributes. not using attributes
+  filter_policy_scope = "MessageAttributes"  // REQUEST messages are published with messageType, stage, processID, jobID attributes
   filter_policy = templatefile("${path.module}/ideas_api_job_lis_filter_policy.json", {})
 }
 
@@ -24,13 +24,15 @@ resource "aws_sns_topic_subscription" "ideas_api_sns_result_subscription" { // h
   topic_arn = aws_sns_topic.ideas_api_main_topic.arn
   protocol  = "sqs"
   endpoint  = aws_sqs_queue.ideas_jobs_result_queue.arn
-  filter_policy_scope = "MessageBody"  // MessageAttributes. not using attributes
+  filter_policy_scope = "MessageBody"  // stage workers publish RESULT / UPDATE without attributes. switch to MessageAttributes once they do
   filter_policy = templatefile("${path.module}/ideas_api_job_results_filter_policy.json", {})
 }
 
 resource "aws_lambda_event_source_mapping" "ideas_job_result_lambda_trigger" {  // https://registry.terraform.io/providers/hashicorp/aws/latest/docs/resources/lambda_event_source_mapping#sqs
   event_source_arn = aws_sqs_queue.ideas_jobs_result_queue.arn
   function_name    = aws_lambda_function.ideas_api_updater_trigger.arn
-  batch_size = 1
+  batch_size = var.job_updater_batch_size
+  maximum_batching_window_in_seconds = var.job_updater_batching_window
+  function_response_types = ["ReportBatchItemFailures"]  // updater returns batchItemFailures. only failed records are retried.
   enabled = true
 }
\ No newline at end of file
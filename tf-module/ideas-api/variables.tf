@@ -46,6 +46,19 @@ variable "ideas_es_cluster_instance_type" {
 
 variable "lambda_processing_role_arn" {
   type = string
+  description = "role of the lambdas. s3:PutObject and s3:GetObject on the claim check bucket are attached to it by this module"
+}
+
+variable "job_updater_batch_size" {
+  type = number
+  default = 10
+  description = "max number of job result / update messages for each job updater invocation"
+}
+
+variable "job_updater_batching_window" {
+  type = number
+  default = 0
+  description = "seconds to wait to gather a batch of job result / update messages. batch_size can be more than 10 if this is more than 0"
 }
 
 variable "job_lis_lambda_arn" {